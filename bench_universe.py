@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+Medição de desempenho dos motores em função do tamanho do universo de ações.
+
+Gera universos sintéticos (preços em passeio aleatório, dividendos esparsos e
+tickers que entram na bolsa ao longo do período) com tamanhos crescentes e
+mede o tempo dos motores de aportes mensais, CDB misto e em lote. Como a
+escolha dos n ativos de menor valor usa seleção parcial, o custo por aporte é
+linear no número de tickers, e o tempo por ticker deve ficar estável quando o
+universo cresce.
+
+Uso:
+    python bench_universe.py [tamanho1 tamanho2 ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import engines
+
+TAMANHOS_PADRAO = (50, 100, 200, 400, 800, 1600)
+ANOS = 10
+
+
+def synthetic_universe(n_tickers, anos=ANOS, semente=0):
+    """Universo sintético com `n_tickers` ações: (datas, fechamento, dividendos, aportes, índice do CDI)."""
+    rng = np.random.default_rng(semente)
+    dates = pd.bdate_range('2015-01-02', periods=252 * anos)
+    n_dias = len(dates)
+    close = 20 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, size=(n_dias, n_tickers)), axis=0))
+    # Parte dos tickers só passa a ser negociada depois do início
+    estreia = np.where(rng.random(n_tickers) < 0.3, rng.integers(0, n_dias // 2, n_tickers), 0)
+    close[np.arange(n_dias)[:, None] < estreia[None, :]] = np.nan
+    dividends = np.where(rng.random((n_dias, n_tickers)) < 0.004, close * 0.01, np.nan)
+    aportes = 1000 * 1.004 ** (np.arange(n_dias) / 21)
+    indice_cdi = 1.0004 ** np.arange(1, n_dias + 1)
+    return dates, close, dividends, aportes, indice_cdi
+
+
+def _tempo(funcao, repeticoes=3):
+    """Melhor tempo (em segundos) de algumas execuções."""
+    melhor = np.inf
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def run_benchmark(tamanhos=TAMANHOS_PADRAO, n_por_aporte=5, conjuntos_lote=8):
+    """Tabela com o tempo de cada motor para cada tamanho de universo."""
+    linhas = []
+    for n_tickers in tamanhos:
+        dates, close, dividends, aportes, indice_cdi = synthetic_universe(n_tickers)
+        tempos = {
+            'Aportes Mensais': _tempo(lambda: engines.monthly_contributions_engine(
+                dates, close, dividends, aportes, n_por_aporte,
+                freio_ativo=True, freio_periodo=2, quarentena_inicial=6, quarentena_adicional=12)),
+            'CDB Misto': _tempo(lambda: engines.cdb_mixed_engine(dates, close, dividends, aportes, indice_cdi, 0.25)),
+            f'Lote ({conjuntos_lote} conjuntos)': _tempo(lambda: engines.monthly_contributions_batch_engine(
+                dates, close, dividends, aportes, np.full(conjuntos_lote, n_por_aporte),
+                freio_ativo=np.ones(conjuntos_lote, dtype=bool), freio_periodo=np.arange(conjuntos_lote) % 3 + 1,
+                quarentena_inicial=np.full(conjuntos_lote, 6), quarentena_adicional=np.full(conjuntos_lote, 12))),
+        }
+        for motor, segundos in tempos.items():
+            linhas.append({'Motor': motor, 'Tickers': n_tickers, 'Segundos': segundos,
+                           'us por ticker-dia': segundos / (n_tickers * len(dates)) * 1e6})
+        print(f"  {n_tickers} tickers: " + ", ".join(f"{m} {s:.3f}s" for m, s in tempos.items()))
+    return pd.DataFrame(linhas)
+
+
+def scaling_exponent(tabela):
+    """Expoente do ajuste tempo ~ tickers^k de cada motor (k perto de 1 indica escala linear)."""
+    return pd.Series({motor: np.polyfit(np.log(g['Tickers']), np.log(g['Segundos']), 1)[0]
+                      for motor, g in tabela.groupby('Motor', sort=False)}, name='Expoente')
+
+
+def main():
+    """Mede os motores nos tamanhos de universo informados (ou nos padrão) e imprime as tabelas."""
+    tamanhos = [int(t) for t in sys.argv[1:]] or list(TAMANHOS_PADRAO)
+    print(f"Medindo os motores com {ANOS} anos de pregões...")
+    tabela = run_benchmark(tamanhos)
+    print("\n--- Tempo por Tamanho de Universo ---")
+    print(tabela.pivot(index='Tickers', columns='Motor', values='Segundos').to_string(float_format='{:.3f}'.format))
+    print("\n--- Expoente de Escala (tempo ~ tickers^k) ---")
+    print(scaling_exponent(tabela).to_string(float_format='{:.2f}'.format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""
+Curvas dos benchmarks (CDI e IPCA + X) usadas por todos os cenários.
+
+Os índices acumulados de cada benchmark são calculados uma única vez por
+(série, período, X) e memorizados em memória e, quando um diretório de cache
+é informado (`config.BENCHMARK_CACHE_DIR`, usado pelo main.py), em disco. Os
+cenários, a varredura e as demais análises apenas reaproveitam os vetores.
+
+O saldo de um benchmark que recebe uma sequência qualquer de aportes não é
+simulado dia a dia: cada aporte compra "cotas" do índice (aporte / nível do
+índice) e o saldo em cada dia é o total de cotas x nível do índice, ou seja,
+um produto escalar dos aportes com as razões entre níveis do índice.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+import config
+
+# Índices já calculados nesta execução, por chave de `_series_key`
+_CACHE = {}
+
+
+def _series_key(nome, serie, calendar, *extras):
+    """Chave de cache: nome do benchmark, valores da série, período do calendário e parâmetros extras."""
+    h = hashlib.sha256()
+    h.update(nome.encode('utf-8'))
+    h.update(np.asarray(serie.index.asi8).tobytes())
+    h.update(serie.to_numpy(dtype=np.float64).tobytes())
+    h.update(repr((str(calendar[0]), str(calendar[-1]), len(calendar)) + extras).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _memoize(chave, calcular, cache_dir=None):
+    """Retorna o índice da chave, procurando na memória, depois no disco e, por fim, calculando."""
+    if chave in _CACHE:
+        return _CACHE[chave]
+
+    indice = None
+    path = os.path.join(cache_dir, f"{chave}.npy") if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            indice = np.load(path)
+        except Exception as e:
+            print(f"AVISO: cache de benchmark '{path}' ignorado ({e}).")
+
+    if indice is None:
+        indice = np.ascontiguousarray(calcular(), dtype=np.float64)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            temporario = path + '.tmp'
+            with open(temporario, 'wb') as f:
+                np.save(f, indice)
+            os.replace(temporario, path)
+
+    # O mesmo vetor é compartilhado por todos os usuários do cache
+    indice.flags.writeable = False
+    _CACHE[chave] = indice
+    return indice
+
+
+def clear_cache():
+    """Esvazia o cache em memória (o cache em disco é mantido)."""
+    _CACHE.clear()
+
+
+def cdi_index(benchmark_diaria, calendar, cache_dir=None):
+    """CDI acumulado em cada dia do calendário (fator 1.0 nos dias sem cotação)."""
+    def calcular():
+        return np.cumprod(benchmark_diaria.reindex(calendar).fillna(1.0).to_numpy(dtype=np.float64))
+    return _memoize(_series_key('cdi', benchmark_diaria, calendar), calcular, cache_dir)
+
+
+def ipca_x_index(ipca_mensal, calendar, x=None, cache_dir=None):
+    """IPCA + X acumulado em cada dia do calendário (base 1 antes do primeiro dia).
+
+    O IPCA do mês (em %) é aplicado no último dia de cada mês e o juro real de
+    X% ao ano é aplicado diariamente, com a convenção de 252 dias.
+    """
+    x = config.IPCA_BENCHMARK_X if x is None else x
+
+    def calcular():
+        # Converte a taxa de juros real anual para uma taxa diária
+        taxa_juros_real_anual = x / 100.0
+        taxa_juros_real_diaria = (1 + taxa_juros_real_anual) ** (1 / 252) - 1 if taxa_juros_real_anual != 0 else 0.0
+
+        ipca = ipca_mensal.reindex(calendar, method='ffill').fillna(0).to_numpy(dtype=np.float64)
+        # O fator de correção do IPCA é aplicado apenas no último dia do mês.
+        ipca_fator = np.where(calendar.is_month_end, 1 + ipca / 100, 1.0)
+        return np.cumprod(ipca_fator * (1 + taxa_juros_real_diaria))
+    return _memoize(_series_key('ipca_x', ipca_mensal, calendar, float(x)), calcular, cache_dir)
+
+
+def contribution_weighted(indice, posicoes, aportes, rende_no_dia=True):
+    """Saldo diário de um benchmark que recebe `aportes` nas posições `posicoes` do calendário.
+
+    Cada aporte compra cotas ao nível do índice na véspera (`rende_no_dia`,
+    o aporte já rende no próprio dia) ou no próprio dia, e o saldo é o total
+    de cotas acumulado até cada dia vezes o nível do índice.
+
+    Para P trajetórias de uma vez (ex.: Monte Carlo), `indice` e/ou `aportes`
+    podem ser matrizes (dias x P e aportes x P); o saldo é então (dias x P).
+    """
+    indice = np.asarray(indice, dtype=np.float64)
+    posicoes = np.asarray(posicoes, dtype=np.intp)
+    aportes = np.asarray(aportes, dtype=np.float64)
+    if rende_no_dia:
+        base = indice[np.maximum(posicoes - 1, 0)]
+        base[posicoes == 0] = 1.0
+    else:
+        base = indice[posicoes]
+    if indice.ndim == 1 and aportes.ndim == 1:
+        cotas = np.bincount(posicoes, weights=aportes / base, minlength=len(indice))
+        return np.cumsum(cotas) * indice
+    if base.ndim == 1:
+        base, indice = base[:, None], indice[:, None]
+    compradas = aportes / base
+    cotas = np.zeros((len(indice),) + compradas.shape[1:])
+    np.add.at(cotas, posicoes, compradas)
+    return np.cumsum(cotas, axis=0) * indice
+
+
+def final_value(indice, posicoes, aportes):
+    """Saldo final de um benchmark para um ou mais cronogramas de aportes (aportes: n ou n x P).
+
+    Produto escalar dos aportes com a razão entre o nível final do índice e o
+    nível na véspera de cada aporte.
+    """
+    indice = np.asarray(indice, dtype=np.float64)
+    posicoes = np.asarray(posicoes, dtype=np.intp)
+    base = np.where(posicoes > 0, indice[np.maximum(posicoes - 1, 0)], 1.0)
+    return (indice[-1] / base) @ np.nan_to_num(np.asarray(aportes, dtype=np.float64))
+
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+Manifesto do cache de dados em `data/`.
+
+Para cada arquivo de cache (um CSV por ticker, CDI e IPCA), o manifesto
+registra o intervalo de datas pedido na última gravação, a fonte dos dados
+(yfinance, MetaTrader 5 ou SGS), o modo de ajuste dos preços, o número de
+linhas, o tamanho e o checksum (SHA-256) do arquivo. Com isso:
+
+- um pedido cujo intervalo já está coberto pelo cache é atendido sem nenhum
+  acesso à rede, mesmo que o arquivo seja antigo (ex.: um backtest com
+  DATA_FIM no passado);
+- um cache que não cobre o início pedido (DATA_INICIO mais antigo) é baixado
+  de novo por inteiro, sem depender de heurísticas sobre o primeiro registro;
+- arquivos truncados ou corrompidos são detectados antes de chegar aos
+  cenários e baixados de novo (o checksum só é recalculado quando o tamanho
+  ou a data de modificação do arquivo mudam, de modo que um acerto no cache
+  não lê o arquivo inteiro).
+
+Arquivos sem entrada no manifesto (caches antigos) continuam sendo usados como
+antes e passam a ser registrados na próxima gravação.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+# Incrementar quando o formato das entradas mudar
+VERSAO_MANIFESTO = 1
+
+# Serializa as gravações do manifesto entre threads do mesmo processo (ex.: CDI e IPCA baixados juntos)
+_LOCK_GRAVACAO = threading.Lock()
+
+
+def file_fingerprint(file_path):
+    """Tamanho, data de modificação, número de linhas de dados (sem o cabeçalho) e SHA-256 de um arquivo."""
+    mtime_ns = os.stat(file_path).st_mtime_ns
+    with open(file_path, 'rb') as f:
+        conteudo = f.read()
+    return {
+        'bytes': len(conteudo),
+        'mtime_ns': mtime_ns,
+        'linhas': max(conteudo.count(b'\n') - 1, 0),
+        'sha256': hashlib.sha256(conteudo).hexdigest(),
+    }
+
+
+class CacheManifest:
+    """Manifesto do cache, guardado em um arquivo JSON (ver `config.CACHE_MANIFEST`)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.series = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                dados = json.load(f)
+        except Exception as e:
+            print(f"AVISO: manifesto do cache '{self.path}' ignorado ({e}).")
+            return {}
+        return dados.get('series', {}) if dados.get('versao') == VERSAO_MANIFESTO else {}
+
+    def get(self, file_path):
+        """Entrada do manifesto para o arquivo (None se o arquivo nunca foi registrado)."""
+        return self.series.get(file_path)
+
+    def covers(self, file_path, start_date, end_date=None):
+        """Indica se o cache registrado cobre o início pedido (e o fim, se informado)."""
+        entrada = self.get(file_path)
+        if entrada is None:
+            return False
+        if pd.Timestamp(entrada['inicio']) > pd.Timestamp(start_date):
+            return False
+        return end_date is None or pd.Timestamp(entrada['fim']) >= pd.Timestamp(end_date)
+
+    def verify(self, file_path):
+        """Confere o arquivo com o manifesto; False apenas se ele existir e não coincidir com o registrado.
+
+        Com o mesmo tamanho e a mesma data de modificação do registro, o arquivo
+        é considerado íntegro sem recalcular o checksum.
+        """
+        entrada = self.get(file_path)
+        if entrada is None or not os.path.exists(file_path):
+            return True
+        situacao = os.stat(file_path)
+        if situacao.st_size != entrada['bytes']:
+            return False
+        if situacao.st_mtime_ns == entrada.get('mtime_ns'):
+            return True
+        return file_fingerprint(file_path)['sha256'] == entrada['sha256']
+
+    def record(self, file_path, inicio, fim, fonte, ajuste=None):
+        """Registra (ou atualiza) a entrada de um arquivo recém-gravado."""
+        if not os.path.exists(file_path):
+            return
+        self.series[file_path] = {
+            'inicio': str(pd.Timestamp(inicio).date()),
+            'fim': str(pd.Timestamp(fim).date()),
+            'fonte': fonte,
+            'ajuste': ajuste,
+            'gravado_em': datetime.now().isoformat(timespec='seconds'),
+            **file_fingerprint(file_path),
+        }
+
+    def save(self):
+        """Grava o manifesto de forma atômica.
+
+        As entradas gravadas por outras execuções desde a leitura são mantidas
+        (vale a mais recente para cada arquivo), para que vários processos
+        possam compartilhar o mesmo diretório de dados.
+        """
+        with _LOCK_GRAVACAO:
+            atual = self._read()
+            for file_path, entrada in self.series.items():
+                if file_path not in atual or atual[file_path]['gravado_em'] <= entrada['gravado_em']:
+                    atual[file_path] = entrada
+            self.series = atual
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temporario = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({'versao': VERSAO_MANIFESTO, 'series': self.series}, f, indent=1, sort_keys=True)
+            os.replace(temporario, self.path)
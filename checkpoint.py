@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""
+Checkpoints dos motores de backtest para execuções incrementais.
+
+Ao final de cada execução, o resultado do motor de um cenário (as saídas por
+pregão e o estado final: ações, saldos, total investido e variáveis do freio)
+é salvo em disco. Na execução seguinte, se a configuração e o histórico já
+processado não mudaram, o motor continua do estado salvo e processa apenas os
+pregões novos, cujas saídas são anexadas às anteriores.
+
+O checkpoint é descartado automaticamente (e o cenário é recalculado desde o
+início) quando muda qualquer parâmetro do cenário, a lista de tickers, a data
+de início ou algum dado já processado (preços, dividendos, CDI ou IPCA).
+"""
+
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+# Incrementar quando o formato do estado salvo mudar
+VERSAO_CHECKPOINT = 3
+
+
+def config_fingerprint(cenario, tickers, data_inicio, parametros):
+    """Resumo (hash) da configuração de um cenário: parâmetros, tickers e início do período."""
+    chave = (VERSAO_CHECKPOINT, cenario, list(tickers), str(data_inicio), sorted(parametros.items()))
+    return hashlib.sha256(repr(chave).encode('utf-8')).hexdigest()
+
+
+def history_fingerprint(panel, tickers, n_dias):
+    """Resumo (hash) dos dados de mercado dos primeiros `n_dias` pregões do painel."""
+    h = hashlib.sha256()
+    h.update(np.asarray(panel.dates[:n_dias].asi8).tobytes())
+    close, dividends = panel.arrays(tickers)
+    for matriz in (close[:n_dias], dividends[:n_dias]):
+        # NaN com representações diferentes em bits devem gerar o mesmo hash
+        h.update(np.where(np.isnan(matriz), np.nan, matriz).tobytes())
+    fim = panel.posicao_pregao[n_dias - 1] + 1 if n_dias else 0
+    if panel.indice_benchmark is not None:
+        h.update(panel.indice_benchmark[:fim].tobytes())
+    h.update(panel.ipca_acumulado[:fim].tobytes())
+    return h.hexdigest()
+
+
+def load_checkpoint(path):
+    """Lê um checkpoint salvo; retorna None se não existir ou estiver corrompido."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"AVISO: checkpoint '{path}' ignorado ({e}).")
+        return None
+
+
+def save_checkpoint(path, dados):
+    """Grava o checkpoint de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporario = path + '.tmp'
+    with open(temporario, 'wb') as f:
+        pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, path)
+
+
+def append_results(anterior, novo, deslocamento):
+    """Anexa as saídas do motor para os pregões novos às saídas já salvas.
+
+    Vetores e matrizes são concatenados no eixo dos dias, listas de eventos são
+    estendidas e dicionários indexados por pregão têm as chaves deslocadas; o
+    estado final é o da execução nova.
+    """
+    resultado = {}
+    for chave, valor in novo.items():
+        if chave == 'estado':
+            resultado[chave] = valor
+        elif isinstance(valor, dict):
+            resultado[chave] = {**anterior[chave], **{i + deslocamento: v for i, v in valor.items()}}
+        elif isinstance(valor, list):
+            resultado[chave] = anterior[chave] + valor
+        else:
+            resultado[chave] = np.concatenate([anterior[chave], valor])
+    return resultado
+
+
+def run_engine(nome, diretorio, panel, tickers, parametros, motor):
+    """Executa o motor de um cenário, continuando do checkpoint quando possível.
+
+    `motor(inicio, estado)` deve simular os pregões `panel.dates[inicio:]` a
+    partir de `estado` (None para começar do zero) e retornar as saídas do
+    motor com a chave 'estado'. Sem `diretorio`, o motor é executado por
+    inteiro e nada é salvo.
+    """
+    if diretorio is None:
+        return motor(0, None)
+
+    path = os.path.join(diretorio, f"{nome}.pkl")
+    n_dias = len(panel.dates)
+    configuracao = config_fingerprint(nome, tickers, panel.calendar[0] if len(panel.calendar) else None, parametros)
+
+    salvo = load_checkpoint(path)
+    valido = (
+        salvo is not None
+        and salvo.get('config') == configuracao
+        and 0 < salvo['dias'] <= n_dias
+        and salvo['historico'] == history_fingerprint(panel, tickers, salvo['dias'])
+    )
+
+    if valido and salvo['dias'] == n_dias:
+        print(f"Checkpoint '{nome}': nenhum pregão novo.")
+        return salvo['resultado']
+    if valido:
+        inicio = salvo['dias']
+        resultado = append_results(salvo['resultado'], motor(inicio, salvo['resultado']['estado']), inicio)
+        print(f"Checkpoint '{nome}': {n_dias - inicio} pregão(ões) novo(s) processado(s).")
+    else:
+        if salvo is not None:
+            print(f"Checkpoint '{nome}' invalidado (configuração ou histórico alterados). Recalculando.")
+        resultado = motor(0, None)
+
+    if n_dias:
+        save_checkpoint(path, {
+            'config': configuracao,
+            'dias': n_dias,
+            'historico': history_fingerprint(panel, tickers, n_dias),
+            'resultado': resultado,
+        })
+    return resultado
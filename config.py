@@ -53,6 +53,55 @@ DATA_FIM = datetime.today().strftime('%Y-%m-%d')
 # Se o arquivo de dados for mais antigo que este número de dias, um novo download será feito.
 DATA_UPDATE_DAYS = 1
 
+# Atualização incremental: um cache desatualizado baixa apenas os registros que faltam, mais os últimos
+# ATUALIZACAO_SOBREPOSICAO registros já salvos, que precisam coincidir (a menos de ATUALIZACAO_TOLERANCIA,
+# relativa) com os baixados de novo. Se não coincidirem (ex.: preços ajustados após um dividendo),
+# a série inteira é baixada de novo. False baixa sempre o período inteiro.
+ATUALIZACAO_INCREMENTAL = True
+ATUALIZACAO_SOBREPOSICAO = 3
+ATUALIZACAO_TOLERANCIA = 1e-6
+
+# Manifesto do cache: para cada arquivo em data/, o período coberto, a fonte (yfinance, MetaTrader 5 ou SGS),
+# o modo de ajuste, o número de linhas e o checksum. Pedidos já cobertos são atendidos sem acesso à rede
+# e arquivos truncados ou corrompidos são baixados de novo. None desativa o manifesto.
+CACHE_MANIFEST = "data/manifest.json"
+
+# Downloads de ações em paralelo: número máximo de tickers baixados ao mesmo tempo.
+DOWNLOAD_WORKERS = 8
+
+# Número máximo de tickers por requisição no download em lote do yfinance. Tickers que vierem
+# vazios no lote são baixados individualmente. 1 desativa o download em lote.
+DOWNLOAD_LOTE = 25
+
+# Tentativas por ticker em caso de erro de rede; a espera entre elas começa em
+# DOWNLOAD_ESPERA_INICIAL segundos e dobra a cada nova tentativa.
+DOWNLOAD_TENTATIVAS = 3
+DOWNLOAD_ESPERA_INICIAL = 1.0
+
+# Variação aleatória (fração, para mais ou para menos) de cada espera entre tentativas.
+DOWNLOAD_JITTER = 0.5
+
+# Gravação e reprodução das fontes de dados (providers.py), para testes e medições sem rede:
+# None consulta as fontes normalmente; 'gravar' também grava cada resposta em PROVEDOR_DIRETORIO;
+# 'reproduzir' serve apenas as respostas gravadas, com PROVEDOR_LATENCIA segundos por consulta
+# (variando em até PROVEDOR_JITTER, fração) e falhas simuladas com probabilidade PROVEDOR_TAXA_FALHAS.
+PROVEDOR_MODO = None
+PROVEDOR_DIRETORIO = "data/fixtures/"
+PROVEDOR_LATENCIA = 0.0
+PROVEDOR_JITTER = 0.0
+PROVEDOR_TAXA_FALHAS = 0.0
+PROVEDOR_SEMENTE = 42
+
+# Blocos das séries do Banco Central (CDI/SELIC e IPCA) baixados ao mesmo tempo, por série.
+BCB_WORKERS = 4
+
+# Limite global de requisições por segundo (somando todos os downloads em paralelo). None = sem limite.
+DOWNLOAD_REQUISICOES_POR_SEGUNDO = 4
+
+# Diretório do painel consolidado de ações (matrizes .npy de Close e Dividends por data x ticker),
+# lido com memory mapping no lugar dos CSVs por ticker. None desativa o painel e usa apenas os CSVs.
+PANEL_STORE_DIR = "data/panel/"
+
 
 # --- Configuração de Benchmarks ---
 
@@ -65,6 +114,10 @@ BENCHMARK_NAME = "CDI"
 # Ex: 6.0 para IPCA + 6%
 IPCA_BENCHMARK_X = 6.0
 
+# Diretório onde os índices acumulados do CDI e do IPCA + X são guardados entre
+# execuções (um arquivo .npy por série, período e X). None desativa o cache em disco.
+BENCHMARK_CACHE_DIR = "data/benchmarks/"
+
 
 # --- Configuração do Cenário 1: Aporte Único ---
 
@@ -97,11 +150,22 @@ SAVE_PLOTS = True
 # Diretório para salvar os gráficos.
 PLOT_DIR = "results/plots/"
 
-# Nomes dos arquivos de saída para os resultados em Excel.
+# Nomes dos arquivos de saída para os resultados (em Excel, por padrão).
 ARQUIVO_RESULTADOS_APORTE_UNICO = "backtest_results_lump_sum.xlsx"
 ARQUIVO_RESULTADOS_APORTES_MENSAIS = "backtest_results_monthly.xlsx"
 ARQUIVO_RESULTADOS_APORTES_CDB = "backtest_results_cdb_mixed.xlsx"
 
+# Formatos dos resultados: 'xlsx' (gravado em fluxo, com memória constante), 'csv' e 'parquet'
+# (requer o pacote pyarrow). Cada formato troca a extensão dos nomes acima.
+FORMATOS_EXPORTACAO = ['xlsx']
+
+# Exportar também o resultado diário (além dos fechamentos mensais): uma aba a mais no
+# xlsx e um arquivo com o sufixo '_diario' nos demais formatos.
+EXPORTAR_DIARIO = False
+
+# Número máximo de cenários exportados ao mesmo tempo.
+EXPORTACAO_WORKERS = 3
+
 
 # --- Configuração do MetaTrader 5 ---
 
@@ -130,3 +194,78 @@ FREIO_QUARENTENA_INICIAL = 6
 
 # Duração adicional da quarentena (em meses) se o ativo ativar o freio novamente.
 FREIO_QUARENTENA_ADICIONAL = 12
+
+
+# --- Configuração da Varredura de Parâmetros (sweep.py) ---
+
+# Valores a testar para cada parâmetro. Parâmetros ausentes usam o valor deste arquivo.
+# NUMERO_EMPRESAS_POR_APORTE e FREIO_* variam o Cenário 2; CDB_PERCENTAGE varia o Cenário 3.
+SWEEP_GRID = {
+    'NUMERO_EMPRESAS_POR_APORTE': [1, 2, 3],
+    'FREIO_PERIODO_APORTES': [2, 3],
+    'FREIO_QUARENTENA_INICIAL': [3, 6],
+    'FREIO_QUARENTENA_ADICIONAL': [6, 12],
+    'CDB_PERCENTAGE': [0.0, 0.1, 0.25, 0.5],
+}
+
+# Modo de execução da varredura:
+# 'lote' simula todas as combinações juntas em um único processo (mais rápido para grades grandes);
+# 'processos' distribui cada combinação em um pool de processos.
+SWEEP_MODO = 'lote'
+
+# Número de processos da varredura no modo 'processos'. None usa todos os núcleos da máquina.
+SWEEP_WORKERS = None
+
+# Arquivo (CSV, na pasta results/) com a tabela de resumo da varredura.
+ARQUIVO_RESULTADOS_SWEEP = "sweep_results.csv"
+
+
+# --- Configuração da Análise por Safra (vintage.py) ---
+
+# Horizonte mínimo (em meses) entre o início de uma safra e DATA_FIM para que ela entre na análise.
+VINTAGE_HORIZONTE_MINIMO_MESES = 12
+
+# Arquivo (CSV, na pasta results/) com os resultados de cada safra.
+ARQUIVO_RESULTADOS_SAFRAS = "vintage_results.csv"
+
+
+# --- Configuração da Simulação de Monte Carlo (monte_carlo.py) ---
+
+# Número de trajetórias sintéticas simuladas.
+MC_CAMINHOS = 10000
+
+# Horizonte de cada trajetória, em anos.
+MC_ANOS = 10
+
+# Tamanho (em meses) dos blocos de histórico sorteados no bootstrap.
+# Blocos maiores preservam melhor as tendências e ciclos do mercado; blocos menores geram trajetórias mais variadas.
+MC_BLOCO_MESES = 12
+
+# Semente do gerador de números aleatórios (None para resultados diferentes a cada execução).
+MC_SEMENTE = 42
+
+# Percentis das curvas de leque e do resumo da distribuição final.
+MC_PERCENTIS = (5, 25, 50, 75, 95)
+
+# Arquivos (CSV, na pasta results/) com o leque de percentis por mês e os resultados finais de cada trajetória.
+ARQUIVO_RESULTADOS_MC_LEQUE = "monte_carlo_fan.csv"
+ARQUIVO_RESULTADOS_MC_DISTRIBUICAO = "monte_carlo_distribution.csv"
+
+
+# --- Formato dos Resultados ---
+
+# Com True, os cenários retornam um resultado compacto (results.CompactResult): apenas os pregões,
+# valores por ticker em float32 e um livro de aportes e de eventos do freio no lugar das colunas de texto.
+# Ocupa algumas vezes menos memória; o Excel e os gráficos são gerados a partir de `to_frame()` (um valor por pregão).
+RESULTADO_COMPACTO = False
+
+
+# --- Configuração dos Checkpoints (execução incremental) ---
+
+# Salva o estado final de cada cenário para que a próxima execução processe apenas os pregões novos.
+# O checkpoint é recalculado automaticamente se a configuração ou o histórico já processado mudarem.
+# Desativado por padrão: ative para execuções diárias sobre o mesmo período.
+CHECKPOINT_ATIVO = False
+
+# Diretório dos checkpoints.
+CHECKPOINT_DIR = "results/checkpoints/"
@@ -1,19 +1,58 @@
 # -*- coding: utf-8 -*-
 
+import importlib
 import os
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-import yfinance as yf
-from bcb import sgs
 from datetime import datetime, timedelta
-import MetaTrader5 as mt5
+import cache_manifest
 import config
+import panel_store
+import providers
 from config import DATA_UPDATE_DAYS, BENCHMARK_SERIES_CODE, BENCHMARK_NAME
 
+# Dependências das fontes de dados, importadas só no primeiro uso (ver `_dependencia`):
+# juntas, custam mais que o resto da inicialização, e uma execução atendida pelo
+# cache não usa nenhuma delas. O MetaTrader5 só existe para Windows.
+_DEPENDENCIAS = {'yf': 'yfinance', 'sgs': 'bcb.sgs', 'mt5': 'MetaTrader5'}
+
+def _dependencia(nome):
+    """Importa (na primeira chamada) e retorna a dependência `nome` de `_DEPENDENCIAS`."""
+    modulo = globals().get(nome)
+    if modulo is None:
+        modulo = importlib.import_module(_DEPENDENCIAS[nome])
+        globals()[nome] = modulo
+    return modulo
+
+def _mt5_module():
+    """Pacote MetaTrader5, ou None se ele não estiver instalado (ex.: Linux)."""
+    try:
+        return _dependencia('mt5')
+    except ImportError:
+        return None
+
+def __getattr__(nome):
+    # `data_loader.yf`, `data_loader.sgs` e `data_loader.mt5` continuam acessíveis (ex.: em testes)
+    if nome == 'mt5':
+        return _mt5_module()
+    if nome in _DEPENDENCIAS:
+        return _dependencia(nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
 # --- Constantes de Arquivos e Séries ---
 STOCK_DATA_FILE = "stock_data.csv"
 IPCA_SERIES_CODE = 433
 
+# Colunas dos caches de ações usadas pelos cenários (as demais não são lidas)
+CAMPOS_CENARIOS = ('Close', 'Dividends')
+
+# Folga entre a data inicial pedida e o primeiro registro do cache (fins de semana e feriados no início do período)
+FOLGA_INICIO_CACHE = pd.Timedelta(days=7)
+
 def _is_cache_valid(file_path):
     """Verifica se um arquivo de cache é válido com base na data de modificação."""
     if not os.path.exists(file_path):
@@ -23,10 +62,128 @@ def _is_cache_valid(file_path):
         return True
     return False
 
-def connect_mt5():
-    """Conecta ao terminal MetaTrader 5."""
+def _load_manifest():
+    """Manifesto do cache (`config.CACHE_MANIFEST`); None se desativado."""
+    return cache_manifest.CacheManifest(config.CACHE_MANIFEST) if config.CACHE_MANIFEST else None
+
+def _cache_status(file_path, start_date, end_date, manifesto):
+    """Situação de um arquivo de cache para o período pedido.
+
+    Retorna 'valido' (usar sem acesso à rede: recente ou com o período coberto
+    segundo o manifesto), 'desatualizado' (candidato à atualização incremental)
+    ou None (ausente, corrompido ou sem o início pedido: baixar tudo).
+    """
+    if manifesto is not None:
+        if not manifesto.verify(file_path):
+            print(f"AVISO: cache '{file_path}' não confere com o manifesto (arquivo truncado ou corrompido). Baixando de novo.")
+            return None
+        if manifesto.get(file_path) is not None and not manifesto.covers(file_path, start_date):
+            print(f"Cache '{file_path}' não cobre o início pedido ({start_date}). Baixando de novo.")
+            return None
+        if manifesto.covers(file_path, start_date, end_date):
+            return 'valido'
+    if _is_cache_valid(file_path):
+        return 'valido'
+    return 'desatualizado' if os.path.exists(file_path) else None
+
+def _record_cache(manifesto, file_path, inicio, fim, fonte, ajuste=None, incremental=False):
+    """Registra no manifesto um arquivo de cache recém-gravado (nada se o manifesto estiver desativado).
+
+    Uma atualização incremental (`incremental`) mantém o início já coberto pelo arquivo.
+    """
+    if manifesto is None:
+        return
+    if incremental and manifesto.covers(file_path, inicio):
+        inicio = manifesto.get(file_path)['inicio']
+    manifesto.record(file_path, inicio, fim, fonte, ajuste)
+
+def delta_start(cached, start_date, sobreposicao=None, inicio_coberto=False):
+    """Data inicial da atualização incremental de um cache.
+
+    Os últimos `sobreposicao` registros do cache são baixados de novo, para
+    conferir se a série não mudou. Retorna None quando o cache não cobre o
+    início do período pedido (é preciso baixar a série inteira). Sem registro no
+    manifesto (`inicio_coberto` False), a cobertura do início é estimada pelo
+    primeiro registro do cache.
+    """
+    sobreposicao = config.ATUALIZACAO_SOBREPOSICAO if sobreposicao is None else sobreposicao
+    if cached.empty:
+        return None
+    if not inicio_coberto and cached.index[0] > pd.Timestamp(start_date) + FOLGA_INICIO_CACHE:
+        return None
+    return cached.index[-min(max(sobreposicao, 1), len(cached))].strftime('%Y-%m-%d')
+
+def merge_delta(cached, novos, coluna, tolerancia=None):
+    """Junta ao cache os registros de uma atualização incremental.
+
+    Os valores de `coluna` nas datas presentes nos dois precisam coincidir (a
+    menos de `tolerancia`, relativa); caso contrário, ou se não houver datas em
+    comum, retorna None e a série deve ser baixada por inteiro (ex.: preços
+    ajustados recalculados depois de um dividendo).
+    """
+    tolerancia = config.ATUALIZACAO_TOLERANCIA if tolerancia is None else tolerancia
+    if novos is None or novos.empty or coluna not in novos.columns:
+        return None
+    comuns = cached.index.intersection(novos.index)
+    if comuns.empty:
+        return None
+    antigos = cached.loc[comuns, coluna].to_numpy(dtype=np.float64)
+    recentes = novos.loc[comuns, coluna].to_numpy(dtype=np.float64)
+    if not np.allclose(antigos, recentes, rtol=tolerancia, atol=0.0, equal_nan=True):
+        return None
+    anteriores = cached.loc[cached.index < novos.index.min()]
+    return pd.concat([anteriores, novos.reindex(columns=cached.columns)])
+
+def _save_csv_atomic(df, file_path):
+    """Grava o CSV em um arquivo temporário e o renomeia, para que um cache nunca fique pela metade."""
+    temporario = file_path + '.tmp'
+    df.to_csv(temporario)
+    os.replace(temporario, file_path)
+
+def _update_bcb_series(file_path, series_code, series_name, start_date, end_date, manifesto=None):
+    """Atualização incremental de uma série do BCB em cache: baixa apenas os registros que faltam.
+
+    Retorna a série atualizada (já gravada em `file_path`) ou None quando é
+    preciso baixar a série inteira.
+    """
+    if not config.ATUALIZACAO_INCREMENTAL or not os.path.exists(file_path):
+        return None
+    anterior = pd.read_csv(file_path, index_col=0, parse_dates=True)
+    inicio = delta_start(anterior, start_date, inicio_coberto=manifesto is not None and manifesto.covers(file_path, start_date))
+    if inicio is None:
+        return None
+
+    print(f"Atualizando {series_name} a partir de {inicio}...")
+    novos = download_bcb_series(series_code, series_name, inicio, end_date)
+    if novos is None or novos.empty:
+        return None
+    novos.index = pd.to_datetime(novos.index)
+    atualizado = merge_delta(anterior, novos, series_name)
+    if atualizado is None:
+        print(f"AVISO: os registros já salvos de {series_name} mudaram. Baixando a série inteira.")
+        return None
+    _save_csv_atomic(atualizado, file_path)
+    _record_cache(manifesto, file_path, start_date, end_date, 'sgs', incremental=True)
+    print(f"{series_name}: {len(atualizado) - len(anterior)} registro(s) novo(s) salvos em '{file_path}'.")
+    return atualizado
+
+def _mt5_source():
+    """Pacote MetaTrader5 das sessões: real, gravando ou reproduzindo (None se não estiver instalado)."""
+    if config.PROVEDOR_MODO == 'reproduzir':
+        return providers.MT5Provider(None)
+    modulo = _mt5_module()
+    if modulo is None:
+        print("AVISO: pacote MetaTrader5 não instalado. O fallback via MetaTrader 5 está desativado.")
+        return None
+    return providers.MT5Provider(modulo) if config.PROVEDOR_MODO else modulo
+
+def connect_mt5(modulo=None):
+    """Conecta ao terminal MetaTrader 5 (`modulo`: substituto do pacote MetaTrader5, ex.: em testes)."""
+    modulo = _mt5_source() if modulo is None else modulo
+    if modulo is None:
+        return False
     for i in range(config.MT5_RETRIES):
-        if mt5.initialize():
+        if modulo.initialize():
             print("Conectado ao MetaTrader 5.")
             return True
         else:
@@ -35,61 +192,110 @@ def connect_mt5():
     print("Não foi possível conectar ao MetaTrader 5.")
     return False
 
-def download_mt5_data(ticker, start_date, end_date):
-    """Baixa dados históricos do MetaTrader 5."""
-    if not connect_mt5():
-        return None
+class MT5Session:
+    """Sessão com o terminal do MetaTrader 5, aberta uma vez e reutilizada por vários tickers.
 
-    rates = mt5.copy_rates_from_pos(ticker, mt5.TIMEFRAME_D1, 0, 99999)
-    mt5.shutdown()
+    A conexão só é feita no primeiro uso e o resultado é lembrado: se o terminal
+    não responder, os tickers seguintes não repetem as tentativas de conexão.
+    `modulo` permite usar um substituto do pacote MetaTrader5 (ex.: em testes);
+    com `config.PROVEDOR_MODO`, as barras são gravadas ou reproduzidas (ver `providers.py`).
+    O pacote só é importado na conexão; sem ele, a sessão simplesmente não conecta.
+    """
 
-    if rates is None:
-        print(f"Nenhum dado encontrado para {ticker} no MetaTrader 5.")
-        return None
+    def __init__(self, modulo=None):
+        self.mt5 = modulo
+        self.conectado = None       # None = conexão ainda não tentada
 
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    df.set_index('time', inplace=True)
-    df.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'tick_volume': 'Volume'}, inplace=True)
-    df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
-    
+    def connect(self):
+        if self.conectado is None:
+            if self.mt5 is None:
+                self.mt5 = _mt5_source()
+            self.conectado = self.mt5 is not None and connect_mt5(self.mt5)
+        return self.conectado
+
+    def close(self):
+        if self.conectado:
+            self.mt5.shutdown()
+        self.conectado = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.close()
+
+def rates_to_frame(rates):
+    """Converte o array estruturado de barras do MT5 para o formato dos caches de ações.
+
+    As colunas do DataFrame são as próprias colunas do array (sem cópia
+    intermediária do array inteiro); apenas o horário é convertido para datas.
+    """
+    datas = pd.DatetimeIndex(rates['time'].astype('datetime64[s]'), name='Date')
+    colunas = {'Open': rates['open'], 'High': rates['high'], 'Low': rates['low'], 'Close': rates['close'], 'Volume': rates['tick_volume']}
+    df = pd.DataFrame(colunas, index=datas, copy=False)
     # O MT5 não fornece dados de dividendos, então criamos uma coluna de zeros.
     df['Dividends'] = 0.0
-    
     return df
 
-def download_bcb_series(series_code, series_name, start_date, end_date, chunk_years=3):
-    """Baixa séries temporais do BCB com lógica de retentativa e chunking."""
-    print(f"Baixando dados para {series_name}...")
+def download_mt5_data(ticker, start_date, end_date, sessao=None):
+    """Baixa do MetaTrader 5 as barras diárias de `start_date` a `end_date`.
+
+    Com `sessao` (ver `MT5Session`), a conexão é reaproveitada entre tickers;
+    sem ela, a conexão é aberta e fechada só para este ticker.
+    """
+    if sessao is None:
+        with MT5Session() as sessao:
+            return download_mt5_data(ticker, start_date, end_date, sessao)
+    if not sessao.connect():
+        return None
+
+    inicio = pd.Timestamp(start_date).tz_localize('UTC').to_pydatetime()
+    fim = pd.Timestamp(end_date).tz_localize('UTC').to_pydatetime()
+    rates = sessao.mt5.copy_rates_range(ticker, sessao.mt5.TIMEFRAME_D1, inicio, fim)
+
+    if rates is None or len(rates) == 0:
+        print(f"Nenhum dado encontrado para {ticker} no MetaTrader 5.")
+        return None
+    return rates_to_frame(rates)
+
+def bcb_chunks(start_date, end_date, chunk_years=3):
+    """Divide o período em blocos de até `chunk_years` anos (limite de cada consulta ao SGS)."""
     chunks = []
     temp_start = pd.to_datetime(start_date)
     end_date_dt = pd.to_datetime(end_date)
-
-    chunk_count = 0
     while temp_start < end_date_dt:
-        temp_end = temp_start + pd.DateOffset(years=chunk_years)
-        if temp_end > end_date_dt:
-            temp_end = end_date_dt
-
-        chunk_count += 1
-        print(f"  Chunk {chunk_count}: {temp_start.strftime('%Y-%m-%d')} a {temp_end.strftime('%Y-%m-%d')}")
-
-        for attempt in range(3):
-            try:
-                chunk = sgs.get({series_name: series_code}, start=temp_start.strftime('%Y-%m-%d'), end=temp_end.strftime('%Y-%m-%d'))
-                if not chunk.empty:
-                    chunks.append(chunk)
-                    print(f"  OK: {len(chunk)} registros baixados")
-                break
-            except Exception as e:
-                print(f"  Tentativa {attempt + 1} falhou: {str(e)[:80]}")
-                if attempt < 2:
-                    time.sleep(2)
-                else:
-                    print(f"  ERRO: Falha apos 3 tentativas")
-                    break
-
+        temp_end = min(temp_start + pd.DateOffset(years=chunk_years), end_date_dt)
+        chunks.append((temp_start.strftime('%Y-%m-%d'), temp_end.strftime('%Y-%m-%d')))
         temp_start = temp_end + pd.DateOffset(days=1)
+    return chunks
+
+def download_bcb_series(series_code, series_name, start_date, end_date, chunk_years=3, max_workers=None):
+    """Baixa séries temporais do BCB com lógica de retentativa e chunking.
+
+    Os blocos são baixados em paralelo (até `config.BCB_WORKERS` ao mesmo tempo),
+    cada um com novas tentativas e espera exponencial com jitter; o tempo total
+    fica limitado pelo bloco mais lento. Registros repetidos nas fronteiras dos
+    blocos são descartados.
+    """
+    print(f"Baixando dados para {series_name}...")
+    max_workers = config.BCB_WORKERS if max_workers is None else max_workers
+    periodos = bcb_chunks(start_date, end_date, chunk_years)
+    buscar = get_provider('sgs')
+
+    def baixar(numero, inicio, fim):
+        chunk = fetch_with_retry(lambda: buscar(series_name, series_code, inicio, fim),
+                                 f"{series_name} ({inicio} a {fim}) via SGS")
+        if chunk is not None and not chunk.empty:
+            print(f"  Chunk {numero}: {inicio} a {fim} OK: {len(chunk)} registros baixados")
+            return chunk
+        return None
+
+    chunks = []
+    if periodos:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(periodos)))) as executor:
+            futuros = [executor.submit(baixar, k + 1, inicio, fim) for k, (inicio, fim) in enumerate(periodos)]
+            # Na ordem dos blocos, para que a remoção de duplicatas mantenha sempre o bloco mais antigo
+            chunks = [c for c in (f.result() for f in futuros) if c is not None]
 
     if not chunks:
         print(f"ERRO: Nenhum dado foi baixado para {series_name}")
@@ -104,90 +310,413 @@ def get_ipca_data(start_date, end_date):
     """Busca os dados do IPCA, com cache em arquivo CSV."""
     os.makedirs('data', exist_ok=True)
     file_path = 'data/IPCA.csv'
+    manifesto = _load_manifest()
+    situacao = _cache_status(file_path, start_date, end_date, manifesto)
     
-    if _is_cache_valid(file_path):
+    if situacao == 'valido':
         print(f"Usando cache para IPCA de '{file_path}'.")
         return pd.read_csv(file_path, index_col=0, parse_dates=True)
+
+    ipca_df = None
+    if situacao == 'desatualizado':
+        ipca_df = _update_bcb_series(file_path, IPCA_SERIES_CODE, 'ipca', start_date, end_date, manifesto)
     
-    print("Baixando novos dados para IPCA...")
-    ipca_df = download_bcb_series(IPCA_SERIES_CODE, 'ipca', start_date, end_date)
-    if ipca_df is not None and not ipca_df.empty:
-        ipca_df.to_csv(file_path)
-        print(f"Novos dados de IPCA salvos em '{file_path}'.")
+    if ipca_df is None:
+        print("Baixando novos dados para IPCA...")
+        ipca_df = download_bcb_series(IPCA_SERIES_CODE, 'ipca', start_date, end_date)
+        if ipca_df is not None and not ipca_df.empty:
+            ipca_df.to_csv(file_path)
+            _record_cache(manifesto, file_path, start_date, end_date, 'sgs')
+            print(f"Novos dados de IPCA salvos em '{file_path}'.")
+    if manifesto is not None:
+        manifesto.save()
     return ipca_df
 
 def get_benchmark_data(start_date, end_date):
     """Busca os dados do benchmark (CDI ou SELIC), com cache em arquivo CSV."""
     os.makedirs('data', exist_ok=True)
     file_path = f'data/{BENCHMARK_NAME}.csv'
+    manifesto = _load_manifest()
+    situacao = _cache_status(file_path, start_date, end_date, manifesto)
 
-    if _is_cache_valid(file_path):
+    if situacao == 'valido':
         print(f"Usando cache para {BENCHMARK_NAME} de '{file_path}'.")
         return pd.read_csv(file_path, index_col=0, parse_dates=True)
 
-    print(f"Baixando novos dados para {BENCHMARK_NAME}...")
-    benchmark_df = download_bcb_series(BENCHMARK_SERIES_CODE, BENCHMARK_NAME.lower(), start_date, end_date)
-    if benchmark_df is not None and not benchmark_df.empty:
-        benchmark_df.to_csv(file_path)
-        print(f"Novos dados de {BENCHMARK_NAME} salvos em '{file_path}'.")
+    benchmark_df = None
+    if situacao == 'desatualizado':
+        benchmark_df = _update_bcb_series(file_path, BENCHMARK_SERIES_CODE, BENCHMARK_NAME.lower(), start_date, end_date, manifesto)
+
+    if benchmark_df is None:
+        print(f"Baixando novos dados para {BENCHMARK_NAME}...")
+        benchmark_df = download_bcb_series(BENCHMARK_SERIES_CODE, BENCHMARK_NAME.lower(), start_date, end_date)
+        if benchmark_df is not None and not benchmark_df.empty:
+            benchmark_df.to_csv(file_path)
+            _record_cache(manifesto, file_path, start_date, end_date, 'sgs')
+            print(f"Novos dados de {BENCHMARK_NAME} salvos em '{file_path}'.")
+    if manifesto is not None:
+        manifesto.save()
     return benchmark_df
 
-def download_stock_data(tickers, start_date, end_date):
-    """Baixa dados históricos de ações, com cache para cada ticker individualmente."""
+class RateLimiter:
+    """Limite global de requisições por segundo, compartilhado entre as threads de download."""
+
+    def __init__(self, por_segundo, relogio=time.monotonic, dormir=time.sleep):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._relogio = relogio
+        self._dormir = dormir
+        self._proxima = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Bloqueia até o próximo horário livre; as requisições ficam espaçadas de `intervalo` segundos."""
+        with self._lock:
+            agora = self._relogio()
+            horario = max(agora, self._proxima)
+            self._proxima = horario + self.intervalo
+        if horario > agora:
+            self._dormir(horario - agora)
+
+def fetch_with_retry(buscar, descricao, tentativas=None, espera_inicial=None, limitador=None, dormir=time.sleep):
+    """Executa `buscar()` com novas tentativas em caso de exceção e espera exponencial (com jitter) entre elas.
+
+    Retorna o resultado de `buscar()` ou None se todas as tentativas falharem.
+    """
+    tentativas = config.DOWNLOAD_TENTATIVAS if tentativas is None else tentativas
+    espera_inicial = config.DOWNLOAD_ESPERA_INICIAL if espera_inicial is None else espera_inicial
+    for tentativa in range(tentativas):
+        if limitador is not None:
+            limitador.wait()
+        try:
+            return buscar()
+        except providers.MissingRecording as e:
+            # Uma gravação ausente não aparece em uma nova tentativa
+            print(f"ERRO ao baixar dados para {descricao}: {e}")
+            return None
+        except Exception as e:
+            if tentativa == tentativas - 1:
+                print(f"ERRO ao baixar dados para {descricao}: {e}")
+                return None
+            # O jitter evita que as threads que falharam juntas tentem de novo no mesmo instante
+            espera = espera_inicial * 2 ** tentativa * random.uniform(1 - config.DOWNLOAD_JITTER, 1 + config.DOWNLOAD_JITTER)
+            print(f"  Tentativa {tentativa + 1}/{tentativas} para {descricao} falhou ({str(e)[:80]}). Nova tentativa em {espera:.1f}s.")
+            dormir(espera)
+    return None
+
+def yfinance_provider(ticker, start_date, end_date):
+    """Provedor padrão de cotações: um ticker via yfinance (DataFrame possivelmente vazio)."""
+    return _dependencia('yf').download(ticker, start=start_date, end=end_date, auto_adjust=True, progress=False, multi_level_index=False)
+
+def yfinance_batch_provider(tickers, start_date, end_date):
+    """Provedor em lote: vários tickers em uma única chamada ao yfinance (colunas (ticker, campo))."""
+    return _dependencia('yf').download(tickers, start=start_date, end=end_date, auto_adjust=True, progress=False, group_by='ticker')
+
+def sgs_provider(series_name, series_code, start_date, end_date):
+    """Provedor padrão das séries do Banco Central: um bloco de uma série via SGS."""
+    return _dependencia('sgs').get({series_name: series_code}, start=start_date, end=end_date)
+
+def get_provider(nome):
+    """Provedor de dados `nome` ('yfinance', 'yfinance_lote' ou 'sgs').
+
+    Conforme `config.PROVEDOR_MODO`, as consultas vão direto à fonte, são
+    gravadas ou são reproduzidas das gravações (ver `providers.py`).
+    """
+    reais = {'yfinance': yfinance_provider, 'yfinance_lote': yfinance_batch_provider, 'sgs': sgs_provider}
+    return providers.wrap(nome, reais[nome])
+
+def split_batch(dados, tickers):
+    """Separa o DataFrame de um download em lote em um DataFrame por ticker.
+
+    Tickers ausentes ou sem nenhuma cotação no lote ficam de fora do resultado.
+    """
+    por_ticker = {}
+    if dados is None or dados.empty or not isinstance(dados.columns, pd.MultiIndex):
+        return por_ticker
+    presentes = set(dados.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in presentes:
+            continue
+        ticker_data = dados[ticker].dropna(how='all')
+        if not ticker_data.empty:
+            ticker_data.columns.name = None
+            por_ticker[ticker] = ticker_data.sort_index(axis=1)
+    return por_ticker
+
+def download_batches(tickers, start_date, end_date, batch_provider=None, tamanho_lote=None, max_workers=None, limitador=None):
+    """Baixa os tickers em lotes de até `tamanho_lote` por requisição e separa o resultado por ticker.
+
+    Os lotes são baixados em paralelo, com as mesmas novas tentativas e o mesmo
+    limite global de `download_tickers`. Retorna um dicionário ticker ->
+    DataFrame apenas com os tickers que vieram com dados; os demais devem ser
+    baixados individualmente.
+    """
+    batch_provider = get_provider('yfinance_lote') if batch_provider is None else batch_provider
+    tamanho_lote = config.DOWNLOAD_LOTE if tamanho_lote is None else tamanho_lote
+    max_workers = config.DOWNLOAD_WORKERS if max_workers is None else max_workers
+    if limitador is None:
+        limitador = RateLimiter(config.DOWNLOAD_REQUISICOES_POR_SEGUNDO)
+
+    lotes = [tickers[i:i + tamanho_lote] for i in range(0, len(tickers), tamanho_lote)]
+
+    def baixar(lote):
+        dados = fetch_with_retry(lambda: batch_provider(lote, start_date, end_date), f"lote de {len(lote)} tickers via yfinance", limitador=limitador)
+        return split_batch(dados, lote)
+
+    por_ticker = {}
+    if not lotes:
+        return por_ticker
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(lotes)))) as executor:
+        for resultado in executor.map(baixar, lotes):
+            por_ticker.update(resultado)
+    return por_ticker
+
+def download_tickers(tickers, start_date, end_date, provider=None, max_workers=None, limitador=None):
+    """Baixa vários tickers em paralelo, com um pool limitado de threads.
+
+    Cada ticker é baixado por `provider(ticker, start_date, end_date)` (padrão:
+    yfinance) com novas tentativas e espera exponencial em caso de erro, e
+    todas as requisições respeitam o limite global de `limitador`. Retorna um
+    dicionário ticker -> DataFrame (None para os tickers sem dados).
+    """
+    provider = get_provider('yfinance') if provider is None else provider
+    max_workers = config.DOWNLOAD_WORKERS if max_workers is None else max_workers
+    if limitador is None:
+        limitador = RateLimiter(config.DOWNLOAD_REQUISICOES_POR_SEGUNDO)
+
+    def baixar(ticker):
+        return fetch_with_retry(lambda: provider(ticker, start_date, end_date), f"{ticker} via yfinance", limitador=limitador)
+
+    if not tickers:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as executor:
+        return dict(zip(tickers, executor.map(baixar, tickers)))
+
+def _download_group(pendentes, start_date, end_date, provider, batch_provider, max_workers, limitador):
+    """Baixa tickers com a mesma data inicial: primeiro em lotes, depois individualmente os que vierem vazios."""
+    # Lotes de um único ticker não ganham nada com a requisição em lote
+    baixados = {}
+    em_lote = provider is None or batch_provider is not None
+    if em_lote and config.DOWNLOAD_LOTE > 1 and len(pendentes) > 1:
+        baixados = download_batches(pendentes, start_date, end_date, batch_provider=batch_provider,
+                                    max_workers=max_workers, limitador=limitador)
+        if len(baixados) < len(pendentes):
+            print(f"{len(pendentes) - len(baixados)} ticker(s) sem dados no download em lote. Tentando individualmente...")
+    individuais = [t for t in pendentes if t not in baixados]
+    baixados.update(download_tickers(individuais, start_date, end_date, provider=provider,
+                                     max_workers=max_workers, limitador=limitador))
+    return baixados
+
+def _download_by_start(inicios, end_date, provider, batch_provider, max_workers, limitador):
+    """Baixa cada ticker a partir da sua data inicial (`inicios`: ticker -> data), agrupando os de mesma data."""
+    grupos = {}
+    for ticker, inicio in inicios.items():
+        grupos.setdefault(inicio, []).append(ticker)
+    baixados = {}
+    for inicio, grupo in grupos.items():
+        baixados.update(_download_group(grupo, inicio, end_date, provider, batch_provider, max_workers, limitador))
+    return baixados
+
+def download_stock_data(tickers, start_date, end_date, provider=None, max_workers=None, batch_provider=None):
+    """Baixa dados históricos de ações, com cache para cada ticker individualmente.
+
+    Os tickers com cache desatualizado baixam apenas os pregões que faltam (com
+    alguns pregões de sobreposição para conferência; ver `merge_delta`). Os
+    tickers sem cache válido são baixados em lotes de até `config.DOWNLOAD_LOTE`
+    tickers por requisição (ver `download_batches`); os que vierem vazios são
+    baixados individualmente em paralelo (ver `download_tickers`) e os que ainda
+    falharem são tentados, um a um, via MetaTrader 5. Com um `provider` próprio e
+    sem `batch_provider`, a etapa em lote é desativada.
+
+    Com `config.PANEL_STORE_DIR`, o resultado também é gravado no painel
+    consolidado (ver `panel_store.py`), que é lido diretamente nas execuções
+    seguintes enquanto cobrir o período pedido e contiver todos os tickers pedidos.
+    """
     print("--- VERIFICANDO DADOS DE AÇÕES ---")
     os.makedirs('data', exist_ok=True)
+
+    store_dir = config.PANEL_STORE_DIR
+    if store_dir and panel_store.panel_covers(store_dir, tickers, start_date, end_date):
+        store = panel_store.load_panel_store(store_dir)
+        if store is not None:
+            print(f"Usando painel consolidado de '{store_dir}' para {len(tickers)} ticker(s).")
+            dados = store.to_frame(tickers)
+            del store   # libera os mapeamentos em memória dos arquivos do painel
+            return dados, []
     
-    all_data = {}
+    all_data = {}           # ticker -> caminho do cache válido ou DataFrame baixado
     failed_tickers = []
 
+    manifesto = _load_manifest()
+    em_cache = {}
+    desatualizados = {}     # ticker -> cache antigo, atualizado apenas com os pregões que faltam
+    inicio_coberto = {}
     for ticker in tickers:
         file_path = f"data/{ticker}.csv"
-        ticker_data = None
-
-        if _is_cache_valid(file_path):
+        situacao = _cache_status(file_path, start_date, end_date, manifesto)
+        if situacao == 'valido':
             print(f"Usando cache para {ticker} de '{file_path}'.")
-            ticker_data = pd.read_csv(file_path, header=0, index_col=0, parse_dates=True)
+            em_cache[ticker] = file_path
+        elif situacao == 'desatualizado' and config.ATUALIZACAO_INCREMENTAL:
+            anterior = pd.read_csv(file_path, header=0, index_col=0, parse_dates=True)
+            inicio_coberto[ticker] = manifesto is not None and manifesto.covers(file_path, start_date)
+            if delta_start(anterior, start_date, inicio_coberto=inicio_coberto[ticker]) is not None:
+                desatualizados[ticker] = anterior
+
+    pendentes = [t for t in tickers if t not in em_cache]
+    if pendentes:
+        print(f"Baixando novos dados para {len(pendentes)} ticker(s) via yfinance "
+              f"({len(desatualizados)} com atualização incremental)...")
+    limitador = RateLimiter(config.DOWNLOAD_REQUISICOES_POR_SEGUNDO)
+    inicios = {t: delta_start(desatualizados[t], start_date, inicio_coberto=inicio_coberto[t]) if t in desatualizados else start_date
+               for t in pendentes}
+    baixados = _download_by_start(inicios, end_date, provider, batch_provider, max_workers, limitador)
+
+    # Atualizações cujo trecho sobreposto não confere com o cache são baixadas de novo desde o início
+    atualizados = {}
+    refazer = []
+    for ticker, anterior in desatualizados.items():
+        novos = baixados[ticker]
+        if novos is None or novos.empty:
+            continue
+        atualizado = merge_delta(anterior, novos, 'Close')
+        if atualizado is not None:
+            atualizados[ticker] = atualizado
         else:
-            print(f"Baixando novos dados para {ticker} via yfinance...")
-            try:
-                ticker_data = yf.download(ticker, start=start_date, end=end_date, auto_adjust=True, progress=False, multi_level_index=False)
-                if ticker_data.empty:
-                    print(f"AVISO: Nenhum dado baixado para {ticker} via yfinance.")
-                    ticker_data = None
-            except Exception as e:
-                print(f"ERRO ao baixar dados para {ticker} via yfinance: {e}")
+            refazer.append(ticker)
+    if refazer:
+        print(f"{len(refazer)} ticker(s) com histórico alterado (ex.: ajuste por dividendos). Baixando o período inteiro...")
+        baixados.update(_download_by_start({t: start_date for t in refazer}, end_date, provider, batch_provider, max_workers, limitador))
+
+    # A sessão é fechada mesmo se o laço for interrompido por uma exceção
+    with MT5Session() as sessao_mt5:
+        for ticker in tickers:
+            if ticker in em_cache:
+                all_data[ticker] = em_cache[ticker]
+                continue
+
+            file_path = f"data/{ticker}.csv"
+            if ticker in atualizados:
+                ticker_data = atualizados[ticker]
+                _save_csv_atomic(ticker_data, file_path)
+                _record_cache(manifesto, file_path, start_date, end_date, 'yfinance', 'auto_adjust', incremental=True)
+                print(f"Dados de {ticker} atualizados em '{file_path}' ({len(ticker_data) - len(desatualizados[ticker])} pregão(ões) novo(s)).")
+                all_data[ticker] = ticker_data
+                continue
+
+            ticker_data = baixados[ticker]
+            fonte, ajuste = 'yfinance', 'auto_adjust'
+            if ticker_data is not None and ticker_data.empty:
+                print(f"AVISO: Nenhum dado baixado para {ticker} via yfinance.")
                 ticker_data = None
 
-            if ticker_data is None and config.USE_MT5:
+            # O terminal do MetaTrader 5 atende uma conexão por vez: o fallback é sequencial
+            # Sem o pacote MetaTrader5 (ou sem terminal), a conexão falha uma vez e os demais tickers nem tentam
+            if ticker_data is None and config.USE_MT5 and sessao_mt5.conectado is not False:
                 mt5_ticker = ticker.replace('.SA', '')
                 print(f"Tentando baixar {mt5_ticker} via MetaTrader 5...")
-                ticker_data = download_mt5_data(mt5_ticker, start_date, end_date)
+                if ticker in desatualizados and ticker not in refazer:
+                    novos = download_mt5_data(mt5_ticker, inicios[ticker], end_date, sessao_mt5)
+                    ticker_data = merge_delta(desatualizados[ticker], novos, 'Close')
+                    if ticker_data is not None:
+                        _save_csv_atomic(ticker_data, file_path)
+                        _record_cache(manifesto, file_path, start_date, end_date, 'mt5', 'sem_ajuste', incremental=True)
+                        print(f"Dados de {ticker} atualizados via MetaTrader 5 em '{file_path}'.")
+                        all_data[ticker] = ticker_data
+                        continue
+                ticker_data = download_mt5_data(mt5_ticker, start_date, end_date, sessao_mt5)
+                fonte, ajuste = 'mt5', 'sem_ajuste'
 
             if ticker_data is not None and not ticker_data.empty:
                 ticker_data.to_csv(file_path)
+                _record_cache(manifesto, file_path, start_date, end_date, fonte, ajuste)
                 print(f"Novos dados para {ticker} salvos em '{file_path}'.")
+                all_data[ticker] = ticker_data
             else:
                 failed_tickers.append(ticker)
-                continue
 
-        if ticker_data is not None:
-            all_data[ticker] = ticker_data
+    if manifesto is not None:
+        manifesto.save()
 
     if not all_data:
         print("ERRO CRÍTICO: Falha ao carregar dados para todos os tickers.")
         return None, failed_tickers
 
-    # Combina os dados de todos os tickers em um único DataFrame com colunas MultiIndex
-    data_historica = pd.concat(all_data.values(), keys=all_data.keys(), axis=1)
+    # Combina os tickers (caches lidos direto do CSV e dados recém-baixados) em um DataFrame (campo, ticker)
+    data_historica = build_stock_frame(all_data)
+    if store_dir:
+        panel_store.save_panel_store(data_historica, store_dir, start_date, end_date)
+    print("Dados de ações carregados e processados.")
+    return data_historica, failed_tickers
+
+def _parse_cache_dates(coluna):
+    """Datas de um CSV de cache no formato ISO 8601 (ex.: caches com horário), sem fuso horário."""
+    datas = pd.to_datetime(coluna, format='ISO8601')
+    if getattr(datas.dt, 'tz', None) is not None:
+        datas = datas.dt.tz_localize(None)
+    return datas.to_numpy(dtype='datetime64[ns]')
+
+def read_cached_prices(file_path, campos=CAMPOS_CENARIOS):
+    """Lê de um CSV de cache apenas as datas e as colunas `campos` presentes, já como float64.
+
+    O caminho rápido lê datas no formato fixo AAAA-MM-DD direto para um array
+    estruturado; arquivos com campos vazios ou datas com horário são lidos
+    pelo pandas. Retorna (datas, {campo: vetor}).
+    """
+    with open(file_path, encoding='utf-8') as f:
+        cabecalho = f.readline().rstrip('\r\n').split(',')
+    presentes = [c for c in campos if c in cabecalho]
+    colunas = [0] + [cabecalho.index(c) for c in presentes]
+    try:
+        dados = np.loadtxt(file_path, delimiter=',', skiprows=1, usecols=colunas, ndmin=1,
+                           dtype=[('Date', 'datetime64[D]')] + [(c, np.float64) for c in presentes])
+        return dados['Date'].astype('datetime64[ns]'), {c: dados[c] for c in presentes}
+    except ValueError:
+        df = pd.read_csv(file_path, usecols=colunas, dtype={cabecalho[0]: str, **{c: np.float64 for c in presentes}})
+        return _parse_cache_dates(df.iloc[:, 0]), {c: df[c].to_numpy() for c in presentes}
 
-    # Inverte os níveis do MultiIndex para ter (metric, ticker) ao invés de (ticker, metric)
-    data_historica.columns = data_historica.columns.swaplevel(0, 1)
-    data_historica.sort_index(axis=1, inplace=True)
+def build_stock_frame(fontes, campos=CAMPOS_CENARIOS):
+    """Monta o DataFrame (campo, ticker) das ações em uma única matriz pré-alocada.
 
-    # Garante que o preenchimento de dados ausentes seja sempre executado
+    `fontes` associa cada ticker ao caminho do seu CSV de cache (lido com
+    `read_cached_prices`) ou a um DataFrame recém-baixado. Cada série é escrita
+    direto na sua coluna da matriz, alinhada ao calendário que une as datas de
+    todos os tickers, e o DataFrame final usa a própria matriz (sem cópia),
+    com os preços ausentes preenchidos pelo último valor.
+    """
+    lidos = {}
+    for ticker, fonte in fontes.items():
+        if isinstance(fonte, pd.DataFrame):
+            datas = np.asarray(fonte.index.values, dtype='datetime64[ns]')
+            lidos[ticker] = (datas, {c: fonte[c].to_numpy(dtype=np.float64) for c in campos if c in fonte.columns})
+        else:
+            lidos[ticker] = read_cached_prices(fonte, campos)
+
+    tickers = sorted(lidos)
+    presentes = sorted({c for _, colunas in lidos.values() for c in colunas})
+    calendario = np.unique(np.concatenate([datas for datas, _ in lidos.values()]))
+    matriz = np.full((len(calendario), len(presentes) * len(tickers)), np.nan)
+    for j, ticker in enumerate(tickers):
+        # Cada série é liberada logo depois de copiada para a matriz
+        datas, colunas = lidos.pop(ticker)
+        linhas = np.searchsorted(calendario, datas)
+        for k, campo in enumerate(presentes):
+            if campo in colunas:
+                matriz[linhas, k * len(tickers) + j] = colunas[campo]
+
+    data_historica = pd.DataFrame(matriz, index=pd.DatetimeIndex(calendario, name='Date'),
+                                  columns=pd.MultiIndex.from_product([presentes, tickers]), copy=False)
     data_historica.ffill(inplace=True)
-    print("Dados de ações carregados e processados.")
-    return data_historica, failed_tickers
+    return data_historica
+
+def get_bcb_data(start_date, end_date):
+    """Busca o benchmark (CDI ou SELIC) e o IPCA ao mesmo tempo.
+
+    Retorna (benchmark_df, ipca_df), como `get_benchmark_data` e `get_ipca_data`.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        benchmark = executor.submit(get_benchmark_data, start_date, end_date)
+        ipca = executor.submit(get_ipca_data, start_date, end_date)
+        return benchmark.result(), ipca.result()
 
 def prepare_benchmark_data(benchmark_df, ipca_df):
     """Prepara os dados de benchmark (CDI/Selic e IPCA)."""
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilitários compartilhados pelos motores (`engines.py`) e pelas estratégias
+(`strategies.py`): calendário de aportes, chaves de data e seleção dos
+menores valores.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Códigos usados em `escolhido` pelo motor do cenário misto
+APORTE_CDB = -1
+SEM_APORTE = -2
+
+
+def month_start_mask(dates, dia_anterior=None):
+    """Marca o primeiro pregão de cada mês (o dia em que o aporte mensal é feito).
+
+    `dia_anterior` é o último pregão já processado, quando `dates` continua uma
+    simulação anterior: o primeiro dia só é início de mês se o mês mudou.
+    """
+    meses = dates.year * 12 + dates.month
+    mask = np.ones(len(dates), dtype=bool)
+    mask[1:] = meses[1:] != meses[:-1]
+    if dia_anterior is not None and len(dates):
+        mask[0] = meses[0] != dia_anterior.year * 12 + dia_anterior.month
+    return mask
+
+
+def smallest_n(valores, n):
+    """Índices dos `n` menores valores, em ordem crescente; empates mantêm a ordem dos índices.
+
+    Equivale a `np.argsort(valores, kind='stable')[:n]`, mas com seleção
+    parcial: o custo é linear no número de valores mais a ordenação dos
+    poucos candidatos que empatam com o n-ésimo menor.
+    """
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+    if n >= len(valores):
+        return np.argsort(valores, kind='stable')
+    limite = np.partition(valores, n - 1)[n - 1]
+    candidatos = np.flatnonzero(valores <= limite)
+    return candidatos[np.argsort(valores[candidatos], kind='stable')[:n]]
+
+
+def smallest_n_mask(valores, n):
+    """Marca, em cada linha de `valores`, os `n` menores (n pode variar por linha).
+
+    Empates com o n-ésimo menor são resolvidos pela ordem das colunas, como em
+    uma ordenação estável; a seleção de cada linha é parcial (np.partition).
+    """
+    n_linhas, n_colunas = valores.shape
+    n = np.broadcast_to(np.asarray(n, dtype=np.int64), (n_linhas,))
+    posicao_limite = np.clip(n, 1, n_colunas) - 1
+    particionado = np.partition(valores, np.unique(posicao_limite), axis=1)
+    limite = np.take_along_axis(particionado, posicao_limite[:, None], axis=1)
+    menores = valores < limite
+    empates = valores == limite
+    faltam = n[:, None] - menores.sum(axis=1, keepdims=True)
+    return menores | (empates & (np.cumsum(empates, axis=1) <= faltam))
+
+
+def date_keys(dates):
+    """Codifica datas como inteiros ordenáveis: ordinal do mês (desde 1970-01) x 32 + dia."""
+    meses = (np.asarray(dates.year, dtype=np.int64) - 1970) * 12 + np.asarray(dates.month, dtype=np.int64) - 1
+    return meses * 32 + np.asarray(dates.day, dtype=np.int64)
+
+
+def add_months(keys, meses):
+    """Soma meses a chaves de `date_keys`, limitando o dia ao fim do mês (como pd.DateOffset)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    mes = keys // 32 + np.asarray(meses, dtype=np.int64)
+    m = mes.astype('datetime64[M]')
+    dias_no_mes = (m + 1).astype('datetime64[D]') - m.astype('datetime64[D]')
+    return mes * 32 + np.minimum(keys % 32, dias_no_mes.astype(np.int64))
+
+
+def key_to_timestamp(key):
+    """Converte uma chave de `date_keys` de volta para pd.Timestamp."""
+    key = int(key)
+    return pd.Timestamp(year=1970 + key // 32 // 12, month=key // 32 % 12 + 1, day=key % 32)
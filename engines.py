@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+"""
+Motores vetorizados dos cenários de backtest.
+
+Os motores deste módulo trabalham apenas com matrizes NumPy no formato
+(dias x tickers) e não conhecem DataFrames, configuração ou impressão de
+resultados. Os cenários em `scenarios.py` obtêm as matrizes do `MarketPanel`,
+chamam o motor correspondente e montam o DataFrame final. Os motores de
+aportes mensais e do cenário misto executam as regras de `strategies.py`, uma
+estratégia por vez; os motores em lote e de trajetórias avançam vários
+conjuntos de parâmetros juntos.
+"""
+
+import numpy as np
+
+import strategies
+from engine_utils import add_months, date_keys, month_start_mask, smallest_n_mask
+
+
+def dividend_growth_factor(close, dividends):
+    """Fator diário de reinvestimento de dividendos: 1 + dividendo / preço nos dias com provento."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(dividends > 0, 1.0 + dividends / close, 1.0)
+
+
+def lump_sum_shares(close, dividends, valor_por_empresa, num_shares_anterior=None):
+    """Quantidade de ações de cada ticker em cada dia para um aporte único no primeiro dia do painel.
+
+    A quantidade em cada dia é a compra inicial multiplicada pelo fator
+    acumulado de reinvestimento de dividendos. Com `num_shares_anterior`, a
+    carteira já comprada é apenas continuada a partir do primeiro dia.
+    """
+    if num_shares_anterior is None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            num_shares_anterior = valor_por_empresa / close[0]
+    return num_shares_anterior * np.cumprod(dividend_growth_factor(close, dividends), axis=0)
+
+
+def lump_sum_engine(close, dividends, valor_por_empresa, num_shares_anterior=None):
+    """Curva de valor de cada ticker para um aporte único no primeiro dia do painel.
+
+    Toda a curva é obtida com operações sobre a matriz inteira (ver `lump_sum_shares`).
+    """
+    return lump_sum_shares(close, dividends, valor_por_empresa, num_shares_anterior) * close
+
+
+def monthly_contributions_engine(dates, close, dividends, aportes, n_por_aporte,
+                                 freio_ativo=False, freio_periodo=0, quarentena_inicial=0, quarentena_adicional=0,
+                                 estado=None):
+    """Simula aportes mensais no(s) ativo(s) de menor valor em carteira.
+
+    Todas as entradas estão alinhadas aos pregões do período: `close` e
+    `dividends` são (dias x tickers) e `aportes` é um vetor por dia. A regra
+    está em `strategies.MonthlyContributionsStrategy`, executada sozinha pelo
+    executor de estratégias. Os benchmarks com os mesmos aportes são obtidos
+    à parte, em forma fechada (ver `benchmarks.py`).
+
+    Com `estado` (o estado final de uma execução anterior), a simulação
+    continua a partir dele; `dates` deve então conter apenas os pregões novos.
+
+    Retorna um dicionário com as matrizes de valores por ticker, os vetores de
+    total, total investido e aporte, a lista de tickers escolhidos
+    em cada aporte, os eventos do freio automático na ordem em que ocorreram e
+    o estado final.
+    """
+    estrategia = strategies.MonthlyContributionsStrategy(
+        close.shape[1], n_por_aporte, freio_ativo=freio_ativo, freio_periodo=freio_periodo,
+        quarentena_inicial=quarentena_inicial, quarentena_adicional=quarentena_adicional, estado=estado)
+    return strategies.run_strategies(dates, close, dividends, aportes, [estrategia],
+                                     ultimo_dia=estado['ultimo_dia'] if estado else None)[0]
+
+
+def cdb_mixed_engine(dates, close, dividends, aportes, indice_cdi, cdb_percentage, estado=None):
+    """Simula aportes mensais divididos entre um CDB (100% do CDI) e o ativo de menor valor.
+
+    O CDB não é corrigido dia a dia: cada aporte é convertido em "cotas" do
+    índice acumulado do CDI (`indice_cdi`, nível do índice em cada pregão) e o
+    saldo em qualquer dia é cotas x nível do índice. A regra está em
+    `strategies.CdbMixedStrategy`, executada sozinha pelo executor de estratégias.
+
+    Com `estado` (o estado final de uma execução anterior), a simulação
+    continua a partir dele; `dates` deve então conter apenas os pregões novos.
+
+    Retorna um dicionário com os valores por ticker, o saldo do CDB, o total,
+    as cotas acumuladas do CDB, o total investido, o aporte, o
+    destino de cada aporte (índice do ticker, APORTE_CDB ou SEM_APORTE) e o
+    estado final.
+    """
+    estrategia = strategies.CdbMixedStrategy(close.shape[1], cdb_percentage, estado=estado)
+    return strategies.run_strategies(dates, close, dividends, aportes, [estrategia], indice_cdi=indice_cdi,
+                                     ultimo_dia=estado['ultimo_dia'] if estado else None)[0]
+
+
+def _event_days(dia_de_aporte, dias_com_dividendo):
+    """Pregões em que o estado muda (aporte ou dividendo); entre eles só os preços variam."""
+    eventos = np.flatnonzero(dia_de_aporte | dias_com_dividendo)
+    fim = np.append(eventos[1:], len(dia_de_aporte))
+    return eventos, fim
+
+
+def monthly_contributions_batch_engine(dates, close, dividends, aportes, n_por_aporte,
+                                       freio_ativo, freio_periodo, quarentena_inicial, quarentena_adicional,
+                                       inicio=None, escala_aporte=None):
+    """Versão em lote de `monthly_contributions_engine` para P conjuntos de parâmetros.
+
+    Os parâmetros são vetores de tamanho P e o estado (ações, fim da quarentena,
+    duração da próxima quarentena e último aporte por ativo) são matrizes
+    (P x tickers). O laço percorre apenas os pregões com aporte ou dividendo;
+    o valor da carteira nos pregões intermediários é obtido de uma vez, com um
+    produto de matrizes por trecho.
+
+    Opcionalmente cada conjunto pode começar a aportar em um pregão próprio
+    (`inicio`) e ter os aportes multiplicados por um fator (`escala_aporte`),
+    o que permite simular várias datas de início em uma única passada.
+
+    Retorna um dicionário com as ações finais (P x tickers) e, para cada
+    conjunto (dias x P), o total da carteira, o total investido e o aporte do dia.
+    """
+    n_por_aporte = np.asarray(n_por_aporte, dtype=np.int64)
+    freio_ativo = np.asarray(freio_ativo, dtype=bool)
+    freio_periodo = np.asarray(freio_periodo, dtype=np.int64)
+    quarentena_adicional = np.asarray(quarentena_adicional, dtype=np.int64)
+    n_params = len(n_por_aporte)
+    n_dias, n_tickers = close.shape
+    inicio = np.zeros(n_params, dtype=np.int64) if inicio is None else np.asarray(inicio, dtype=np.int64)
+    escala_aporte = np.ones(n_params) if escala_aporte is None else np.asarray(escala_aporte, dtype=float)
+
+    cotado = ~np.isnan(close)
+    preco_ou_zero = np.where(cotado, close, 0.0)
+    preco_ou_um = np.where(cotado, close, 1.0)
+    dividendos = np.where(cotado & (dividends > 0), dividends, 0.0)
+    dias_com_dividendo = dividendos.any(axis=1)
+    dia_de_aporte = month_start_mask(dates)
+    chaves = date_keys(dates)
+
+    # Aporte de cada conjunto em cada pregão (zero antes do seu início e fora dos dias de aporte)
+    aportes_conjunto = np.where(dia_de_aporte[:, None] & (np.arange(n_dias)[:, None] >= inicio[None, :]),
+                                aportes[:, None] * escala_aporte[None, :], 0.0)
+
+    num_shares = np.zeros((n_params, n_tickers))
+    fim_quarentena = np.full((n_params, n_tickers), -1, dtype=np.int64)   # -1: fora de quarentena
+    duracao_quarentena = np.broadcast_to(np.asarray(quarentena_inicial, dtype=np.int64)[:, None], (n_params, n_tickers)).copy()
+    ultimo_aporte = np.full((n_params, n_tickers), -1, dtype=np.int64)    # -1: nunca recebeu aporte
+    total = np.zeros((n_dias, n_params))
+
+    eventos, fim = _event_days(dia_de_aporte, dias_com_dividendo)
+    for i, proximo in zip(eventos, fim):
+        if dia_de_aporte[i]:
+            chave = chaves[i]
+            # Libera quarentenas vencidas e define os elegíveis de cada conjunto
+            vencida = (fim_quarentena >= 0) & (chave >= fim_quarentena)
+            fim_quarentena[vencida] = -1
+            elegiveis = cotado[i] & (fim_quarentena < 0) & (inicio <= i)[:, None]
+
+            valores = np.where(elegiveis, num_shares * preco_ou_zero[i], np.inf)
+            selecionados = elegiveis & smallest_n_mask(valores, n_por_aporte)
+
+            quantidade = selecionados.sum(axis=1)
+            aporte_por_ativo = np.divide(aportes_conjunto[i], quantidade, out=np.zeros(n_params), where=quantidade > 0)
+            compra = selecionados & (close[i] > 0)
+            num_shares += np.where(compra, aporte_por_ativo[:, None] / preco_ou_um[i], 0.0)
+
+            # Gatilho do freio: aporte anterior no mesmo ativo dentro do período de verificação
+            limite = add_months(chave, -freio_periodo)[:, None]
+            gatilho = selecionados & freio_ativo[:, None] & (ultimo_aporte >= limite)
+            fim_quarentena = np.where(gatilho, add_months(chave, duracao_quarentena), fim_quarentena)
+            duracao_quarentena += np.where(gatilho, quarentena_adicional[:, None], 0)
+            ultimo_aporte[selecionados] = chave
+
+        if dias_com_dividendo[i]:
+            num_shares += num_shares * dividendos[i] / preco_ou_um[i]
+
+        total[i:proximo] = preco_ou_zero[i:proximo] @ num_shares.T
+
+    recebeu_aporte = dia_de_aporte[:, None] & (np.arange(n_dias)[:, None] >= inicio[None, :])
+    return {
+        'total': total,
+        'num_shares': num_shares,
+        'total_investido': np.cumsum(aportes_conjunto, axis=0),
+        'aporte': np.where(recebeu_aporte, aportes_conjunto, np.nan),
+    }
+
+
+def cdb_mixed_batch_engine(dates, close, dividends, aportes, indice_cdi, cdb_percentage):
+    """Versão em lote de `cdb_mixed_engine` para P percentuais-alvo de CDB.
+
+    Retorna um dicionário com as ações e cotas de CDB finais e, para cada
+    conjunto (dias x P), o total da carteira, o total investido e o aporte do dia.
+    """
+    cdb_percentage = np.asarray(cdb_percentage, dtype=float)
+    n_params = len(cdb_percentage)
+    n_dias, n_tickers = close.shape
+    linhas = np.arange(n_params)
+
+    cotado = ~np.isnan(close)
+    preco_ou_zero = np.where(cotado, close, 0.0)
+    preco_ou_um = np.where(cotado, close, 1.0)
+    dividendos = np.where(cotado & (dividends > 0), dividends, 0.0)
+    dias_com_dividendo = dividendos.any(axis=1)
+    dia_de_aporte = month_start_mask(dates)
+
+    num_shares = np.zeros((n_params, n_tickers))
+    cotas_cdb = np.zeros(n_params)
+    total = np.zeros((n_dias, n_params))
+
+    eventos, fim = _event_days(dia_de_aporte, dias_com_dividendo)
+    for i, proximo in zip(eventos, fim):
+        if dia_de_aporte[i]:
+            aporte_corrigido = aportes[i]
+            valores = num_shares * preco_ou_zero[i]
+            cdb_value = cotas_cdb * indice_cdi[i]
+            total_portfolio_value = valores.sum(axis=1) + cdb_value
+            with np.errstate(divide='ignore', invalid='ignore'):
+                para_cdb = ((total_portfolio_value > 0) & (cdb_value / total_portfolio_value < cdb_percentage)) | (total_portfolio_value == 0)
+            cotas_cdb += np.where(para_cdb, aporte_corrigido / indice_cdi[i], 0.0)
+
+            if cotado[i].any():
+                t = np.argmin(np.where(cotado[i], valores, np.inf), axis=1)
+                compra = ~para_cdb & (close[i, t] > 0)
+                num_shares[linhas[compra], t[compra]] += aporte_corrigido / close[i, t[compra]]
+
+        if dias_com_dividendo[i]:
+            num_shares += num_shares * dividendos[i] / preco_ou_um[i]
+
+        total[i:proximo] = preco_ou_zero[i:proximo] @ num_shares.T + np.outer(indice_cdi[i:proximo], cotas_cdb)
+
+    # Os aportes são iguais para todos os conjuntos
+    total_investido = np.cumsum(np.where(dia_de_aporte, aportes, 0.0))
+    aporte_dia = np.where(dia_de_aporte, aportes, np.nan)
+    return {
+        'total': total,
+        'num_shares': num_shares,
+        'cotas_cdb': cotas_cdb,
+        'total_investido': np.broadcast_to(total_investido[:, None], total.shape),
+        'aporte': np.broadcast_to(aporte_dia[:, None], total.shape),
+    }
+
+
+# --- Motor de trajetórias simuladas (Monte Carlo) ---
+
+def monthly_contributions_paths_engine(log_acumulado, cotado, inicios, aportes, dias_por_mes, n_por_aporte,
+                                       freio_ativo=False, freio_periodo=0, quarentena_inicial=0, quarentena_adicional=0):
+    """Aplica a regra de aportes mensais a P trajetórias sintéticas ao mesmo tempo.
+
+    Cada mês de cada trajetória é uma janela de `dias_por_mes` pregões do
+    histórico que começa no pregão `inicios[m, p]`. `log_acumulado` é o
+    retorno total (com dividendos) acumulado em log por ticker (pregões x
+    tickers), de modo que o crescimento de cada posição no mês é uma única
+    diferença. O estado é mantido em valor por ativo (P x tickers), o que
+    basta para a regra do menor valor em carteira.
+
+    O aporte é feito no início de cada mês, nos ativos cotados no pregão
+    inicial da janela. O freio trabalha com o número do mês da simulação.
+
+    Retorna um dicionário com o total de cada trajetória no fim de cada mês
+    (meses x P) e os valores finais por ativo (P x tickers).
+    """
+    n_meses, n_caminhos = inicios.shape
+    n_tickers = log_acumulado.shape[1]
+
+    valores = np.zeros((n_caminhos, n_tickers))
+    fim_quarentena = np.full((n_caminhos, n_tickers), -1, dtype=np.int64)   # -1: fora de quarentena
+    duracao_quarentena = np.full((n_caminhos, n_tickers), quarentena_inicial, dtype=np.int64)
+    ultimo_aporte = np.full((n_caminhos, n_tickers), -1, dtype=np.int64)    # -1: nunca recebeu aporte
+    total = np.zeros((n_meses, n_caminhos))
+
+    for m in range(n_meses):
+        inicio = inicios[m]
+        fim_quarentena[(fim_quarentena >= 0) & (m >= fim_quarentena)] = -1
+        elegiveis = cotado[inicio] & (fim_quarentena < 0)
+
+        selecionados = elegiveis & smallest_n_mask(np.where(elegiveis, valores, np.inf), n_por_aporte)
+
+        quantidade = selecionados.sum(axis=1)
+        aporte_por_ativo = np.divide(aportes[m], quantidade, out=np.zeros(n_caminhos), where=quantidade > 0)
+        valores += np.where(selecionados, aporte_por_ativo[:, None], 0.0)
+
+        if freio_ativo:
+            gatilho = selecionados & (ultimo_aporte >= 0) & (ultimo_aporte >= m - freio_periodo)
+            fim_quarentena = np.where(gatilho, m + duracao_quarentena, fim_quarentena)
+            duracao_quarentena += np.where(gatilho, quarentena_adicional, 0)
+        ultimo_aporte[selecionados] = m
+
+        valores *= np.exp(log_acumulado[inicio + dias_por_mes] - log_acumulado[inicio])
+        total[m] = valores.sum(axis=1)
+
+    return {'total': total, 'valores': valores}
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+Exportação dos resultados dos cenários para a pasta `results/`.
+
+Cada formato é um exportador registrado com `@register_exporter(nome)`: uma
+função `(tabelas, path_base)` que grava as tabelas de um cenário e retorna os
+arquivos gravados. As tabelas são pares (aba, DataFrame): sempre os fechamentos
+mensais e, com `config.EXPORTAR_DIARIO`, também o resultado diário completo.
+
+- 'xlsx': uma pasta de trabalho com uma aba por tabela, gravada em fluxo
+  (modo write-only do openpyxl): as linhas vão direto para o disco, sem montar
+  a planilha inteira em memória, o que importa nas abas diárias;
+- 'csv' e 'parquet': um arquivo por tabela (o diário com o sufixo `_diario`);
+  o Parquet requer o pacote pyarrow (ou fastparquet).
+
+Os cenários são exportados em paralelo (até `config.EXPORTACAO_WORKERS`), e a
+falha de um formato ou cenário não impede a gravação dos demais.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import config
+import results
+
+# Exportadores disponíveis, por formato (preenchido por @register_exporter)
+EXPORTADORES = {}
+
+# Sufixo dos arquivos com o resultado diário nos formatos de um arquivo por tabela
+SUFIXO_DIARIO = '_diario'
+
+
+def register_exporter(formato):
+    """Decorador que registra uma função de exportação para o formato informado."""
+    def registrar(funcao):
+        EXPORTADORES[formato] = funcao
+        return funcao
+    return registrar
+
+
+def result_tables(resultado, titulo, diario=False):
+    """Tabelas exportadas de um cenário: fechamentos mensais e, se `diario`, o resultado completo."""
+    frame = results.as_frame(resultado)
+    tabelas = [(f"{titulo} (Mensal)", frame.resample('ME').last())]
+    if diario:
+        tabelas.append((f"{titulo} (Diário)", frame))
+    return tabelas
+
+
+def _table_path(path_base, indice, extensao):
+    """Arquivo da `indice`-ésima tabela nos formatos de um arquivo por tabela."""
+    return f"{path_base}{SUFIXO_DIARIO if indice else ''}.{extensao}"
+
+
+def _rows(frame):
+    """Linhas da planilha (cabeçalho e dados), geradas uma a uma; células vazias no lugar de NaN."""
+    yield [frame.index.name or ''] + [str(c) for c in frame.columns]
+    for linha in frame.itertuples(index=True, name=None):
+        yield [None if (v is None or v is pd.NA or v != v) else v for v in linha]
+
+
+@register_exporter('xlsx')
+def export_xlsx(tabelas, path_base):
+    from openpyxl import Workbook  # importado só quando o formato é usado
+
+    livro = Workbook(write_only=True)
+    for aba, frame in tabelas:
+        planilha = livro.create_sheet(title=aba[:31])   # limite de caracteres do Excel
+        for linha in _rows(frame):
+            planilha.append(linha)
+    path = f"{path_base}.xlsx"
+    livro.save(path)
+    return [path]
+
+
+@register_exporter('csv')
+def export_csv(tabelas, path_base):
+    paths = []
+    for indice, (_, frame) in enumerate(tabelas):
+        paths.append(_table_path(path_base, indice, 'csv'))
+        frame.to_csv(paths[-1])
+    return paths
+
+
+@register_exporter('parquet')
+def export_parquet(tabelas, path_base):
+    paths = []
+    for indice, (_, frame) in enumerate(tabelas):
+        paths.append(_table_path(path_base, indice, 'parquet'))
+        try:
+            frame.to_parquet(paths[-1])
+        except ImportError:
+            raise ImportError("o formato parquet requer o pacote pyarrow (pip install pyarrow)") from None
+    return paths
+
+
+def export_scenario(resultado, titulo, path_base, formatos, diario=False):
+    """Exporta um cenário em cada um dos `formatos`; retorna os arquivos gravados."""
+    tabelas = result_tables(resultado, titulo, diario)
+    gravados = []
+    for formato in formatos:
+        try:
+            gravados += EXPORTADORES[formato](tabelas, path_base)
+        except Exception as e:
+            print(f"ERRO ao salvar resultados de '{titulo}' em {formato}: {e}")
+    return gravados
+
+
+def export_results(cenarios, diretorio='results', formatos=None, diario=None, max_workers=None):
+    """Exporta vários cenários em paralelo.
+
+    `cenarios` é uma lista de (resultado, título, nome do arquivo); a extensão do
+    nome é substituída pela de cada formato. Retorna {título: arquivos gravados}.
+    """
+    formatos = config.FORMATOS_EXPORTACAO if formatos is None else formatos
+    diario = config.EXPORTAR_DIARIO if diario is None else diario
+    max_workers = config.EXPORTACAO_WORKERS if max_workers is None else max_workers
+    desconhecidos = [f for f in formatos if f not in EXPORTADORES]
+    if desconhecidos:
+        raise ValueError(f"Formato de exportação desconhecido: {desconhecidos}. Use um de {sorted(EXPORTADORES)}.")
+
+    os.makedirs(diretorio, exist_ok=True)
+
+    def exportar(resultado, titulo, arquivo):
+        path_base = os.path.join(diretorio, os.path.splitext(arquivo)[0])
+        return export_scenario(resultado, titulo, path_base, formatos, diario)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futuros = {titulo: executor.submit(exportar, resultado, titulo, arquivo) for resultado, titulo, arquivo in cenarios}
+        return {titulo: futuro.result() for titulo, futuro in futuros.items()}
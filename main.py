@@ -8,51 +8,37 @@ o salvamento dos resultados e a plotagem dos gráficos.
 """
 
 import warnings
-import os
-import pandas as pd
 
 # Importa as configurações e os novos módulos
 import config
 import data_loader
+import export
+import market_panel
 import scenarios
-import plotting
 
-def save_results_to_excel(lump_sum_results, monthly_results, cdb_results):
-    """Salva os resultados dos backtests em arquivos Excel separados na pasta /results."""
-    print("\nSalvando resultados em Excel...")
-    
-    # Garante que o diretório de resultados exista
-    if not os.path.exists('results'):
-        os.makedirs('results')
-        
-    path_lump_sum = os.path.join('results', config.ARQUIVO_RESULTADOS_APORTE_UNICO)
-    path_monthly = os.path.join('results', config.ARQUIVO_RESULTADOS_APORTES_MENSAIS)
-    path_cdb = os.path.join('results', config.ARQUIVO_RESULTADOS_APORTES_CDB)
-    
+def save_results(lump_sum_results, monthly_results, cdb_results):
+    """Salva os resultados dos backtests na pasta /results, um arquivo por cenário e formato (ver `export.py`)."""
+    print("\nSalvando resultados...")
+    cenarios = [
+        (lump_sum_results, 'Aporte Unico', config.ARQUIVO_RESULTADOS_APORTE_UNICO),
+        (monthly_results, 'Aportes Mensais', config.ARQUIVO_RESULTADOS_APORTES_MENSAIS),
+        (cdb_results, 'Aportes CDB Misto', config.ARQUIVO_RESULTADOS_APORTES_CDB),
+    ]
     try:
-        with pd.ExcelWriter(path_lump_sum) as writer:
-            lump_sum_results.resample('M').last().to_excel(writer, sheet_name='Aporte Unico (Mensal)')
-        print(f"Resultados do Aporte Único salvos em '{path_lump_sum}'")
-
-        with pd.ExcelWriter(path_monthly) as writer:
-            monthly_results.resample('M').last().to_excel(writer, sheet_name='Aportes Mensais (Mensal)')
-        print(f"Resultados dos Aportes Mensais salvos em '{path_monthly}'")
-
-        with pd.ExcelWriter(path_cdb) as writer:
-            cdb_results.resample('M').last().to_excel(writer, sheet_name='Aportes CDB Misto (Mensal)')
-        print(f"Resultados dos Aportes CDB Misto salvos em '{path_cdb}'")
+        gravados = export.export_results(cenarios, 'results')
     except Exception as e:
-        print(f"ERRO ao salvar resultados em Excel: {e}")
-
-def main():
-    """Função principal que orquestra o processo de backtest."""
-    warnings.simplefilter(action='ignore', category=FutureWarning)
-
-    # Carrega configuração
-    tickers_sa = config.TICKERS_EMPRESAS
-    data_inicio = config.DATA_INICIO
-    data_fim = config.DATA_FIM
-
+        print(f"ERRO ao salvar resultados: {e}")
+        return
+    for titulo, paths in gravados.items():
+        for path in paths:
+            print(f"Resultados de '{titulo}' salvos em '{path}'")
+
+def load_market_data(tickers_sa, data_inicio, data_fim):
+    """Baixa (ou lê do cache) ações, CDI e IPCA e monta o painel de mercado.
+
+    Retorna (data_historica, benchmark_diaria, ipca_mensal, panel), ou None se
+    não houver dados de ações.
+    """
     # --- Download de Todos os Dados ---
     data_historica, failed_tickers = data_loader.download_stock_data(tickers_sa, data_inicio, data_fim)
     
@@ -63,22 +49,48 @@ def main():
         print("----------------------------------------")
 
     if data_historica is None:
-        return # Encerra se não houver dados de ações
+        return None # Encerra se não houver dados de ações
 
-    benchmark_df = data_loader.get_benchmark_data(data_inicio, data_fim)
-    ipca_df = data_loader.get_ipca_data(data_inicio, data_fim)
+    benchmark_df, ipca_df = data_loader.get_bcb_data(data_inicio, data_fim)
 
     # --- Preparação dos Dados de Benchmark ---
     benchmark_diaria, ipca_mensal = data_loader.prepare_benchmark_data(benchmark_df, ipca_df)
 
+    # --- Painel de Mercado (montado uma vez e compartilhado pelos cenários) ---
+    panel = market_panel.build_market_panel(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim,
+                                            cache_dir=config.BENCHMARK_CACHE_DIR)
+    return data_historica, benchmark_diaria, ipca_mensal, panel
+
+def load_market_panel(tickers_sa, data_inicio, data_fim):
+    """Atalho para quem só precisa do painel de mercado (ex.: sweep.py)."""
+    dados = load_market_data(tickers_sa, data_inicio, data_fim)
+    return dados[3] if dados is not None else None
+
+def main():
+    """Função principal que orquestra o processo de backtest."""
+    warnings.simplefilter(action='ignore', category=FutureWarning)
+
+    # Carrega configuração
+    tickers_sa = config.TICKERS_EMPRESAS
+    data_inicio = config.DATA_INICIO
+    data_fim = config.DATA_FIM
+
+    dados = load_market_data(tickers_sa, data_inicio, data_fim)
+    if dados is None:
+        return
+    data_historica, benchmark_diaria, ipca_mensal, panel = dados
+
     # --- Execução dos Cenários de Backtest ---
-    lump_sum_results = scenarios.run_lump_sum_backtest(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim)
-    monthly_results = scenarios.run_monthly_contributions_backtest(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim)
-    cdb_results = scenarios.run_scenario_cdb_mixed(data_inicio, data_fim, config.APORTE_MENSAL_BASE, data_historica, benchmark_diaria, ipca_mensal, config.CDB_PERCENTAGE)
+    # Com checkpoints, cada cenário processa apenas os pregões novos desde a última execução
+    checkpoint_dir = config.CHECKPOINT_DIR if config.CHECKPOINT_ATIVO else None
+    lump_sum_results = scenarios.run_lump_sum_backtest(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim, panel=panel, checkpoint_dir=checkpoint_dir)
+    monthly_results = scenarios.run_monthly_contributions_backtest(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim, panel=panel, checkpoint_dir=checkpoint_dir)
+    cdb_results = scenarios.run_scenario_cdb_mixed(data_inicio, data_fim, config.APORTE_MENSAL_BASE, data_historica, benchmark_diaria, ipca_mensal, config.CDB_PERCENTAGE, panel=panel, checkpoint_dir=checkpoint_dir)
 
     # --- Salvamento e Visualização ---
     if lump_sum_results is not None and monthly_results is not None and cdb_results is not None:
-        save_results_to_excel(lump_sum_results, monthly_results, cdb_results)
+        save_results(lump_sum_results, monthly_results, cdb_results)
+        import plotting  # matplotlib só é carregado quando há gráficos a gerar
         # A função de plotagem precisará ser atualizada para lidar com o novo resultado
         plotting.plot_results(lump_sum_results, monthly_results, cdb_results)
     else:
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+Painel de mercado compartilhado pelos cenários de backtest.
+
+O `MarketPanel` é construído uma única vez depois do carregamento dos dados e
+reúne, já alinhados, tudo o que os motores em `engines.py` precisam: matrizes
+contíguas de fechamento e dividendos, o calendário do período, a posição de
+cada pregão nesse calendário e os vetores de CDI e IPCA. Os índices dos
+benchmarks vêm do cache de `benchmarks.py`.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import benchmarks
+
+
+@dataclass
+class MarketPanel:
+    """Dados de mercado do período em matrizes NumPy (pregões x tickers)."""
+    calendar: pd.DatetimeIndex      # todos os dias do período (freq='D')
+    dates: pd.DatetimeIndex         # pregões dentro do período
+    tickers: list
+    ticker_index: dict              # ticker -> coluna das matrizes
+    close: np.ndarray               # float64, C-contíguo
+    dividends: np.ndarray           # float64, C-contíguo (NaN = sem dividendo)
+    first_valid: np.ndarray         # primeiro pregão com preço por ticker (-1 se nunca cotado)
+    posicao_pregao: np.ndarray      # posição de cada pregão em `calendar`
+    ultimo_pregao: np.ndarray       # último pregão até cada dia do calendário (-1 antes do primeiro)
+    indice_benchmark: np.ndarray    # CDI acumulado no calendário; None sem benchmark
+    inicio_benchmark: int           # posição da primeira cotação do CDI no calendário
+    ipca_acumulado: np.ndarray      # IPCA acumulado no calendário (1.0 antes da primeira leitura)
+    indice_ipca_x: np.ndarray       # benchmark IPCA + X acumulado no calendário; None sem IPCA
+    ipca_mensal: pd.Series          # série mensal original, usada no benchmark IPCA + X
+
+    def valid_tickers(self, tickers):
+        """Filtra, na ordem recebida, os tickers presentes no painel com ao menos um preço."""
+        return [t for t in tickers if t in self.ticker_index and self.first_valid[self.ticker_index[t]] >= 0]
+
+    def columns(self, tickers):
+        """Colunas das matrizes correspondentes aos tickers informados."""
+        return np.array([self.ticker_index[t] for t in tickers], dtype=np.intp)
+
+    def arrays(self, tickers):
+        """Matrizes de fechamento e dividendos restritas aos tickers informados."""
+        cols = self.columns(tickers)
+        return self.close[:, cols], self.dividends[:, cols]
+
+    def to_calendar(self, valores_pregao, antes_do_inicio=0.0):
+        """Leva valores por pregão para o calendário, repetindo o último pregão nos dias sem negociação."""
+        valores_pregao = np.asarray(valores_pregao)
+        posicoes = np.maximum(self.ultimo_pregao, 0)
+        if len(self.dates):
+            valores = valores_pregao[posicoes]
+        else:
+            valores = np.zeros((len(self.calendar),) + valores_pregao.shape[1:])
+        valores[self.ultimo_pregao < 0] = antes_do_inicio
+        return valores
+
+
+def build_market_panel(data_historica, benchmark_diaria, ipca_mensal, tickers, data_inicio, data_fim, cache_dir=None):
+    """Constrói o `MarketPanel` do período a partir da saída de `download_stock_data`.
+
+    Com `cache_dir`, os índices dos benchmarks também são guardados em disco.
+    """
+    calendar = pd.date_range(start=data_inicio, end=data_fim, freq='D')
+    dates = data_historica.index[data_historica.index.isin(calendar)]
+    tickers = [t for t in tickers if t in data_historica['Close'].columns]
+
+    periodo = data_historica.loc[dates]
+    close = np.ascontiguousarray(periodo['Close'].reindex(columns=tickers).to_numpy(dtype=np.float64))
+    if 'Dividends' in periodo.columns.get_level_values(0):
+        dividends = np.ascontiguousarray(periodo['Dividends'].reindex(columns=tickers).to_numpy(dtype=np.float64))
+    else:
+        dividends = np.full_like(close, np.nan)
+
+    cotado = ~np.isnan(close)
+    first_valid = np.where(cotado.any(axis=0), cotado.argmax(axis=0), -1)
+
+    posicao_pregao = calendar.get_indexer(dates)
+    ultimo_pregao = np.searchsorted(dates.values, calendar.values, side='right') - 1
+
+    if benchmark_diaria is not None:
+        indice_benchmark = benchmarks.cdi_index(benchmark_diaria, calendar, cache_dir=cache_dir)
+        cotacoes = np.flatnonzero(calendar.isin(benchmark_diaria.index))
+        inicio_benchmark = int(cotacoes[0]) if cotacoes.size else len(calendar)
+    else:
+        indice_benchmark = None
+        inicio_benchmark = len(calendar)
+
+    if ipca_mensal is not None:
+        ipca_acumulado = (1 + ipca_mensal).cumprod().reindex(calendar, method='ffill').fillna(1).to_numpy(dtype=np.float64)
+        indice_ipca_x = benchmarks.ipca_x_index(ipca_mensal, calendar, cache_dir=cache_dir)
+    else:
+        ipca_acumulado = np.ones(len(calendar))
+        indice_ipca_x = None
+
+    return MarketPanel(
+        calendar=calendar,
+        dates=dates,
+        tickers=tickers,
+        ticker_index={t: i for i, t in enumerate(tickers)},
+        close=close,
+        dividends=dividends,
+        first_valid=first_valid,
+        posicao_pregao=posicao_pregao,
+        ultimo_pregao=ultimo_pregao,
+        indice_benchmark=indice_benchmark,
+        inicio_benchmark=inicio_benchmark,
+        ipca_acumulado=ipca_acumulado,
+        indice_ipca_x=indice_ipca_x,
+        ipca_mensal=ipca_mensal,
+    )
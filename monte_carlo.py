@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+Simulação de Monte Carlo (bootstrap em blocos) da estratégia de aportes mensais.
+
+Em vez de repetir apenas a trajetória histórica, as trajetórias sintéticas são
+montadas com blocos de meses consecutivos sorteados do histórico do painel. Os
+retornos de todas as ações, do CDI e do IPCA de um mesmo bloco andam juntos, o
+que preserva a correlação entre os ativos e a autocorrelação dentro do bloco.
+
+Cada mês sintético é uma janela de `DIAS_POR_MES` pregões do histórico. A regra
+de aportes (menor valor em carteira e freio automático) é aplicada a todas as
+trajetórias de uma vez pelo motor em `engines.py`, com um laço apenas sobre os
+meses.
+
+O resultado são as curvas de percentis (leque) do valor da carteira e a
+distribuição dos valores finais de cada trajetória, comparados ao CDI e ao
+IPCA + X com os mesmos aportes.
+
+Uso:
+    python monte_carlo.py
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import benchmarks
+import config
+import engines
+
+# Pregões em um mês sintético
+DIAS_POR_MES = 21
+
+
+def historical_log_returns(panel, tickers):
+    """Retornos acumulados em log por pregão: total das ações (com dividendos), CDI e IPCA.
+
+    O retorno de cada ação é medido entre pregões consecutivos com cotação, e é
+    zero nos dias sem cotação. Retorna (log_acumulado, cotado, log_cdi, log_ipca).
+    """
+    close, dividends = panel.arrays(tickers)
+    cotado = ~np.isnan(close)
+    anterior = pd.DataFrame(close).ffill().shift(1).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retornos = np.where(cotado & ~np.isnan(anterior), np.log((close + np.nan_to_num(dividends)) / anterior), 0.0)
+    log_acumulado = np.cumsum(retornos, axis=0)
+
+    if panel.indice_benchmark is not None:
+        log_cdi = np.log(panel.indice_benchmark[panel.posicao_pregao])
+    else:
+        log_cdi = np.zeros(len(panel.dates))
+    log_ipca = np.log(panel.ipca_acumulado[panel.posicao_pregao])
+    return log_acumulado, cotado, log_cdi, log_ipca
+
+
+def bootstrap_month_starts(n_pregoes, n_caminhos, n_meses, bloco_meses, rng, dias_por_mes=DIAS_POR_MES):
+    """Sorteia o pregão inicial de cada mês de cada trajetória (meses x caminhos).
+
+    Cada trajetória é uma sequência de blocos de `bloco_meses` meses
+    consecutivos do histórico, com início sorteado uniformemente.
+    """
+    bloco_dias = bloco_meses * dias_por_mes
+    ultimo_inicio = n_pregoes - 1 - bloco_dias
+    if ultimo_inicio < 0:
+        raise ValueError(f"Histórico com {n_pregoes} pregões é curto demais para blocos de {bloco_meses} meses.")
+
+    n_blocos = -(-n_meses // bloco_meses)
+    inicios_bloco = rng.integers(0, ultimo_inicio + 1, size=(n_blocos, 1, n_caminhos))
+    deslocamentos = (np.arange(bloco_meses) * dias_por_mes)[None, :, None]
+    return (inicios_bloco + deslocamentos).reshape(n_blocos * bloco_meses, n_caminhos)[:n_meses]
+
+
+def run_monte_carlo(panel, n_caminhos=None, anos=None, bloco_meses=None, semente=None):
+    """Simula a estratégia de aportes mensais em trajetórias sintéticas.
+
+    Retorna o leque de percentis por mês e a distribuição dos resultados
+    finais (uma linha por trajetória).
+    """
+    n_caminhos = config.MC_CAMINHOS if n_caminhos is None else n_caminhos
+    anos = config.MC_ANOS if anos is None else anos
+    bloco_meses = config.MC_BLOCO_MESES if bloco_meses is None else bloco_meses
+    semente = config.MC_SEMENTE if semente is None else semente
+    n_meses = int(round(anos * 12))
+
+    tickers = panel.valid_tickers(panel.tickers)
+    print(f"Simulando {n_caminhos} trajetórias de {anos} anos com {len(tickers)} empresas...")
+    log_acumulado, cotado, log_cdi, log_ipca = historical_log_returns(panel, tickers)
+    inicios = bootstrap_month_starts(len(panel.dates), n_caminhos, n_meses, bloco_meses, np.random.default_rng(semente))
+    fins = inicios + DIAS_POR_MES
+
+    # O aporte de cada mês é corrigido pelo IPCA sorteado nos meses anteriores da trajetória
+    crescimento_ipca = np.exp(log_ipca[fins] - log_ipca[inicios])
+    correcao = np.vstack([np.ones((1, n_caminhos)), np.cumprod(crescimento_ipca, axis=0)[:-1]])
+    aportes = config.APORTE_MENSAL_BASE * correcao
+
+    resultado = engines.monthly_contributions_paths_engine(
+        log_acumulado, cotado, inicios, aportes, DIAS_POR_MES, config.NUMERO_EMPRESAS_POR_APORTE,
+        freio_ativo=config.FREIO_ATIVO,
+        freio_periodo=config.FREIO_PERIODO_APORTES,
+        quarentena_inicial=config.FREIO_QUARENTENA_INICIAL,
+        quarentena_adicional=config.FREIO_QUARENTENA_ADICIONAL,
+    )
+    total = resultado['total']
+    total_investido = np.cumsum(aportes, axis=0)
+    # Benchmarks com os mesmos aportes: cada trajetória tem o seu índice mensal (meses x trajetórias)
+    meses = np.arange(n_meses)
+    cdi = benchmarks.contribution_weighted(np.cumprod(np.exp(log_cdi[fins] - log_cdi[inicios]), axis=0), meses, aportes)
+    juro_real_mensal = (1 + config.IPCA_BENCHMARK_X / 100.0) ** (1 / 12)
+    ipca_x = benchmarks.contribution_weighted(np.cumprod(crescimento_ipca * juro_real_mensal, axis=0), meses, aportes)
+
+    percentis = list(config.MC_PERCENTIS)
+    leque = pd.DataFrame(np.percentile(total, percentis, axis=1).T,
+                         index=pd.RangeIndex(1, n_meses + 1, name='Mes'),
+                         columns=[f'P{p}' for p in percentis])
+    leque['Total Investido P50'] = np.median(total_investido, axis=1)
+    leque[f'{config.BENCHMARK_NAME} P50'] = np.median(cdi, axis=1)
+    leque['IPCA+X P50'] = np.median(ipca_x, axis=1)
+
+    distribuicao = pd.DataFrame({
+        'Valor Final': total[-1],
+        'Total Investido': total_investido[-1],
+        'ROI': total[-1] / total_investido[-1] - 1,
+        config.BENCHMARK_NAME: cdi[-1],
+        'IPCA+X': ipca_x[-1],
+    })
+    distribuicao['Excesso CDI'] = distribuicao['Valor Final'] / distribuicao[config.BENCHMARK_NAME] - 1
+    distribuicao['Excesso IPCA+X'] = distribuicao['Valor Final'] / distribuicao['IPCA+X'] - 1
+    return leque, distribuicao
+
+
+def summarize_distribution(distribuicao, percentis=None):
+    """Percentis do ROI e dos excessos finais e a frequência com que a carteira supera cada benchmark."""
+    percentis = list(config.MC_PERCENTIS) if percentis is None else list(percentis)
+    colunas = ['ROI', 'Excesso CDI', 'Excesso IPCA+X']
+    resumo = distribuicao[colunas].quantile([p / 100 for p in percentis])
+    resumo.index = [f'P{p}' for p in percentis]
+    resumo.loc['Supera o benchmark'] = [np.nan, (distribuicao['Excesso CDI'] > 0).mean(), (distribuicao['Excesso IPCA+X'] > 0).mean()]
+    return resumo
+
+
+def main():
+    """Carrega os dados uma vez, simula as trajetórias e salva o leque e a distribuição."""
+    import main as backtest
+
+    panel = backtest.load_market_panel(config.TICKERS_EMPRESAS, config.DATA_INICIO, config.DATA_FIM)
+    if panel is None:
+        return
+
+    leque, distribuicao = run_monte_carlo(panel)
+
+    os.makedirs('results', exist_ok=True)
+    path_leque = os.path.join('results', config.ARQUIVO_RESULTADOS_MC_LEQUE)
+    path_distribuicao = os.path.join('results', config.ARQUIVO_RESULTADOS_MC_DISTRIBUICAO)
+    leque.to_csv(path_leque)
+    distribuicao.to_csv(path_distribuicao, index_label='Trajetoria')
+    print("\n--- Distribuição dos Resultados Finais (Monte Carlo) ---")
+    print(summarize_distribution(distribuicao).to_string())
+    print(f"\nLeque de percentis salvo em '{path_leque}'")
+    print(f"Distribuição dos valores finais salva em '{path_distribuicao}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+Armazenamento consolidado do painel de ações em disco.
+
+Em vez de ler um CSV por ticker (com conversão de datas, concatenação e troca
+dos níveis do MultiIndex a cada execução), o resultado de
+`data_loader.download_stock_data` é gravado em um diretório com um arquivo
+`.npy` por campo (Close e Dividends), cada um uma matriz
+(datas x tickers) já alinhada, um `dates.npy` com as datas e um `meta.json`
+com os tickers, os campos e o período pedido (`inicio` e `fim`), para que um
+painel que não cubra o período da execução atual não seja usado. A leitura usa memory mapping e praticamente não
+tem conversão: o painel volta a ser um DataFrame em alguns milissegundos.
+
+Os CSVs por ticker em `data/` continuam sendo o formato de importação e
+exportação: são eles que recebem os downloads, e o painel consolidado é
+regravado a partir deles sempre que algum ticker é atualizado.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Campos guardados no painel: os mesmos que o carregador mantém (data_loader.CAMPOS_CENARIOS)
+CAMPOS = ('Close', 'Dividends')
+
+# Gravado por último: um painel sem `meta.json` (ou com matrizes de outro tamanho) é ignorado
+META = 'meta.json'
+
+# Incrementar quando o formato dos arquivos mudar
+VERSAO_PAINEL = 2
+
+
+@dataclass
+class PanelStore:
+    """Painel consolidado lido do disco (matrizes possivelmente mapeadas em memória)."""
+    dates: pd.DatetimeIndex
+    tickers: list
+    campos: dict                    # campo -> matriz float64 (datas x tickers)
+    inicio: pd.Timestamp = None     # período pedido quando o painel foi gravado
+    fim: pd.Timestamp = None
+
+    def covers(self, start_date, end_date):
+        """Indica se o período pedido na gravação cobre `start_date` a `end_date`."""
+        return _covers(self.inicio, self.fim, start_date, end_date)
+
+    def to_frame(self, tickers=None):
+        """DataFrame com colunas MultiIndex (campo, ticker), no formato de `download_stock_data`."""
+        tickers = sorted(self.tickers if tickers is None else tickers)
+        posicao = {t: i for i, t in enumerate(self.tickers)}
+        cols = np.array([posicao[t] for t in tickers], dtype=np.intp)
+        campos = sorted(self.campos)
+        blocos = np.hstack([self.campos[c][:, cols] for c in campos]) if campos else np.empty((len(self.dates), 0))
+        colunas = pd.MultiIndex.from_product([campos, tickers])
+        return pd.DataFrame(blocos, index=self.dates, columns=colunas)
+
+
+def save_panel_store(data_historica, diretorio, inicio=None, fim=None):
+    """Grava o painel (saída de `download_stock_data` para o período `inicio` a `fim`) em `diretorio`.
+
+    Cada arquivo é gravado em um temporário e renomeado; o `meta.json` vai por
+    último, de modo que uma gravação interrompida nunca é lida pela metade.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    campos = [c for c in CAMPOS if c in data_historica.columns.get_level_values(0)]
+    tickers = sorted(set(data_historica.columns.get_level_values(1)))
+
+    arquivos = {'dates': np.asarray(data_historica.index.values, dtype='datetime64[ns]')}
+    for campo in campos:
+        arquivos[campo] = np.ascontiguousarray(data_historica[campo].reindex(columns=tickers).to_numpy(dtype=np.float64))
+    for nome, matriz in arquivos.items():
+        path = os.path.join(diretorio, f"{nome}.npy")
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, matriz)
+        os.replace(path + '.tmp', path)
+
+    meta = {
+        'versao': VERSAO_PAINEL,
+        'tickers': tickers,
+        'campos': campos,
+        'dias': len(data_historica.index),
+        'nome_indice': data_historica.index.name,
+        'inicio': None if inicio is None else str(pd.Timestamp(inicio).date()),
+        'fim': None if fim is None else str(pd.Timestamp(fim).date()),
+    }
+    path = os.path.join(diretorio, META)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(path + '.tmp', path)
+
+
+def _covers(inicio, fim, start_date, end_date):
+    if inicio is None or fim is None:
+        return False
+    return pd.Timestamp(inicio) <= pd.Timestamp(start_date) and pd.Timestamp(fim) >= pd.Timestamp(end_date)
+
+
+def read_panel_meta(diretorio):
+    """Lê apenas o `meta.json` do painel; None se não existir, for ilegível ou de outra versão."""
+    path = os.path.join(diretorio, META)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except Exception as e:
+        print(f"AVISO: painel consolidado em '{diretorio}' ignorado ({e}).")
+        return None
+    return meta if meta.get('versao') == VERSAO_PAINEL else None
+
+
+def panel_covers(diretorio, tickers, start_date, end_date):
+    """Indica, só pelo `meta.json` (sem abrir as matrizes), se o painel serve para o pedido.
+
+    Decidir antes de mapear as matrizes importa no Windows: um arquivo mapeado
+    em memória não pode ser substituído, e o painel precisa ser regravado
+    quando não cobre o pedido.
+    """
+    meta = read_panel_meta(diretorio)
+    return (meta is not None and _covers(meta.get('inicio'), meta.get('fim'), start_date, end_date)
+            and set(tickers) <= set(meta['tickers']))
+
+
+def load_panel_store(diretorio, mmap=True):
+    """Lê o painel consolidado; retorna None se não existir, for de outra versão ou estiver incompleto."""
+    meta = read_panel_meta(diretorio)
+    if meta is None:
+        return None
+    modo = 'r' if mmap else None
+    try:
+        dates = np.load(os.path.join(diretorio, 'dates.npy'))
+        campos = {c: np.load(os.path.join(diretorio, f"{c}.npy"), mmap_mode=modo) for c in meta['campos']}
+    except Exception as e:
+        print(f"AVISO: painel consolidado em '{diretorio}' ignorado ({e}).")
+        return None
+
+    forma = (meta['dias'], len(meta['tickers']))
+    if len(dates) != meta['dias'] or any(m.shape != forma for m in campos.values()):
+        print(f"AVISO: painel consolidado em '{diretorio}' incompleto. Ignorando.")
+        return None
+    inicio, fim = (None if meta.get(c) is None else pd.Timestamp(meta[c]) for c in ('inicio', 'fim'))
+    return PanelStore(dates=pd.DatetimeIndex(dates, name=meta['nome_indice']), tickers=meta['tickers'], campos=campos,
+                      inicio=inicio, fim=fim)
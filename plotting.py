@@ -7,6 +7,7 @@ import pandas as pd
 from config import BENCHMARK_NAME
 import os
 import config
+import results
 
 def plot_ticker_distribution(monthly_results, ax):
     """Gera um gráfico de barras com a distribuição de valor por ativo."""
@@ -31,9 +32,25 @@ def plot_ticker_distribution(monthly_results, ax):
         ax.text(0.5, 0.5, 'Sem dados de valor de ticker para exibir.', horizontalalignment='center', verticalalignment='center')
         ax.set_title('Distribuição de Valor por Ativo', fontsize=18)
 
+def contribution_counts(monthly_results):
+    """Quantidade de aportes mensais por ativo, a partir do livro de aportes ou da coluna 'Ativo Aportado'."""
+    if isinstance(monthly_results, results.CompactResult):
+        return monthly_results.contribution_counts()
+
+    monthly_contributions = monthly_results['Ativo Aportado'].replace("", np.nan).resample('ME').first().dropna()
+
+    # Processa as entradas para lidar com múltiplos tickers por aporte
+    all_individual_contributions = []
+    for contribution_group in monthly_contributions:
+        all_individual_contributions.extend(contribution_group.split(','))
+
+    return pd.Series(all_individual_contributions).value_counts()
+
 def plot_results(lump_sum_results, monthly_results, cdb_results):
-    """Gera e salva os gráficos dos resultados."""
+    """Gera e salva os gráficos dos resultados (DataFrames ou `results.CompactResult`)."""
     print("Gerando gráficos...")
+    aportes_por_ativo = contribution_counts(monthly_results)
+    lump_sum_results, monthly_results, cdb_results = (results.as_frame(r) for r in (lump_sum_results, monthly_results, cdb_results))
     
     if config.SAVE_PLOTS:
         os.makedirs(config.PLOT_DIR, exist_ok=True)
@@ -76,16 +93,8 @@ def plot_results(lump_sum_results, monthly_results, cdb_results):
 
     # Gráfico 4: Distribuição de Aportes Mensais
     fig4, ax4 = plt.subplots(figsize=(14, 8))
-    monthly_contributions = monthly_results['Ativo Aportado'].replace("", np.nan).resample('M').first().dropna()
-    
-    # Processa as entradas para lidar com múltiplos tickers por aporte
-    all_individual_contributions = []
-    for contribution_group in monthly_contributions:
-        all_individual_contributions.extend(contribution_group.split(','))
-    
-    contribution_counts = pd.Series(all_individual_contributions).value_counts()
-    if not contribution_counts.empty:
-        contribution_counts.plot(kind='bar', ax=ax4, color='coral')
+    if not aportes_por_ativo.empty:
+        aportes_por_ativo.plot(kind='bar', ax=ax4, color='coral')
         ax4.set_title('Quantidade de Aportes Mensais por Ativo', fontsize=18)
         ax4.set_xlabel('Ativo'); ax4.set_ylabel('Número de Aportes')
         ax4.tick_params(axis='x', rotation=90)
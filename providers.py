@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""
+Camada de gravação e reprodução das fontes de dados do `data_loader`.
+
+Todas as consultas externas do carregamento de dados passam por provedores
+nomeados (ver `data_loader.get_provider`):
+
+- 'yfinance': um ticker, `(ticker, inicio, fim)`;
+- 'yfinance_lote': vários tickers, `(tickers, inicio, fim)`;
+- 'sgs': um bloco de uma série do Banco Central, `(nome, codigo, inicio, fim)`;
+- 'mt5': barras diárias do MetaTrader 5, `(simbolo, timeframe, inicio, fim)`.
+
+Com `config.PROVEDOR_MODO = 'gravar'`, cada resposta real é gravada em
+`config.PROVEDOR_DIRETORIO` (um pickle por consulta). Com 'reproduzir', as
+respostas gravadas são servidas sem acesso à rede, com latência e taxa de
+falhas configuráveis (`PROVEDOR_LATENCIA`, `PROVEDOR_JITTER` e
+`PROVEDOR_TAXA_FALHAS`). Assim, a concorrência, as novas tentativas e o cache
+do carregador podem ser medidos e ajustados de forma reproduzível, mesmo em
+uma máquina sem rede (e sem o terminal do MetaTrader 5).
+"""
+
+import hashlib
+import os
+import pickle
+import random
+import threading
+import time
+from datetime import date, datetime
+
+import pandas as pd
+
+import config
+
+MODOS = (None, 'gravar', 'reproduzir')
+
+
+# Provedores de reprodução já criados, por nome e parâmetros (ver `wrap`)
+_REPRODUTORES = {}
+_LOCK_REPRODUTORES = threading.Lock()
+
+
+class ProviderFailure(ConnectionError):
+    """Falha injetada pelo modo de reprodução (tratada como um erro de rede)."""
+
+
+class MissingRecording(FileNotFoundError):
+    """Consulta sem gravação no modo de reprodução (não adianta tentar de novo)."""
+
+
+def _normalize(valor):
+    """Forma canônica de um argumento de consulta, para a chave da gravação."""
+    if isinstance(valor, (list, tuple)):
+        return [_normalize(v) for v in valor]
+    if isinstance(valor, (datetime, date, pd.Timestamp)):
+        return pd.Timestamp(valor).isoformat()
+    return str(valor)
+
+
+def fixture_path(diretorio, nome, argumentos):
+    """Arquivo da gravação de uma consulta do provedor `nome` com os `argumentos` dados."""
+    chave = hashlib.sha256(repr((nome, _normalize(argumentos))).encode('utf-8')).hexdigest()[:24]
+    return os.path.join(diretorio, f"{nome}-{chave}.pkl")
+
+
+class RecordingProvider:
+    """Executa o provedor real e grava cada resposta (exceções não são gravadas)."""
+
+    def __init__(self, nome, buscar, diretorio):
+        self.nome = nome
+        self.buscar = buscar
+        self.diretorio = diretorio
+
+    def __call__(self, *argumentos):
+        resposta = self.buscar(*argumentos)
+        os.makedirs(self.diretorio, exist_ok=True)
+        path = fixture_path(self.diretorio, self.nome, argumentos)
+        temporario = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as f:
+            pickle.dump({'argumentos': _normalize(argumentos), 'resposta': resposta}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, path)
+        return resposta
+
+
+class ReplayProvider:
+    """Serve as respostas gravadas, com latência e falhas injetadas.
+
+    Cada consulta espera `latencia` segundos (variando em até `jitter`, para
+    mais ou para menos) e falha com probabilidade `taxa_falhas`, levantando
+    `ProviderFailure`. Uma consulta sem gravação levanta `MissingRecording`.
+
+    O sorteio de cada consulta usa uma semente derivada de `semente`, do nome do
+    provedor, dos argumentos e de quantas vezes a mesma consulta já foi feita:
+    consultas diferentes (ex.: CDI e IPCA) e novas tentativas têm sorteios
+    próprios, que não dependem da ordem em que as threads chegam.
+    """
+
+    def __init__(self, nome, diretorio, latencia=0.0, jitter=0.0, taxa_falhas=0.0, semente=None, dormir=time.sleep):
+        self.nome = nome
+        self.diretorio = diretorio
+        self.latencia = latencia
+        self.jitter = jitter
+        self.taxa_falhas = taxa_falhas
+        self.dormir = dormir
+        self.semente = random.getrandbits(64) if semente is None else semente
+        self._lock = threading.Lock()
+        self._repeticoes = {}       # arquivo da gravação -> consultas já feitas
+        self.consultas = 0
+
+    def __call__(self, *argumentos):
+        path = fixture_path(self.diretorio, self.nome, argumentos)
+        with self._lock:
+            self.consultas += 1
+            repeticao = self._repeticoes.get(path, 0)
+            self._repeticoes[path] = repeticao + 1
+        rng = random.Random(f"{self.semente}:{os.path.basename(path)}:{repeticao}")
+        espera = self.latencia * rng.uniform(1 - self.jitter, 1 + self.jitter)
+        if espera > 0:
+            self.dormir(espera)
+        if rng.random() < self.taxa_falhas:
+            raise ProviderFailure(f"falha injetada em {self.nome}")
+        if not os.path.exists(path):
+            raise MissingRecording(f"nenhuma gravação de {self.nome} para {_normalize(argumentos)}")
+        with open(path, 'rb') as f:
+            return pickle.load(f)['resposta']
+
+
+def wrap(nome, buscar, modo=None):
+    """Provedor `nome` no modo de `config.PROVEDOR_MODO` (ou `modo`): real, gravando ou reproduzindo."""
+    modo = config.PROVEDOR_MODO if modo is None else modo
+    if modo not in MODOS:
+        raise ValueError(f"Modo de provedor desconhecido: {modo!r}. Use um de {MODOS}.")
+    if modo == 'gravar':
+        return RecordingProvider(nome, buscar, config.PROVEDOR_DIRETORIO)
+    if modo == 'reproduzir':
+        # Um único reprodutor por provedor e configuração, para que passagens seguidas
+        # (ex.: atualização incremental e depois completa) continuem a mesma sequência de sorteios
+        parametros = (nome, config.PROVEDOR_DIRETORIO, config.PROVEDOR_LATENCIA, config.PROVEDOR_JITTER,
+                      config.PROVEDOR_TAXA_FALHAS, config.PROVEDOR_SEMENTE)
+        with _LOCK_REPRODUTORES:
+            if parametros not in _REPRODUTORES:
+                _REPRODUTORES[parametros] = ReplayProvider(*parametros)
+            return _REPRODUTORES[parametros]
+    return buscar
+
+
+class MT5Provider:
+    """Substituto do pacote MetaTrader5 que grava ou reproduz `copy_rates_range`.
+
+    Na reprodução, a conexão sempre tem sucesso e nenhum terminal é necessário
+    (`modulo` pode ser None).
+    """
+
+    # Valor de mt5.TIMEFRAME_D1, para a reprodução sem o pacote instalado
+    TIMEFRAME_D1 = 16408
+
+    def __init__(self, modulo, modo=None):
+        self.modulo = modulo
+        self.modo = config.PROVEDOR_MODO if modo is None else modo
+        self.TIMEFRAME_D1 = getattr(modulo, 'TIMEFRAME_D1', MT5Provider.TIMEFRAME_D1)
+        self.copy_rates_range = wrap('mt5', lambda *a: modulo.copy_rates_range(*a), self.modo)
+
+    def initialize(self):
+        return True if self.modo == 'reproduzir' else self.modulo.initialize()
+
+    def shutdown(self):
+        if self.modo != 'reproduzir':
+            self.modulo.shutdown()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+Formato compacto dos resultados dos cenários.
+
+O DataFrame padrão de cada cenário tem uma linha por dia do calendário (cerca
+de 40% são fins de semana e feriados, que apenas repetem o pregão anterior),
+valores em float64 e colunas de texto ('Ativo Aportado'). O `CompactResult`
+guarda apenas os pregões, os valores por ticker em float32 e, no lugar das
+colunas de texto, dois arrays estruturados: o livro de aportes (data, índice do
+ticker, valor, ações compradas e preço) e os eventos do freio automático.
+
+O formato compacto é ativado com `config.RESULTADO_COMPACTO` e ocupa algumas
+vezes menos memória, o que importa ao manter muitos resultados ao mesmo tempo.
+`to_frame()` volta para um DataFrame (por pregão) quando necessário.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from engine_utils import APORTE_CDB, SEM_APORTE
+
+# Uma linha por compra: no cenário misto, `ticker` pode ser APORTE_CDB (cotas do
+# CDI ao nível do índice) ou SEM_APORTE (nenhum ativo cotado, nada comprado).
+DTYPE_APORTE = np.dtype([
+    ('data', 'datetime64[D]'),
+    ('ticker', np.int32),
+    ('valor', np.float64),
+    ('acoes', np.float64),
+    ('preco', np.float64),
+])
+
+# Uma linha por evento; `fim_quarentena` é NaT quando o freio é desativado.
+DTYPE_FREIO = np.dtype([
+    ('data', 'datetime64[D]'),
+    ('ticker', np.int32),
+    ('ativado', np.bool_),
+    ('fim_quarentena', 'datetime64[D]'),
+])
+
+
+@dataclass
+class CompactResult:
+    """Resultado de um cenário apenas nos pregões, com livro de aportes e eventos do freio."""
+    dates: pd.DatetimeIndex         # pregões do período
+    tickers: list
+    valores: np.ndarray             # float32 (pregões x tickers)
+    colunas: dict                   # nome -> vetor float64 por pregão (Total, benchmarks, ...)
+    aportes: np.ndarray             # DTYPE_APORTE
+    eventos_freio: np.ndarray       # DTYPE_FREIO
+
+    @property
+    def nbytes(self):
+        """Memória ocupada pelos arrays do resultado (em bytes)."""
+        return (self.valores.nbytes + sum(v.nbytes for v in self.colunas.values())
+                + self.aportes.nbytes + self.eventos_freio.nbytes + self.dates.nbytes)
+
+    def ticker_names(self, codigos):
+        """Nomes dos tickers do livro de aportes ('CDB' para APORTE_CDB, NA para SEM_APORTE)."""
+        nomes = np.array(list(self.tickers) + [pd.NA, 'CDB'], dtype=object)
+        return nomes[np.asarray(codigos)]
+
+    def contribution_counts(self):
+        """Quantidade de aportes por ativo, em ordem decrescente."""
+        feitos = self.aportes[self.aportes['ticker'] != SEM_APORTE]
+        return pd.Series(self.ticker_names(feitos['ticker'])).value_counts()
+
+    def to_frame(self):
+        """DataFrame por pregão com as colunas do formato padrão ('Aporte' e 'Ativo Aportado' vêm do livro de aportes)."""
+        df = pd.DataFrame(self.valores.astype(np.float64), index=self.dates, columns=self.tickers)
+        for nome, valores in self.colunas.items():
+            df[nome] = valores
+        if len(self.aportes):
+            datas = pd.DatetimeIndex(self.aportes['data'])
+            livro = pd.DataFrame({'Aporte': self.aportes['valor'], 'Ativo Aportado': self.ticker_names(self.aportes['ticker'])}, index=datas)
+            por_dia = livro.groupby(level=0).agg({'Aporte': 'sum', 'Ativo Aportado': lambda s: ",".join(s.dropna())})
+            df['Aporte'] = por_dia['Aporte'].reindex(self.dates)
+            df['Ativo Aportado'] = por_dia['Ativo Aportado'].replace("", np.nan).reindex(self.dates)
+        return df
+
+
+def as_frame(resultado):
+    """DataFrame de um resultado em qualquer um dos dois formatos."""
+    return resultado.to_frame() if isinstance(resultado, CompactResult) else resultado
+
+
+def compact_result(panel, tickers, valores, curvas, aportes, eventos_freio=None):
+    """Monta o `CompactResult` a partir das saídas de um motor.
+
+    `valores` é (pregões x tickers) e `curvas` são vetores no calendário do
+    painel (ex.: Total, CDI, IPCA_Benchmark), dos quais só os pregões são guardados.
+    """
+    return CompactResult(
+        dates=panel.dates,
+        tickers=list(tickers),
+        valores=np.asarray(valores, dtype=np.float32),
+        colunas={nome: np.asarray(curva, dtype=np.float64)[panel.posicao_pregao] for nome, curva in curvas.items()},
+        aportes=aportes,
+        eventos_freio=freio_events(eventos_freio or []),
+    )
+
+
+def lump_sum_ledger(dates, close, valores):
+    """Livro de aportes do aporte único: uma compra por ticker comprado no primeiro pregão."""
+    if not len(dates):
+        return np.zeros(0, dtype=DTYPE_APORTE)
+    comprados = np.flatnonzero(valores[0] > 0)
+    livro = np.zeros(len(comprados), dtype=DTYPE_APORTE)
+    livro['data'] = dates[0].to_datetime64()
+    livro['ticker'] = comprados
+    livro['valor'] = valores[0, comprados]
+    livro['preco'] = close[0, comprados]
+    livro['acoes'] = livro['valor'] / livro['preco']
+    return livro
+
+
+def monthly_ledger(dates, aporte, selecionados, close):
+    """Livro de aportes do motor de aportes mensais (`selecionados`: pregão -> índices escolhidos).
+
+    Aportes sem nenhum ativo elegível (todos em quarentena ou sem cotação)
+    entram como SEM_APORTE, de modo que o livro soma o total investido.
+    """
+    linhas = []
+    for i in np.flatnonzero(~np.isnan(aporte)):
+        escolhidos = selecionados.get(i, [SEM_APORTE])
+        linhas.extend((i, t, aporte[i] / len(escolhidos)) for t in escolhidos)
+    livro = np.zeros(len(linhas), dtype=DTYPE_APORTE)
+    if linhas:
+        dias, tickers, valores = (np.array(c) for c in zip(*linhas))
+        livro['data'] = dates.values[dias]
+        livro['ticker'] = tickers
+        livro['valor'] = valores
+        livro['preco'] = np.where(tickers >= 0, close[dias, np.maximum(tickers, 0)], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            livro['acoes'] = np.where(livro['preco'] > 0, valores / livro['preco'], 0.0)
+    return livro
+
+
+def cdb_mixed_ledger(dates, aporte, escolhido, close, indice_cdi):
+    """Livro de aportes do motor do cenário misto (`escolhido`: ticker, APORTE_CDB ou SEM_APORTE por pregão)."""
+    dias = np.flatnonzero(~np.isnan(aporte))
+    destino = escolhido[dias]
+    livro = np.zeros(len(dias), dtype=DTYPE_APORTE)
+    livro['data'] = dates.values[dias]
+    livro['ticker'] = destino
+    livro['valor'] = aporte[dias]
+    preco = np.full(len(dias), np.nan)
+    em_acoes = destino >= 0
+    preco[em_acoes] = close[dias[em_acoes], destino[em_acoes]]
+    preco[destino == APORTE_CDB] = indice_cdi[dias[destino == APORTE_CDB]]
+    livro['preco'] = preco
+    livro['acoes'] = np.where(destino != SEM_APORTE, livro['valor'] / np.where(destino != SEM_APORTE, preco, 1.0), 0.0)
+    return livro
+
+
+def freio_events(eventos_freio):
+    """Converte os eventos do freio (dia, ticker, tipo, fim da quarentena) para DTYPE_FREIO."""
+    eventos = np.zeros(len(eventos_freio), dtype=DTYPE_FREIO)
+    for k, (dia, t, tipo, fim_quarentena) in enumerate(eventos_freio):
+        eventos[k] = (np.datetime64(dia, 'D'), t, tipo == 'ativado',
+                      np.datetime64(fim_quarentena, 'D') if fim_quarentena is not None else np.datetime64('NaT'))
+    return eventos
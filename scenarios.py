@@ -2,7 +2,12 @@
 
 import pandas as pd
 import numpy as np
+import benchmarks
+import checkpoint
 import config
+import engines
+import market_panel
+import results
 
 # --- Funções Auxiliares ---
 
@@ -12,199 +17,191 @@ def calculate_cagr(start_value, end_value, years):
         return 0
     return (end_value / start_value) ** (1 / years) - 1
 
-def run_lump_sum_backtest(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim):
-    """Executa o backtest para o cenário de Aporte Único."""
+def calculate_time_weighted_curve(valores, aportes):
+    """Índice de rentabilidade (base 1) que desconta os aportes, para comparar carteiras com fluxos.
+
+    O aporte de um dia é feito no fechamento, então o retorno do dia é
+    (valor - aporte) / valor do dia anterior.
+    """
+    valores = np.asarray(valores, dtype=float)
+    aportes = np.nan_to_num(np.asarray(aportes, dtype=float))
+    anterior = np.concatenate(([0.0], valores[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fator = np.where(anterior > 0, (valores - aportes) / anterior, 1.0)
+    return np.cumprod(fator)
+
+def _contribution_schedule(panel, aporte):
+    """Posições no calendário e valores dos aportes feitos (aporte por pregão, NaN sem aporte)."""
+    aporte = np.asarray(aporte, dtype=float)
+    feitos = ~np.isnan(aporte)
+    return panel.posicao_pregao[feitos], aporte[feitos]
+
+def calculate_max_drawdown(curva):
+    """Maior queda percentual de uma curva em relação ao seu pico anterior."""
+    curva = np.asarray(curva, dtype=float)
+    if curva.size == 0:
+        return 0.0
+    picos = np.maximum.accumulate(curva)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quedas = np.where(picos > 0, 1 - curva / picos, 0.0)
+    return float(np.nanmax(quedas))
+
+def _print_freio_events(eventos_freio, tickers):
+    """Imprime os eventos do freio automático registrados por um motor de aportes."""
+    for dia, t, tipo, fim_quarentena in eventos_freio:
+        if tipo == 'desativado':
+            print(f"  FREIO DESATIVADO para {tickers[t]} em {dia.strftime('%Y-%m-%d')}.")
+        else:
+            print(f"  FREIO ATIVADO para {tickers[t]} em {dia.strftime('%Y-%m-%d')}.")
+            print(f"  Ativo em quarentena até {fim_quarentena.strftime('%Y-%m-%d')}.")
+
+def _contributed_tickers_column(selecionados, tickers, n_dias):
+    """Monta a coluna 'Ativo Aportado' (tickers separados por vírgula) a partir dos índices escolhidos."""
+    coluna = np.full(n_dias, np.nan, dtype=object)
+    for i, escolhidos in selecionados.items():
+        coluna[i] = ",".join(tickers[t] for t in escolhidos)
+    return coluna
+
+def run_lump_sum_backtest(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim, panel=None, checkpoint_dir=None, compacto=None):
+    """Executa o backtest para o cenário de Aporte Único.
+
+    Com `checkpoint_dir`, o motor continua da última execução salva e processa apenas os pregões novos.
+    Com `compacto` (padrão: `config.RESULTADO_COMPACTO`), retorna um `results.CompactResult`.
+    """
+    compacto = config.RESULTADO_COMPACTO if compacto is None else compacto
     print("\n--- CENÁRIO 1: APORTE ÚNICO INICIAL ---")
-    all_dates = pd.date_range(start=data_inicio, end=data_fim, freq='D')
-    curva_de_capital = pd.DataFrame(index=all_dates)
-    valid_tickers = [col for col in tickers_sa if col in data_historica['Close'].columns and not data_historica['Close'][col].dropna().empty]
+    if panel is None:
+        panel = market_panel.build_market_panel(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim)
+    all_dates = panel.calendar
+    valid_tickers = panel.valid_tickers(tickers_sa)
 
     num_empresas = len(valid_tickers)
     investimento_total_inicial = config.VALOR_INVESTIDO_POR_EMPRESA * num_empresas
 
     print("Processando backtest para cada empresa...")
-    for ticker in valid_tickers:
-        stock_data = data_historica.loc[:, (slice(None), ticker)]
-        stock_data.columns = stock_data.columns.droplevel(1)
-        
-        num_shares = config.VALOR_INVESTIDO_POR_EMPRESA / stock_data['Close'].iloc[0]
-        daily_value = pd.Series(index=all_dates, dtype=float)
-
-        for date, row in stock_data.iterrows():
-            if 'Dividends' in row and row['Dividends'] > 0:
-                num_shares += (num_shares * row['Dividends']) / row['Close']
-            daily_value[date] = num_shares * row['Close']
-        
-        curva_de_capital[ticker] = daily_value.ffill()
-
-    curva_de_capital.fillna(0, inplace=True)
-    curva_de_capital['Total'] = curva_de_capital[valid_tickers].sum(axis=1)
-
-    if benchmark_diaria is not None:
-        benchmark_acumulada = benchmark_diaria.cumprod()
-        curva_de_capital[config.BENCHMARK_NAME] = investimento_total_inicial * benchmark_acumulada.reindex(all_dates, method='ffill')
-
-    curva_de_capital = calculate_ipca_benchmark(curva_de_capital, ipca_mensal, investimento_total_inicial)
+    close, dividends = panel.arrays(valid_tickers)
+
+    def motor(inicio, estado):
+        num_shares = engines.lump_sum_shares(close[inicio:], dividends[inicio:], config.VALOR_INVESTIDO_POR_EMPRESA,
+                                             num_shares_anterior=estado['num_shares'] if estado else None)
+        return {'valores': num_shares * close[inicio:], 'estado': {'num_shares': num_shares[-1]}}
+
+    parametros = {'VALOR_INVESTIDO_POR_EMPRESA': config.VALOR_INVESTIDO_POR_EMPRESA}
+    valores = checkpoint.run_engine('aporte_unico', checkpoint_dir, panel, valid_tickers, parametros, motor)['valores']
+
+    # Pregões sem cotação de um ticker e dias sem negociação repetem o último valor; antes do primeiro pregão o valor é zero.
+    valores = pd.DataFrame(valores).ffill().fillna(0).to_numpy()
+    curvas = {'Total': panel.to_calendar(valores.sum(axis=1))}
+    if panel.indice_benchmark is not None:
+        # Antes da primeira cotação do benchmark a curva fica vazia (NaN)
+        curva_benchmark = investimento_total_inicial * panel.indice_benchmark
+        curva_benchmark[:panel.inicio_benchmark] = np.nan
+        curvas[config.BENCHMARK_NAME] = curva_benchmark
+    if panel.indice_ipca_x is not None:
+        curvas['IPCA_Benchmark'] = investimento_total_inicial * panel.indice_ipca_x
+
+    if compacto:
+        curva_de_capital = results.compact_result(panel, valid_tickers, valores, curvas,
+                                                  aportes=results.lump_sum_ledger(panel.dates, close, valores))
+    else:
+        curva_de_capital = pd.DataFrame(panel.to_calendar(valores), index=all_dates, columns=valid_tickers)
+        for nome, curva in curvas.items():
+            curva_de_capital[nome] = curva
 
     anos = (pd.to_datetime(data_fim) - pd.to_datetime(data_inicio)).days / 365.25
-    valor_final_carteira = curva_de_capital['Total'].iloc[-1]
+    valor_final_carteira = curvas['Total'][-1]
     print("\n--- Resultados do Backtest (Aporte Único) ---")
     print(f"Período: {data_inicio} a {data_fim} ({anos:.1f} anos)")
     print(f"Investimento Inicial: R$ {investimento_total_inicial:,.2f}")
     print(f"Carteira: R$ {valor_final_carteira:,.2f} | CAGR: {calculate_cagr(investimento_total_inicial, valor_final_carteira, anos):.2%}")
-    if config.BENCHMARK_NAME in curva_de_capital and not curva_de_capital[config.BENCHMARK_NAME].isna().all():
-        valor_final_benchmark = curva_de_capital[config.BENCHMARK_NAME].iloc[-1]
+    if config.BENCHMARK_NAME in curvas and not np.isnan(curvas[config.BENCHMARK_NAME]).all():
+        valor_final_benchmark = curvas[config.BENCHMARK_NAME][-1]
         print(f"{config.BENCHMARK_NAME}:    R$ {valor_final_benchmark:,.2f} | CAGR: {calculate_cagr(investimento_total_inicial, valor_final_benchmark, anos):.2%}")
 
     return curva_de_capital
 
-def run_monthly_contributions_backtest(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim):
-    """Executa o backtest para o cenário de Aportes Mensais."""
+def run_monthly_contributions_backtest(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim, panel=None, checkpoint_dir=None, compacto=None):
+    """Executa o backtest para o cenário de Aportes Mensais.
+
+    Com `checkpoint_dir`, o motor continua da última execução salva e processa apenas os pregões novos.
+    Com `compacto` (padrão: `config.RESULTADO_COMPACTO`), retorna um `results.CompactResult`.
+    """
+    compacto = config.RESULTADO_COMPACTO if compacto is None else compacto
     print("\n\n--- CENÁRIO 2: APORTES MENSAIS CORRIGIDOS PELO IPCA ---")
     if config.FREIO_ATIVO:
         print("Freio automático de aportes ATIVADO.")
 
-    all_dates = pd.date_range(start=data_inicio, end=data_fim, freq='D')
-    valid_tickers = [col for col in tickers_sa if col in data_historica['Close'].columns and not data_historica['Close'][col].dropna().empty]
-    
-    # Correção: Inicia colunas 'Aporte' e 'Ativo Aportado' com NaN para permitir o preenchimento (ffill)
-    columns_to_initialize_zero = valid_tickers + ['Total', config.BENCHMARK_NAME, 'Total Investido']
-    portfolio_mensal = pd.DataFrame(0.0, index=all_dates, columns=columns_to_initialize_zero)
-    portfolio_mensal['Aporte'] = np.nan
-    portfolio_mensal['Ativo Aportado'] = np.nan
-
-    num_shares = {ticker: 0.0 for ticker in valid_tickers}
-    ipca_acumulado = (1 + ipca_mensal).cumprod().reindex(all_dates, method='ffill').fillna(1) if ipca_mensal is not None else pd.Series(1, index=all_dates)
-
-    # --- Variáveis para o Freio Automático ---
-    aportes_recentes = {ticker: [] for ticker in valid_tickers}
-    quarentena = {ticker: None for ticker in valid_tickers}
-    quarentena_duracao = {ticker: config.FREIO_QUARENTENA_INICIAL for ticker in valid_tickers}
-    # -----------------------------------------
+    if panel is None:
+        panel = market_panel.build_market_panel(data_historica, benchmark_diaria, ipca_mensal, tickers_sa, data_inicio, data_fim)
+    all_dates = panel.calendar
+    valid_tickers = panel.valid_tickers(tickers_sa)
 
-    valor_selic = 0.0
-    total_investido = 0.0
-    last_month_processed = None
+    # Apenas os pregões dentro do período são simulados; os demais dias são preenchidos ao final.
+    dias = panel.dates
+    close, dividends = panel.arrays(valid_tickers)
+    aportes = config.APORTE_MENSAL_BASE * panel.ipca_acumulado[panel.posicao_pregao]
 
     print("Processando backtest com aportes mensais...")
-    for dia in all_dates:
-        if dia not in data_historica.index:
-            if dia > all_dates[0]:
-                # Forward-fill: propaga valores do dia anterior para dias sem negociação
-                for ticker in valid_tickers:
-                    portfolio_mensal.loc[dia, ticker] = portfolio_mensal.loc[:dia, ticker].iloc[-2] if len(portfolio_mensal.loc[:dia, ticker]) > 1 else 0
-                portfolio_mensal.loc[dia, 'Total'] = portfolio_mensal.loc[:dia, 'Total'].iloc[-2] if len(portfolio_mensal.loc[:dia, 'Total']) > 1 else 0
-                portfolio_mensal.loc[dia, config.BENCHMARK_NAME] = valor_selic
-                portfolio_mensal.loc[dia, 'Total Investido'] = total_investido
-            continue
-
-        current_month = (dia.year, dia.month)
-        if current_month != last_month_processed:
-            last_month_processed = current_month
-            aporte_corrigido = config.APORTE_MENSAL_BASE * ipca_acumulado.loc[dia]
-            total_investido += aporte_corrigido
-            valor_selic += aporte_corrigido
-
-            portfolio_mensal.loc[dia, 'Aporte'] = aporte_corrigido
-
-            # --- Lógica do Freio Automático ---
-            ativos_elegiveis = valid_tickers
-            if config.FREIO_ATIVO:
-                # Libera ativos da quarentena se a data já passou
-                for ticker in quarentena:
-                    if quarentena[ticker] is not None and dia >= quarentena[ticker]:
-                        quarentena[ticker] = None
-                        print(f"  FREIO DESATIVADO para {ticker} em {dia.strftime('%Y-%m-%d')}.")
-
-                ativos_elegiveis = [
-                    ticker for ticker in valid_tickers if quarentena[ticker] is None
-                ]
-                # Se todos estiverem em quarentena, não aporta em ninguém.
-                if not ativos_elegiveis:
-                    ativos_elegiveis = []
-
-
-            valores_ativos = {
-                ticker: num_shares[ticker] * data_historica.loc[dia, ('Close', ticker)]
-                for ticker in ativos_elegiveis
-                if pd.notna(data_historica.loc[dia, ('Close', ticker)])
-            }
-            # ------------------------------------
-
-            if valores_ativos:
-                # --- Lógica de Seleção e Aporte Dividido ---
-                
-                # Ordena os ativos elegíveis pelo seu valor total em carteira (do menor para o maior)
-                ativos_ordenados = sorted(valores_ativos, key=valores_ativos.get)
-                
-                # Seleciona os 'n' primeiros, ou menos se não houver 'n' ativos elegíveis
-                num_a_selecionar = config.NUMERO_EMPRESAS_POR_APORTE
-                ativos_selecionados = ativos_ordenados[:num_a_selecionar]
-
-                if ativos_selecionados:
-                    # Divide o aporte igualmente entre os ativos selecionados
-                    aporte_por_ativo = aporte_corrigido / len(ativos_selecionados)
-                    
-                    # Registra os tickers que receberão aporte
-                    portfolio_mensal.loc[dia, 'Ativo Aportado'] = ",".join(ativos_selecionados)
-
-                    # Itera sobre os ativos selecionados para fazer o aporte e aplicar o freio
-                    for ticker in ativos_selecionados:
-                        preco = data_historica.loc[dia, ('Close', ticker)]
-                        if pd.notna(preco) and preco > 0:
-                            num_shares[ticker] += aporte_por_ativo / preco
-
-                        # --- Lógica de Gatilho do Freio (aplicada individualmente) ---
-                        if config.FREIO_ATIVO:
-                            aportes_recentes[ticker].append(dia)
-                            
-                            # Remove aportes mais antigos que o período de verificação
-                            limite_tempo = dia - pd.DateOffset(months=config.FREIO_PERIODO_APORTES)
-                            aportes_recentes[ticker] = [
-                                d for d in aportes_recentes[ticker] if d >= limite_tempo
-                            ]
-
-                            if len(aportes_recentes[ticker]) > 1:
-                                print(f"  FREIO ATIVADO para {ticker} em {dia.strftime('%Y-%m-%d')}.")
-                                
-                                # Define a data de fim da quarentena
-                                fim_quarentena = dia + pd.DateOffset(months=quarentena_duracao[ticker])
-                                quarentena[ticker] = fim_quarentena
-                                print(f"  Ativo em quarentena até {fim_quarentena.strftime('%Y-%m-%d')}.")
-
-                                # Aumenta a próxima duração da quarentena para este ativo
-                                quarentena_duracao[ticker] += config.FREIO_QUARENTENA_ADICIONAL
-        
-        if benchmark_diaria is not None and dia in benchmark_diaria.index:
-            valor_selic *= benchmark_diaria.loc[dia]
-
-        valor_total_dia = 0
-        for ticker in valid_tickers:
-            if pd.notna(data_historica.loc[dia, ('Close', ticker)]):
-                preco_dia = data_historica.loc[dia, ('Close', ticker)]
-                if ('Dividends', ticker) in data_historica.columns and pd.notna(data_historica.loc[dia, ('Dividends', ticker)]) and data_historica.loc[dia, ('Dividends', ticker)] > 0:
-                    num_shares[ticker] += (num_shares[ticker] * data_historica.loc[dia, ('Dividends', ticker)]) / preco_dia
-                valor_ativo = num_shares[ticker] * preco_dia
-                portfolio_mensal.loc[dia, ticker] = valor_ativo
-                valor_total_dia += valor_ativo
-
-        portfolio_mensal.loc[dia, 'Total'] = valor_total_dia
-        portfolio_mensal.loc[dia, config.BENCHMARK_NAME] = valor_selic
-        portfolio_mensal.loc[dia, 'Total Investido'] = total_investido
-
-    portfolio_mensal.ffill(inplace=True)
-    portfolio_mensal = calculate_ipca_benchmark(portfolio_mensal, ipca_mensal, portfolio_mensal['Total Investido'])
-
-    valor_final_carteira_m = portfolio_mensal['Total'].iloc[-1]
-    total_investido_final = portfolio_mensal['Total Investido'].iloc[-1]
+    parametros = {
+        'APORTE_MENSAL_BASE': config.APORTE_MENSAL_BASE,
+        'NUMERO_EMPRESAS_POR_APORTE': config.NUMERO_EMPRESAS_POR_APORTE,
+        'FREIO_ATIVO': config.FREIO_ATIVO,
+        'FREIO_PERIODO_APORTES': config.FREIO_PERIODO_APORTES,
+        'FREIO_QUARENTENA_INICIAL': config.FREIO_QUARENTENA_INICIAL,
+        'FREIO_QUARENTENA_ADICIONAL': config.FREIO_QUARENTENA_ADICIONAL,
+    }
+
+    def motor(inicio, estado):
+        return engines.monthly_contributions_engine(
+            dias[inicio:], close[inicio:], dividends[inicio:], aportes[inicio:],
+            config.NUMERO_EMPRESAS_POR_APORTE,
+            freio_ativo=config.FREIO_ATIVO,
+            freio_periodo=config.FREIO_PERIODO_APORTES,
+            quarentena_inicial=config.FREIO_QUARENTENA_INICIAL,
+            quarentena_adicional=config.FREIO_QUARENTENA_ADICIONAL,
+            estado=estado,
+        )
+
+    resultado = checkpoint.run_engine('aportes_mensais', checkpoint_dir, panel, valid_tickers, parametros, motor)
+    _print_freio_events(resultado['eventos_freio'], valid_tickers)
+
+    # Dias sem negociação repetem o dia anterior; antes do primeiro pregão os valores são zero.
+    curvas = {'Total': panel.to_calendar(resultado['total'])}
+    # Os benchmarks recebem os mesmos aportes, nos mesmos dias, e já rendem no dia do aporte
+    posicoes_aporte, valores_aporte = _contribution_schedule(panel, resultado['aporte'])
+    indice_cdi = panel.indice_benchmark if panel.indice_benchmark is not None else np.ones(len(all_dates))
+    curvas[config.BENCHMARK_NAME] = benchmarks.contribution_weighted(indice_cdi, posicoes_aporte, valores_aporte)
+    curvas['Total Investido'] = panel.to_calendar(resultado['total_investido'])
+    if panel.indice_ipca_x is not None:
+        curvas['IPCA_Benchmark'] = benchmarks.contribution_weighted(panel.indice_ipca_x, posicoes_aporte, valores_aporte)
+
+    if compacto:
+        portfolio_mensal = results.compact_result(
+            panel, valid_tickers, resultado['valores'], curvas,
+            aportes=results.monthly_ledger(dias, resultado['aporte'], resultado['selecionados'], close),
+            eventos_freio=resultado['eventos_freio'])
+    else:
+        portfolio_mensal = pd.DataFrame(panel.to_calendar(resultado['valores']), index=all_dates, columns=valid_tickers)
+        for nome in ('Total', config.BENCHMARK_NAME, 'Total Investido'):
+            portfolio_mensal[nome] = curvas[nome]
+        # O aporte e os ativos aportados valem para todo o mês
+        aporte = pd.Series(resultado['aporte']).ffill().to_numpy()
+        portfolio_mensal['Aporte'] = panel.to_calendar(aporte, antes_do_inicio=np.nan)
+        ativo_aportado = pd.Series(_contributed_tickers_column(resultado['selecionados'], valid_tickers, len(dias))).ffill().to_numpy()
+        portfolio_mensal['Ativo Aportado'] = panel.to_calendar(ativo_aportado, antes_do_inicio=np.nan)
+        if 'IPCA_Benchmark' in curvas:
+            portfolio_mensal['IPCA_Benchmark'] = curvas['IPCA_Benchmark']
+
+    valor_final_carteira_m = curvas['Total'][-1]
+    total_investido_final = curvas['Total Investido'][-1]
     anos = (pd.to_datetime(data_fim) - pd.to_datetime(data_inicio)).days / 365.25
     print("\n--- Resultados do Backtest (Aportes Mensais) ---")
     print(f"Período: {data_inicio} a {data_fim} ({anos:.1f} anos)")
     print(f"Total Investido (corrigido): R$ {total_investido_final:,.2f}")
     if total_investido_final > 0:
         print(f"Carteira: R$ {valor_final_carteira_m:,.2f} | Retorno sobre Investimento: {valor_final_carteira_m / total_investido_final - 1:.2%}")
-        if config.BENCHMARK_NAME in portfolio_mensal and not portfolio_mensal[config.BENCHMARK_NAME].isna().all():
-            valor_final_benchmark_m = portfolio_mensal[config.BENCHMARK_NAME].iloc[-1]
+        if not np.isnan(curvas[config.BENCHMARK_NAME]).all():
+            valor_final_benchmark_m = curvas[config.BENCHMARK_NAME][-1]
             print(f"{config.BENCHMARK_NAME}:    R$ {valor_final_benchmark_m:,.2f} | Retorno sobre Investimento: {valor_final_benchmark_m / total_investido_final - 1:.2%}")
     else:
         print(f"Carteira: R$ {valor_final_carteira_m:,.2f}")
@@ -213,145 +210,92 @@ def run_monthly_contributions_backtest(data_historica, benchmark_diaria, ipca_me
     return portfolio_mensal
 
 def calculate_ipca_benchmark(portfolio_df, ipca_mensal, initial_investment):
-    """Calcula o benchmark IPCA + X% e o adiciona ao dataframe do portfólio."""
+    """Calcula o benchmark IPCA + X% e o adiciona ao dataframe do portfólio.
+
+    O índice acumulado vem do cache de `benchmarks.py` (ver `benchmarks.ipca_x_index`).
+    """
     if ipca_mensal is None:
         return portfolio_df
 
-    # Converte a taxa de juros real anual para uma taxa diária
-    taxa_juros_real_anual = config.IPCA_BENCHMARK_X / 100.0
-    if taxa_juros_real_anual == 0:
-        taxa_juros_real_diaria = 0.0
-    else:
-        taxa_juros_real_diaria = (1 + taxa_juros_real_anual) ** (1 / 252) - 1
-
-    # Prepara o dataframe do benchmark
-    benchmark_df = pd.DataFrame(index=portfolio_df.index)
-    benchmark_df['ipca'] = ipca_mensal.reindex(benchmark_df.index, method='ffill')
-    benchmark_df.fillna(0, inplace=True)
-
-    # Identifica o último dia de cada mês no índice
-    is_last_day_of_month = benchmark_df.index.to_series().dt.is_month_end
-
-    # O fator de correção do IPCA é aplicado apenas no último dia do mês.
-    ipca_fator = (1 + benchmark_df['ipca'] / 100).where(is_last_day_of_month, 1)
-
-    # O juro real é aplicado diariamente.
-    juro_real_fator = (1 + taxa_juros_real_diaria)
-
-    # Combina os fatores
-    fator_diario = ipca_fator * juro_real_fator
-    
-    # Calcula o benchmark acumulado
-    benchmark_acumulado = fator_diario.cumprod()
-    
-    # Adiciona a coluna do benchmark ao dataframe do portfólio
-    portfolio_df['IPCA_Benchmark'] = initial_investment * benchmark_acumulado
-    
+    portfolio_df['IPCA_Benchmark'] = initial_investment * benchmarks.ipca_x_index(ipca_mensal, portfolio_df.index)
+
     return portfolio_df
 
-def run_scenario_cdb_mixed(start_date, end_date, monthly_contribution, portfolio_data, benchmark_data, ipca_data, cdb_percentage):
-    """Executa o backtest para o cenário com alocação em CDB."""
-    print("\n\n--- CENÁRIO 3: APORTES MENSAIS COM ALOCAÇÃO EM CDB ---")
+def run_scenario_cdb_mixed(start_date, end_date, monthly_contribution, portfolio_data, benchmark_data, ipca_data, cdb_percentage, panel=None, checkpoint_dir=None, compacto=None):
+    """Executa o backtest para o cenário com alocação em CDB.
 
-    all_dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    valid_tickers = [col for col in config.TICKERS_EMPRESAS if col in portfolio_data['Close'].columns and not portfolio_data['Close'][col].dropna().empty]
-    
-    columns = valid_tickers + ['CDB', 'Total', config.BENCHMARK_NAME, 'Total Investido']
-    results_df = pd.DataFrame(0.0, index=all_dates, columns=columns)
-    results_df['Aporte'] = np.nan
-    results_df['Ativo Aportado'] = pd.NA  # Initialize with pandas NA to allow proper string handling
+    Com `checkpoint_dir`, o motor continua da última execução salva e processa apenas os pregões novos.
+    Com `compacto` (padrão: `config.RESULTADO_COMPACTO`), retorna um `results.CompactResult`.
+    """
+    compacto = config.RESULTADO_COMPACTO if compacto is None else compacto
+    print("\n\n--- CENÁRIO 3: APORTES MENSAIS COM ALOCAÇÃO EM CDB ---")
 
-    num_shares = {ticker: 0.0 for ticker in valid_tickers}
-    cdb_value = 0.0
-    total_investido = 0.0
-    valor_selic_benchmark = 0.0
-    last_month_processed = None
+    if panel is None:
+        panel = market_panel.build_market_panel(portfolio_data, benchmark_data, ipca_data, config.TICKERS_EMPRESAS, start_date, end_date)
+    all_dates = panel.calendar
+    valid_tickers = panel.valid_tickers(config.TICKERS_EMPRESAS)
 
-    # --- Variáveis para o Freio Automático (Cenário 3) ---
-    aportes_recentes = {ticker: [] for ticker in valid_tickers}
-    quarentena = {ticker: None for ticker in valid_tickers}
-    quarentena_duracao = {ticker: config.FREIO_QUARENTENA_INICIAL for ticker in valid_tickers}
-    # ----------------------------------------------------
+    dias = panel.dates
+    close, dividends = panel.arrays(valid_tickers)
+    aportes = monthly_contribution * panel.ipca_acumulado[panel.posicao_pregao]
 
-    ipca_acumulado = (1 + ipca_data).cumprod().reindex(all_dates, method='ffill').fillna(1) if ipca_data is not None else pd.Series(1, index=all_dates)
+    # O CDB e o benchmark rendem em todos os dias do calendário do CDI, inclusive sem pregão.
+    indice_cdi = panel.indice_benchmark if panel.indice_benchmark is not None else np.ones(len(all_dates))
 
     print("Processando backtest com aportes mensais e alocação em CDB...")
-    for dia in all_dates:
-        # Apply daily interest to CDB and benchmark at the beginning of the day
-        if benchmark_data is not None and dia in benchmark_data.index:
-            cdb_value *= benchmark_data.loc[dia]
-            valor_selic_benchmark *= benchmark_data.loc[dia]
-
-        if dia not in portfolio_data.index:
-            if dia > all_dates[0]:
-                for ticker in valid_tickers:
-                    results_df.loc[dia, ticker] = results_df.loc[dia - pd.Timedelta(days=1), ticker]
-                results_df.loc[dia, 'CDB'] = cdb_value
-                results_df.loc[dia, 'Total'] = results_df.loc[dia - pd.Timedelta(days=1), 'Total']
-                results_df.loc[dia, config.BENCHMARK_NAME] = valor_selic_benchmark
-                results_df.loc[dia, 'Total Investido'] = total_investido
-            continue
-
-        current_month = (dia.year, dia.month)
-        if current_month != last_month_processed:
-            last_month_processed = current_month
-            aporte_corrigido = monthly_contribution * ipca_acumulado.loc[dia]
-            total_investido += aporte_corrigido
-            valor_selic_benchmark += aporte_corrigido
-            results_df.loc[dia, 'Aporte'] = aporte_corrigido
-
-            total_portfolio_value = sum(num_shares[ticker] * portfolio_data.loc[dia, ('Close', ticker)] for ticker in valid_tickers if pd.notna(portfolio_data.loc[dia, ('Close', ticker)])) + cdb_value
-
-            # Lógica de alocação
-            if (total_portfolio_value > 0 and (cdb_value / total_portfolio_value) < cdb_percentage) or total_portfolio_value == 0:
-                cdb_value += aporte_corrigido
-                results_df.loc[dia, 'Ativo Aportado'] = 'CDB'
-            else:
-                valores_ativos = {
-                    ticker: num_shares[ticker] * portfolio_data.loc[dia, ('Close', ticker)]
-                    for ticker in valid_tickers
-                    if pd.notna(portfolio_data.loc[dia, ('Close', ticker)])
-                }
-                if valores_ativos:
-                    ativo_menor_valor = min(valores_ativos, key=valores_ativos.get)
-                    preco = portfolio_data.loc[dia, ('Close', ativo_menor_valor)]
-                    if pd.notna(preco) and preco > 0:
-                        num_shares[ativo_menor_valor] += aporte_corrigido / preco
-                        results_df.loc[dia, 'Ativo Aportado'] = ativo_menor_valor
-
-        # Atualiza valores diários do portfólio
-        valor_total_dia = 0
-        for ticker in valid_tickers:
-            if pd.notna(portfolio_data.loc[dia, ('Close', ticker)]):
-                preco_dia = portfolio_data.loc[dia, ('Close', ticker)]
-                if ('Dividends', ticker) in portfolio_data.columns and pd.notna(portfolio_data.loc[dia, ('Dividends', ticker)]) and portfolio_data.loc[dia, ('Dividends', ticker)] > 0:
-                    num_shares[ticker] += (num_shares[ticker] * portfolio_data.loc[dia, ('Dividends', ticker)]) / preco_dia
-                valor_ativo = num_shares[ticker] * preco_dia
-                results_df.loc[dia, ticker] = valor_ativo
-                valor_total_dia += valor_ativo
-        
-        results_df.loc[dia, 'CDB'] = cdb_value
-        valor_total_dia += cdb_value
-        results_df.loc[dia, 'Total'] = valor_total_dia
-        results_df.loc[dia, config.BENCHMARK_NAME] = valor_selic_benchmark
-        results_df.loc[dia, 'Total Investido'] = total_investido
-
-    # Forward-fill numeric columns but not contribution tracking columns
-    numeric_cols = valid_tickers + ['CDB', 'Total', config.BENCHMARK_NAME, 'Total Investido']
-    results_df[numeric_cols] = results_df[numeric_cols].ffill()
-    results_df = calculate_ipca_benchmark(results_df, ipca_data, results_df['Total Investido'])
-    
+    indice_cdi_pregao = indice_cdi[panel.posicao_pregao]
+
+    def motor(inicio, estado):
+        return engines.cdb_mixed_engine(dias[inicio:], close[inicio:], dividends[inicio:], aportes[inicio:],
+                                        indice_cdi_pregao[inicio:], cdb_percentage, estado=estado)
+
+    parametros = {'APORTE_MENSAL_BASE': monthly_contribution, 'CDB_PERCENTAGE': cdb_percentage}
+    resultado = checkpoint.run_engine('cdb_misto', checkpoint_dir, panel, valid_tickers, parametros, motor)
+
+    # Cada dia do calendário usa o estado do último pregão até ele; antes do primeiro pregão tudo é zero.
+    curvas = {'CDB': panel.to_calendar(resultado['cotas_cdb']) * indice_cdi}
+    # Em dias sem pregão o total repete o do dia anterior (o CDB do dia não é somado)
+    curvas['Total'] = panel.to_calendar(resultado['total'])
+    # Como o CDB, o CDI recebe o aporte ao fim do dia; o IPCA + X rende desde o dia do aporte
+    posicoes_aporte, valores_aporte = _contribution_schedule(panel, resultado['aporte'])
+    curvas[config.BENCHMARK_NAME] = benchmarks.contribution_weighted(indice_cdi, posicoes_aporte, valores_aporte, rende_no_dia=False)
+    curvas['Total Investido'] = panel.to_calendar(resultado['total_investido'])
+    if panel.indice_ipca_x is not None:
+        curvas['IPCA_Benchmark'] = benchmarks.contribution_weighted(panel.indice_ipca_x, posicoes_aporte, valores_aporte)
+
+    if compacto:
+        results_df = results.compact_result(
+            panel, valid_tickers, resultado['valores'], curvas,
+            aportes=results.cdb_mixed_ledger(dias, resultado['aporte'], resultado['escolhido'], close, indice_cdi_pregao))
+    else:
+        results_df = pd.DataFrame(panel.to_calendar(resultado['valores']), index=all_dates, columns=valid_tickers)
+        for nome in ('CDB', 'Total', config.BENCHMARK_NAME, 'Total Investido'):
+            results_df[nome] = curvas[nome]
+
+        aporte = np.full(len(all_dates), np.nan)
+        aporte[panel.posicao_pregao] = resultado['aporte']
+        results_df['Aporte'] = aporte
+
+        ativo_aportado = np.full(len(all_dates), pd.NA, dtype=object)
+        # Índices negativos: -1 (APORTE_CDB) -> 'CDB', -2 (SEM_APORTE) -> NA
+        nomes = np.array(valid_tickers + [pd.NA, 'CDB'], dtype=object)
+        ativo_aportado[panel.posicao_pregao] = nomes[resultado['escolhido']]
+        results_df['Ativo Aportado'] = ativo_aportado
+
+        if 'IPCA_Benchmark' in curvas:
+            results_df['IPCA_Benchmark'] = curvas['IPCA_Benchmark']
+
     # Resultados finais
-    valor_final_carteira = results_df['Total'].iloc[-1]
-    total_investido_final = results_df['Total Investido'].iloc[-1]
+    valor_final_carteira = curvas['Total'][-1]
+    total_investido_final = curvas['Total Investido'][-1]
     anos = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.25
     print("\n--- Resultados do Backtest (Aportes Mensais com CDB) ---")
     print(f"Período: {start_date} a {end_date} ({anos:.1f} anos)")
     print(f"Total Investido (corrigido): R$ {total_investido_final:,.2f}")
     if total_investido_final > 0:
         print(f"Carteira: R$ {valor_final_carteira:,.2f} | Retorno sobre Investimento: {valor_final_carteira / total_investido_final - 1:.2%}")
-        if config.BENCHMARK_NAME in results_df and not results_df[config.BENCHMARK_NAME].isna().all():
-            valor_final_benchmark_m = results_df[config.BENCHMARK_NAME].iloc[-1]
+        if not np.isnan(curvas[config.BENCHMARK_NAME]).all():
+            valor_final_benchmark_m = curvas[config.BENCHMARK_NAME][-1]
             print(f"{config.BENCHMARK_NAME} (Benchmark): R$ {valor_final_benchmark_m:,.2f} | Retorno sobre Investimento: {valor_final_benchmark_m / total_investido_final - 1:.2%}")
     else:
         print(f"Carteira: R$ {valor_final_carteira:,.2f}")
@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+
+"""
+Estratégias de aporte plugáveis e o executor que as avança em uma única passada.
+
+Uma estratégia guarda apenas o seu estado (ações em carteira, total investido
+e o que mais a regra precisar) e reage a eventos do calendário de pregões:
+
+- `on_start(mercado)`: antes do primeiro pregão de uma simulação nova;
+- `on_month_start(mercado, i, aporte)`: no primeiro pregão de cada mês, com o
+  aporte corrigido do mês;
+- `on_dividend(mercado, i)`: nos pregões com provento (por padrão, reinveste
+  os dividendos nos próprios ativos).
+
+O executor `run_strategies` percorre o histórico uma única vez para qualquer
+número de estratégias: preços, máscara de cotação, dividendos por preço, dias
+de aporte e chaves de data ficam no `Market`, calculados uma só vez e
+compartilhados por todas. Os benchmarks com os mesmos aportes são obtidos à
+parte, em forma fechada (ver `benchmarks.py`).
+
+Novas regras são registradas com `@register_strategy(nome)` e criadas com
+`create_strategy`, que lê os parâmetros do `config.py` (ou de um dicionário
+com os mesmos nomes, como nas grades da varredura).
+
+Uso (compara todas as estratégias registradas com os parâmetros do config.py):
+    python strategies.py
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import config
+from engine_utils import (APORTE_CDB, SEM_APORTE, add_months, date_keys, key_to_timestamp,
+                          month_start_mask, smallest_n)
+
+# Estratégias disponíveis, por nome (preenchido por @register_strategy)
+ESTRATEGIAS = {}
+
+
+def register_strategy(nome):
+    """Decorador que registra uma classe de estratégia com o nome informado."""
+    def registrar(classe):
+        classe.nome = nome
+        ESTRATEGIAS[nome] = classe
+        return classe
+    return registrar
+
+
+def create_strategy(nome, n_tickers, parametros=None, estado=None):
+    """Cria a estratégia registrada com `nome`, com os parâmetros do config sobrescritos por `parametros`."""
+    classe = ESTRATEGIAS[nome]
+    valores = {p: getattr(config, p) for p in classe.PARAMETROS}
+    valores.update({p: v for p, v in (parametros or {}).items() if p in classe.PARAMETROS})
+    return classe.from_parameters(n_tickers, valores, estado=estado)
+
+
+@dataclass
+class Market:
+    """Dados de um trecho do histórico compartilhados por todas as estratégias de uma passada."""
+    dates: pd.DatetimeIndex
+    close: np.ndarray               # (dias x tickers), NaN sem cotação
+    cotado: np.ndarray              # máscara de cotação
+    preco_ou_zero: np.ndarray       # preço, 0.0 sem cotação
+    dividendo_por_preco: np.ndarray # dividendo / preço nos dias cotados com provento, 0.0 nos demais
+    dias_com_dividendo: np.ndarray
+    dia_de_aporte: np.ndarray
+    chaves: np.ndarray              # chaves de `date_keys`
+    indice_cdi: np.ndarray          # nível do CDI acumulado em cada pregão (1.0 sem benchmark)
+
+
+def build_market(dates, close, dividends, indice_cdi=None, ultimo_dia=None):
+    """Pré-calcula o `Market` de um trecho (`ultimo_dia`: último pregão da execução anterior)."""
+    cotado = ~np.isnan(close)
+    dividendos = np.where(cotado & (dividends > 0), dividends, 0.0)
+    preco_ou_um = np.where(cotado, close, 1.0)
+    return Market(
+        dates=dates,
+        close=close,
+        cotado=cotado,
+        preco_ou_zero=np.where(cotado, close, 0.0),
+        dividendo_por_preco=dividendos / preco_ou_um,
+        dias_com_dividendo=dividendos.any(axis=1),
+        dia_de_aporte=month_start_mask(dates, ultimo_dia),
+        chaves=date_keys(dates),
+        indice_cdi=np.ones(len(dates)) if indice_cdi is None else np.asarray(indice_cdi, dtype=np.float64),
+    )
+
+
+class Strategy:
+    """Estratégia base: carteira em um vetor de ações por ticker, sem aportes.
+
+    Subclasses implementam os ganchos de que precisam e, se guardarem estado
+    próprio, estendem `start_recording`, `record`, `state` e `outputs`.
+    """
+    nome = None
+    PARAMETROS = ()
+
+    def __init__(self, n_tickers, estado=None):
+        if estado is None:
+            self.num_shares = np.zeros(n_tickers)
+            self.total_investido = 0.0
+        else:
+            self.num_shares = np.array(estado['num_shares'], dtype=float)
+            self.total_investido = estado.get('total_investido', 0.0)
+
+    @classmethod
+    def from_parameters(cls, n_tickers, parametros, estado=None):
+        """Cria a estratégia a partir dos parâmetros (nomes do config.py) listados em PARAMETROS."""
+        return cls(n_tickers, estado=estado)
+
+    # --- Ganchos ---
+
+    def on_start(self, mercado):
+        """Chamado antes do primeiro pregão de uma simulação nova (sem estado anterior)."""
+
+    def on_month_start(self, mercado, i, aporte):
+        """Chamado no primeiro pregão de cada mês com o aporte corrigido do mês."""
+
+    def on_dividend(self, mercado, i):
+        """Chamado nos pregões com provento: reinveste os dividendos nos próprios ativos."""
+        self.num_shares += self.num_shares * mercado.dividendo_por_preco[i]
+
+    # --- Registro das saídas ---
+
+    def start_recording(self, n_dias):
+        self._historico_shares = np.empty((n_dias, len(self.num_shares)))
+        self._total_investido_dia = np.empty(n_dias)
+        self._aporte_dia = np.full(n_dias, np.nan)
+
+    def record(self, i):
+        self._historico_shares[i] = self.num_shares
+        self._total_investido_dia[i] = self.total_investido
+
+    def state(self):
+        """Estado final, que permite continuar a simulação em uma execução seguinte."""
+        return {'num_shares': self.num_shares, 'total_investido': self.total_investido}
+
+    def outputs(self, mercado):
+        """Saídas por pregão da simulação (mesmo formato dos motores em `engines.py`)."""
+        valores = self._historico_shares * mercado.preco_ou_zero
+        return {
+            'valores': valores,
+            'total': valores.sum(axis=1),
+            'total_investido': self._total_investido_dia,
+            'aporte': self._aporte_dia,
+        }
+
+
+def run_strategies(dates, close, dividends, aportes, estrategias, indice_cdi=None, ultimo_dia=None):
+    """Avança todas as `estrategias` juntas sobre o mesmo histórico, em uma única passada.
+
+    Com `ultimo_dia` (o último pregão de uma execução anterior), as
+    estratégias devem ter sido criadas com o estado salvo e `dates` deve
+    conter apenas os pregões novos. Retorna, na mesma ordem, as saídas de cada
+    estratégia, com o estado final em 'estado'.
+    """
+    mercado = build_market(dates, close, dividends, indice_cdi, ultimo_dia)
+    n_dias = len(dates)
+    for estrategia in estrategias:
+        estrategia.start_recording(n_dias)
+        if ultimo_dia is None:
+            estrategia.on_start(mercado)
+
+    for i in range(n_dias):
+        if mercado.dia_de_aporte[i]:
+            for estrategia in estrategias:
+                estrategia.on_month_start(mercado, i, aportes[i])
+        if mercado.dias_com_dividendo[i]:
+            for estrategia in estrategias:
+                estrategia.on_dividend(mercado, i)
+        for estrategia in estrategias:
+            estrategia.record(i)
+
+    fim = dates[-1] if n_dias else ultimo_dia
+    resultados = []
+    for estrategia in estrategias:
+        resultado = estrategia.outputs(mercado)
+        resultado['estado'] = {**estrategia.state(), 'ultimo_dia': fim}
+        resultados.append(resultado)
+    return resultados
+
+
+@register_strategy('Aportes Mensais')
+class MonthlyContributionsStrategy(Strategy):
+    """Aporta a cada mês no(s) `n_por_aporte` ativo(s) de menor valor em carteira, com o freio automático.
+
+    O freio é uma máquina de estados em vetores por ticker (chave de
+    `date_keys` do último aporte, chave do fim da quarentena e duração da
+    próxima quarentena): liberações, elegibilidade e gatilhos são comparações
+    sobre os vetores inteiros.
+    """
+    PARAMETROS = ('NUMERO_EMPRESAS_POR_APORTE', 'FREIO_ATIVO', 'FREIO_PERIODO_APORTES',
+                  'FREIO_QUARENTENA_INICIAL', 'FREIO_QUARENTENA_ADICIONAL')
+
+    def __init__(self, n_tickers, n_por_aporte, freio_ativo=False, freio_periodo=0,
+                 quarentena_inicial=0, quarentena_adicional=0, estado=None):
+        super().__init__(n_tickers, estado)
+        self.n_por_aporte = n_por_aporte
+        self.freio_ativo = freio_ativo
+        self.freio_periodo = freio_periodo
+        self.quarentena_adicional = quarentena_adicional
+        if estado is None:
+            # --- Estado do Freio Automático (chaves de date_keys; -1 = nenhum) ---
+            self.ultimo_aporte = np.full(n_tickers, -1, dtype=np.int64)
+            self.quarentena = np.full(n_tickers, -1, dtype=np.int64)
+            self.quarentena_duracao = np.full(n_tickers, quarentena_inicial, dtype=np.int64)
+        else:
+            self.ultimo_aporte = np.array(estado['ultimo_aporte'], dtype=np.int64)
+            self.quarentena = np.array(estado['quarentena'], dtype=np.int64)
+            self.quarentena_duracao = np.array(estado['quarentena_duracao'], dtype=np.int64)
+        self.selecionados = {}
+        self.eventos_freio = []
+
+    @classmethod
+    def from_parameters(cls, n_tickers, parametros, estado=None):
+        return cls(n_tickers, parametros['NUMERO_EMPRESAS_POR_APORTE'],
+                   freio_ativo=parametros['FREIO_ATIVO'],
+                   freio_periodo=parametros['FREIO_PERIODO_APORTES'],
+                   quarentena_inicial=parametros['FREIO_QUARENTENA_INICIAL'],
+                   quarentena_adicional=parametros['FREIO_QUARENTENA_ADICIONAL'],
+                   estado=estado)
+
+    def on_month_start(self, mercado, i, aporte):
+        dia = mercado.dates[i]
+        self.total_investido += aporte
+        self._aporte_dia[i] = aporte
+        close = mercado.close
+
+        chave = mercado.chaves[i]
+        if self.freio_ativo:
+            # Libera ativos cuja quarentena já terminou
+            liberados = np.flatnonzero((self.quarentena >= 0) & (chave >= self.quarentena))
+            self.quarentena[liberados] = -1
+            self.eventos_freio.extend((dia, t, 'desativado', None) for t in liberados)
+        elegiveis = mercado.cotado[i] & (self.quarentena < 0)
+
+        indices = np.flatnonzero(elegiveis)
+        if indices.size:
+            # Ordenação estável: empates mantêm a ordem da lista de tickers
+            valores_ativos = self.num_shares[indices] * close[i, indices]
+            escolhidos = indices[smallest_n(valores_ativos, self.n_por_aporte)]
+            self.selecionados[i] = escolhidos
+            aporte_por_ativo = aporte / len(escolhidos)
+
+            compra = escolhidos[close[i, escolhidos] > 0]
+            self.num_shares[compra] += aporte_por_ativo / close[i, compra]
+
+            if self.freio_ativo:
+                # Gatilho: aporte anterior no mesmo ativo dentro do período de verificação
+                gatilho = escolhidos[self.ultimo_aporte[escolhidos] >= add_months(chave, -self.freio_periodo)]
+                self.quarentena[gatilho] = add_months(chave, self.quarentena_duracao[gatilho])
+                self.eventos_freio.extend((dia, t, 'ativado', key_to_timestamp(self.quarentena[t])) for t in gatilho)
+                self.quarentena_duracao[gatilho] += self.quarentena_adicional
+                self.ultimo_aporte[escolhidos] = chave
+
+    def state(self):
+        return {
+            **super().state(),
+            'ultimo_aporte': self.ultimo_aporte,
+            'quarentena': self.quarentena,
+            'quarentena_duracao': self.quarentena_duracao,
+        }
+
+    def outputs(self, mercado):
+        return {**super().outputs(mercado), 'selecionados': self.selecionados, 'eventos_freio': self.eventos_freio}
+
+
+@register_strategy('CDB Misto')
+class CdbMixedStrategy(Strategy):
+    """Divide os aportes entre um CDB (100% do CDI) e o ativo de menor valor, mirando `cdb_percentage` em CDB.
+
+    O CDB não é corrigido dia a dia: cada aporte é convertido em "cotas" do
+    índice acumulado do CDI (`Market.indice_cdi`) e o saldo em qualquer dia é
+    cotas x nível do índice.
+    """
+    PARAMETROS = ('CDB_PERCENTAGE',)
+
+    def __init__(self, n_tickers, cdb_percentage, estado=None):
+        super().__init__(n_tickers, estado)
+        self.cdb_percentage = cdb_percentage
+        self.cotas_cdb = estado['cotas_cdb'] if estado is not None else 0.0
+
+    @classmethod
+    def from_parameters(cls, n_tickers, parametros, estado=None):
+        return cls(n_tickers, parametros['CDB_PERCENTAGE'], estado=estado)
+
+    def start_recording(self, n_dias):
+        super().start_recording(n_dias)
+        self._cotas_cdb_dia = np.empty(n_dias)
+        self._escolhido = np.full(n_dias, SEM_APORTE, dtype=np.int64)
+
+    def on_month_start(self, mercado, i, aporte):
+        self.total_investido += aporte
+        self._aporte_dia[i] = aporte
+
+        valores_ativos = self.num_shares * mercado.preco_ou_zero[i]
+        cdb_value = self.cotas_cdb * mercado.indice_cdi[i]
+        total_portfolio_value = valores_ativos.sum() + cdb_value
+
+        # Lógica de alocação
+        if (total_portfolio_value > 0 and (cdb_value / total_portfolio_value) < self.cdb_percentage) or total_portfolio_value == 0:
+            self.cotas_cdb += aporte / mercado.indice_cdi[i]
+            self._escolhido[i] = APORTE_CDB
+        else:
+            indices = np.flatnonzero(mercado.cotado[i])
+            if indices.size:
+                t = indices[np.argmin(valores_ativos[indices])]
+                preco = mercado.close[i, t]
+                if preco > 0:
+                    self.num_shares[t] += aporte / preco
+                    self._escolhido[i] = t
+
+    def record(self, i):
+        super().record(i)
+        self._cotas_cdb_dia[i] = self.cotas_cdb
+
+    def state(self):
+        return {**super().state(), 'cotas_cdb': self.cotas_cdb}
+
+    def outputs(self, mercado):
+        resultado = super().outputs(mercado)
+        cdb = self._cotas_cdb_dia * mercado.indice_cdi
+        resultado.update({
+            'cdb': cdb,
+            'total': resultado['total'] + cdb,
+            'cotas_cdb': self._cotas_cdb_dia,
+            'escolhido': self._escolhido,
+        })
+        return resultado
+
+
+def compare_strategies(panel, nomes=None, parametros=None):
+    """Executa as estratégias registradas (ou as `nomes`) em uma única passada e resume cada uma.
+
+    Todas recebem os mesmos aportes mensais (APORTE_MENSAL_BASE corrigido pelo
+    IPCA); `parametros` sobrescreve valores do config.py.
+    """
+    from sweep import summarize
+
+    nomes = list(ESTRATEGIAS) if nomes is None else nomes
+    tickers = panel.valid_tickers(panel.tickers)
+    close, dividends = panel.arrays(tickers)
+    aportes = config.APORTE_MENSAL_BASE * panel.ipca_acumulado[panel.posicao_pregao]
+    indice_cdi = panel.indice_benchmark[panel.posicao_pregao] if panel.indice_benchmark is not None else None
+
+    estrategias = [create_strategy(nome, len(tickers), parametros) for nome in nomes]
+    resultados = run_strategies(panel.dates, close, dividends, aportes, estrategias, indice_cdi=indice_cdi)
+    linhas = [summarize(panel, nome, {}, r['total'], r['aporte'], r['total_investido'])
+              for nome, r in zip(nomes, resultados)]
+    return pd.DataFrame(linhas)
+
+
+def main():
+    """Carrega os dados e compara todas as estratégias registradas com os parâmetros do config.py."""
+    import main as backtest
+
+    panel = backtest.load_market_panel(config.TICKERS_EMPRESAS, config.DATA_INICIO, config.DATA_FIM)
+    if panel is None:
+        return
+
+    print(f"Executando {len(ESTRATEGIAS)} estratégias em uma única passada...")
+    resumo = compare_strategies(panel)
+    print("\n--- Comparação das Estratégias ---")
+    print(resumo.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
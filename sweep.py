@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+"""
+Varredura de parâmetros dos cenários de aportes mensais.
+
+Executa os cenários 2 (Aportes Mensais) e 3 (CDB Misto) para todas as
+combinações de uma grade de parâmetros (por padrão `config.SWEEP_GRID`) de
+uma de duas formas (`config.SWEEP_MODO`):
+
+- 'lote': todas as combinações avançam juntas em um único laço sobre os
+  pregões, usando os motores em lote (estado com um eixo de parâmetros);
+- 'processos': cada combinação é uma tarefa em um pool de processos. O painel
+  de mercado é colocado em memória compartilhada uma única vez: cada processo
+  apenas se conecta aos blocos existentes, e cada tarefa recebe somente o
+  dicionário de parâmetros.
+
+Uso:
+    python sweep.py
+"""
+
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import config
+import engines
+import market_panel
+from scenarios import calculate_cagr, calculate_time_weighted_curve, calculate_max_drawdown
+
+# Parâmetros de cada cenário que a varredura sabe variar
+PARAMETROS_MENSAL = ('NUMERO_EMPRESAS_POR_APORTE', 'FREIO_ATIVO', 'FREIO_PERIODO_APORTES',
+                     'FREIO_QUARENTENA_INICIAL', 'FREIO_QUARENTENA_ADICIONAL')
+PARAMETROS_CDB = ('CDB_PERCENTAGE',)
+COLUNAS_RESUMO = ('Valor Final', 'Total Investido', 'ROI', 'CAGR', 'Max Drawdown')
+
+# Matrizes do painel publicadas em memória compartilhada
+_ARRAYS_COMPARTILHADOS = ('close', 'dividends', 'first_valid', 'posicao_pregao', 'ultimo_pregao',
+                          'indice_benchmark', 'ipca_acumulado', 'indice_ipca_x')
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_PANEL = None
+_BLOCOS = []
+
+
+def expand_grid(grid, parametros):
+    """Produto cartesiano da grade, restrito aos parâmetros informados (os demais vêm do config)."""
+    nomes = [p for p in parametros if p in grid]
+    combinacoes = []
+    for valores in itertools.product(*(grid[p] for p in nomes)):
+        combinacao = {p: getattr(config, p) for p in parametros}
+        combinacao.update(zip(nomes, valores))
+        combinacoes.append(combinacao)
+    return combinacoes
+
+
+def build_tasks(grid):
+    """Lista de tarefas (cenário, parâmetros) da varredura."""
+    tarefas = [('Aportes Mensais', p) for p in expand_grid(grid, PARAMETROS_MENSAL)]
+    tarefas += [('CDB Misto', p) for p in expand_grid(grid, PARAMETROS_CDB)]
+    return tarefas
+
+
+def _engine_inputs(panel, aporte_mensal_base=None):
+    """Entradas comuns aos motores: preços, dividendos, aportes e índice do CDI por pregão."""
+    aporte_mensal_base = config.APORTE_MENSAL_BASE if aporte_mensal_base is None else aporte_mensal_base
+    tickers = panel.valid_tickers(panel.tickers)
+    close, dividends = panel.arrays(tickers)
+    aportes = aporte_mensal_base * panel.ipca_acumulado[panel.posicao_pregao]
+    if panel.indice_benchmark is not None:
+        indice_cdi = panel.indice_benchmark[panel.posicao_pregao]
+    else:
+        indice_cdi = np.ones(len(panel.dates))
+    return close, dividends, aportes, indice_cdi
+
+
+def run_task(panel, cenario, parametros, aporte_mensal_base=None):
+    """Executa um cenário com os parâmetros dados e resume o resultado em um dicionário."""
+    close, dividends, aportes, indice_cdi = _engine_inputs(panel, aporte_mensal_base)
+
+    if cenario == 'Aportes Mensais':
+        resultado = engines.monthly_contributions_engine(
+            panel.dates, close, dividends, aportes, parametros['NUMERO_EMPRESAS_POR_APORTE'],
+            freio_ativo=parametros['FREIO_ATIVO'],
+            freio_periodo=parametros['FREIO_PERIODO_APORTES'],
+            quarentena_inicial=parametros['FREIO_QUARENTENA_INICIAL'],
+            quarentena_adicional=parametros['FREIO_QUARENTENA_ADICIONAL'],
+        )
+    else:
+        resultado = engines.cdb_mixed_engine(panel.dates, close, dividends, aportes, indice_cdi, parametros['CDB_PERCENTAGE'])
+
+    return summarize(panel, cenario, parametros, resultado['total'], resultado['aporte'], resultado['total_investido'])
+
+
+def run_batched_sweep(panel, grid=None):
+    """Executa a varredura em um único processo, avançando todas as combinações juntas no tempo.
+
+    Cada cenário é simulado uma vez pelos motores em lote de `engines.py`,
+    com um eixo extra para os conjuntos de parâmetros.
+    """
+    grid = config.SWEEP_GRID if grid is None else grid
+    mensal = expand_grid(grid, PARAMETROS_MENSAL)
+    cdb = expand_grid(grid, PARAMETROS_CDB)
+    print(f"Executando {len(mensal) + len(cdb)} combinações em lote...")
+    close, dividends, aportes, indice_cdi = _engine_inputs(panel)
+
+    def coluna(combinacoes, parametro):
+        return [p[parametro] for p in combinacoes]
+
+    resultado = engines.monthly_contributions_batch_engine(
+        panel.dates, close, dividends, aportes,
+        coluna(mensal, 'NUMERO_EMPRESAS_POR_APORTE'),
+        freio_ativo=coluna(mensal, 'FREIO_ATIVO'),
+        freio_periodo=coluna(mensal, 'FREIO_PERIODO_APORTES'),
+        quarentena_inicial=coluna(mensal, 'FREIO_QUARENTENA_INICIAL'),
+        quarentena_adicional=coluna(mensal, 'FREIO_QUARENTENA_ADICIONAL'),
+    )
+    linhas = [summarize(panel, 'Aportes Mensais', p, resultado['total'][:, j], resultado['aporte'][:, j], resultado['total_investido'][:, j])
+              for j, p in enumerate(mensal)]
+
+    resultado = engines.cdb_mixed_batch_engine(panel.dates, close, dividends, aportes, indice_cdi, coluna(cdb, 'CDB_PERCENTAGE'))
+    linhas += [summarize(panel, 'CDB Misto', p, resultado['total'][:, j], resultado['aporte'][:, j], resultado['total_investido'][:, j])
+               for j, p in enumerate(cdb)]
+
+    return _summary_table(linhas)
+
+
+def summarize(panel, cenario, parametros, total, aporte, total_investido):
+    """Linha da tabela de resumo: valor final, ROI, CAGR e drawdown (ponderados no tempo)."""
+    anos = (panel.calendar[-1] - panel.calendar[0]).days / 365.25
+    curva = calculate_time_weighted_curve(total, aporte)
+    valor_final = float(total[-1]) if len(total) else 0.0
+    investido = float(total_investido[-1]) if len(total_investido) else 0.0
+    linha = {'Cenario': cenario}
+    linha.update(parametros)
+    linha.update({
+        'Valor Final': valor_final,
+        'Total Investido': investido,
+        'ROI': valor_final / investido - 1 if investido > 0 else np.nan,
+        'CAGR': calculate_cagr(1.0, curva[-1], anos) if len(curva) else 0.0,
+        'Max Drawdown': calculate_max_drawdown(curva),
+    })
+    return linha
+
+
+def _share_panel(panel):
+    """Copia as matrizes do painel para blocos de memória compartilhada.
+
+    Retorna os blocos criados (que devem ser liberados por quem chamou) e a
+    descrição (nome, formato, dtype) usada pelos processos para se conectar.
+    """
+    blocos, specs = [], {}
+    for nome in _ARRAYS_COMPARTILHADOS:
+        array = getattr(panel, nome)
+        if array is None:
+            specs[nome] = None
+            continue
+        array = np.ascontiguousarray(array)
+        bloco = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=bloco.buf)[...] = array
+        blocos.append(bloco)
+        specs[nome] = (bloco.name, array.shape, array.dtype.str)
+    return blocos, specs
+
+
+def _attach(nome):
+    """Conecta a um bloco existente criado pelo processo principal."""
+    if sys.version_info >= (3, 13):
+        # Só o processo que criou o bloco deve controlar sua remoção
+        return shared_memory.SharedMemory(name=nome, track=False)
+    return shared_memory.SharedMemory(name=nome)
+
+
+def _init_worker(specs, meta, configuracao):
+    """Inicializa um processo do pool: conecta-se ao painel compartilhado e aplica o config."""
+    global _PANEL
+    for chave, valor in configuracao.items():
+        setattr(config, chave, valor)
+
+    arrays = {}
+    for nome, spec in specs.items():
+        if spec is None:
+            arrays[nome] = None
+            continue
+        nome_bloco, formato, dtype = spec
+        bloco = _attach(nome_bloco)
+        _BLOCOS.append(bloco)
+        arrays[nome] = np.ndarray(formato, dtype=np.dtype(dtype), buffer=bloco.buf)
+
+    _PANEL = market_panel.MarketPanel(
+        calendar=meta['calendar'],
+        dates=meta['dates'],
+        tickers=meta['tickers'],
+        ticker_index={t: i for i, t in enumerate(meta['tickers'])},
+        inicio_benchmark=meta['inicio_benchmark'],
+        ipca_mensal=meta['ipca_mensal'],
+        **arrays,
+    )
+
+
+def _run_in_worker(tarefa):
+    cenario, parametros = tarefa
+    return run_task(_PANEL, cenario, parametros)
+
+
+def run_sweep(panel, grid=None, max_workers=None):
+    """Executa a varredura em paralelo e retorna a tabela de resumo (uma linha por combinação)."""
+    grid = config.SWEEP_GRID if grid is None else grid
+    tarefas = build_tasks(grid)
+    print(f"Executando {len(tarefas)} combinações em paralelo...")
+
+    meta = {
+        'calendar': panel.calendar,
+        'dates': panel.dates,
+        'tickers': panel.tickers,
+        'inicio_benchmark': panel.inicio_benchmark,
+        'ipca_mensal': panel.ipca_mensal,
+    }
+    configuracao = {'APORTE_MENSAL_BASE': config.APORTE_MENSAL_BASE}
+
+    blocos, specs = _share_panel(panel)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(specs, meta, configuracao)) as executor:
+            linhas = list(executor.map(_run_in_worker, tarefas))
+    finally:
+        for bloco in blocos:
+            bloco.close()
+            bloco.unlink()
+
+    return _summary_table(linhas)
+
+
+def _summary_table(linhas):
+    colunas = ['Cenario'] + list(PARAMETROS_MENSAL + PARAMETROS_CDB) + list(COLUNAS_RESUMO)
+    return pd.DataFrame(linhas, columns=colunas)
+
+
+def main():
+    """Carrega os dados uma vez, executa a varredura e salva a tabela de resumo."""
+    import main as backtest
+
+    panel = backtest.load_market_panel(config.TICKERS_EMPRESAS, config.DATA_INICIO, config.DATA_FIM)
+    if panel is None:
+        return
+
+    if config.SWEEP_MODO == 'lote':
+        resumo = run_batched_sweep(panel)
+    else:
+        resumo = run_sweep(panel, max_workers=config.SWEEP_WORKERS)
+
+    os.makedirs('results', exist_ok=True)
+    path = os.path.join('results', config.ARQUIVO_RESULTADOS_SWEEP)
+    resumo.to_csv(path, index=False)
+    print("\n--- Resumo da Varredura de Parâmetros ---")
+    print(resumo.to_string(index=False))
+    print(f"\nResumo salvo em '{path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import benchmarks
+import config
+from scenarios import calculate_ipca_benchmark
+
+class TestBenchmarkCurves(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a year of daily CDI factors and monthly IPCA readings."""
+        benchmarks.clear_cache()
+        self.calendar = pd.date_range('2021-01-01', '2021-12-31', freq='D')
+        dias_uteis = pd.bdate_range('2021-01-01', '2021-12-31')
+        self.cdi = pd.Series(np.linspace(1.0001, 1.0004, len(dias_uteis)), index=dias_uteis)
+        self.ipca = pd.Series(np.linspace(0.2, 0.9, 12), index=pd.date_range('2021-01-01', periods=12, freq='MS'))
+        self.diretorio = tempfile.mkdtemp()
+        config.IPCA_BENCHMARK_X = 6.0
+
+    def tearDown(self):
+        benchmarks.clear_cache()
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_indices_are_memoized(self):
+        """Test that repeated requests for the same curve return the same read-only array."""
+        indice = benchmarks.cdi_index(self.cdi, self.calendar)
+        self.assertIs(benchmarks.cdi_index(self.cdi, self.calendar), indice)
+        self.assertFalse(indice.flags.writeable)
+        esperado = np.cumprod(self.cdi.reindex(self.calendar).fillna(1.0).to_numpy())
+        np.testing.assert_allclose(indice, esperado, rtol=1e-12)
+
+        # Outro X é outra curva
+        ipca_6 = benchmarks.ipca_x_index(self.ipca, self.calendar)
+        ipca_0 = benchmarks.ipca_x_index(self.ipca, self.calendar, x=0.0)
+        self.assertIsNot(ipca_6, ipca_0)
+        self.assertGreater(ipca_6[-1], ipca_0[-1])
+
+    def test_disk_cache_round_trip(self):
+        """Test that a curve saved to disk is reloaded after the memory cache is cleared."""
+        indice = benchmarks.ipca_x_index(self.ipca, self.calendar, cache_dir=self.diretorio)
+        self.assertEqual(len(os.listdir(self.diretorio)), 1)
+
+        benchmarks.clear_cache()
+        recarregado = benchmarks.ipca_x_index(self.ipca, self.calendar, cache_dir=self.diretorio)
+        np.testing.assert_array_equal(recarregado, indice)
+
+        # A curva coincide com a do cálculo original por DataFrame
+        df = calculate_ipca_benchmark(pd.DataFrame(index=self.calendar), self.ipca, 1.0)
+        np.testing.assert_allclose(df['IPCA_Benchmark'].to_numpy(), indice, rtol=1e-12)
+
+    def test_contribution_weighted_matches_daily_loop(self):
+        """Test the closed-form benchmark balance against a day-by-day simulation of the same contributions."""
+        indice = benchmarks.cdi_index(self.cdi, self.calendar)
+        fator = indice / np.concatenate(([1.0], indice[:-1]))
+        posicoes = np.array([0, 31, 59, 59, 200, 364])
+        aportes = np.array([1000.0, 1010.0, 500.0, 250.0, 1020.0, 1030.0])
+
+        for rende_no_dia in (True, False):
+            saldo, esperado = 0.0, np.empty(len(indice))
+            for i in range(len(indice)):
+                if not rende_no_dia:
+                    saldo *= fator[i]
+                saldo += aportes[posicoes == i].sum()
+                if rende_no_dia:
+                    saldo *= fator[i]
+                esperado[i] = saldo
+            curva = benchmarks.contribution_weighted(indice, posicoes, aportes, rende_no_dia=rende_no_dia)
+            np.testing.assert_allclose(curva, esperado, rtol=1e-12)
+
+        # O saldo final é um produto escalar, também para vários cronogramas de uma vez
+        curva = benchmarks.contribution_weighted(indice, posicoes, aportes)
+        self.assertAlmostEqual(benchmarks.final_value(indice, posicoes, aportes), curva[-1], places=6)
+        finais = benchmarks.final_value(indice, posicoes, np.column_stack([aportes, 2 * aportes]))
+        np.testing.assert_allclose(finais, [curva[-1], 2 * curva[-1]], rtol=1e-12)
+
+        # Várias trajetórias de uma vez (índice e aportes por coluna), como no Monte Carlo
+        indices = np.column_stack([indice, indice ** 2])
+        curvas = benchmarks.contribution_weighted(indices, posicoes, np.column_stack([aportes, 2 * aportes]))
+        np.testing.assert_allclose(curvas[:, 0], curva, rtol=1e-12)
+        np.testing.assert_allclose(curvas[:, 1], benchmarks.contribution_weighted(indice ** 2, posicoes, 2 * aportes), rtol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import pandas as pd
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cache_manifest import CacheManifest
+
+class TestCacheManifest(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary data directory with one cached series."""
+        self.diretorio = tempfile.mkdtemp()
+        self.path = os.path.join(self.diretorio, 'manifest.json')
+        self.arquivo = os.path.join(self.diretorio, 'CDI.csv')
+        pd.DataFrame({'cdi': [0.04, 0.05, 0.06]}, index=pd.date_range('2020-01-02', periods=3)).to_csv(self.arquivo)
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_coverage_and_integrity(self):
+        """Test coverage intervals, row count and checksum verification."""
+        manifesto = CacheManifest(self.path)
+        self.assertTrue(manifesto.verify(self.arquivo))      # sem registro: usado como antes
+        self.assertFalse(manifesto.covers(self.arquivo, '2020-01-01'))
+
+        manifesto.record(self.arquivo, '2020-01-01', '2020-01-31', 'sgs')
+        self.assertEqual(manifesto.get(self.arquivo)['linhas'], 3)
+        self.assertTrue(manifesto.covers(self.arquivo, '2020-01-01', '2020-01-15'))
+        self.assertFalse(manifesto.covers(self.arquivo, '2019-12-31'))
+        self.assertFalse(manifesto.covers(self.arquivo, '2020-01-01', '2020-02-01'))
+
+        with open(self.arquivo, 'a') as f:
+            f.write('2020-01-05,0.07\n')
+        self.assertFalse(manifesto.verify(self.arquivo))
+
+    def test_verify_rehashes_only_changed_files(self):
+        """Test that an unchanged file is verified from size and mtime alone, and a same-size edit is still caught."""
+        manifesto = CacheManifest(self.path)
+        manifesto.record(self.arquivo, '2020-01-01', '2020-01-31', 'sgs')
+        with patch('cache_manifest.hashlib.sha256') as mock_sha256:
+            self.assertTrue(manifesto.verify(self.arquivo))
+            mock_sha256.assert_not_called()
+
+        with open(self.arquivo, 'r+b') as f:
+            conteudo = f.read()
+            f.seek(0)
+            f.write(conteudo.replace(b'0.04', b'0.09'))
+        os.utime(self.arquivo, ns=(0, manifesto.get(self.arquivo)['mtime_ns'] + 10**9))
+        self.assertFalse(manifesto.verify(self.arquivo))
+
+    def test_save_keeps_entries_from_other_runs(self):
+        """Test that two processes sharing the manifest don't drop each other's entries."""
+        primeiro = CacheManifest(self.path)
+        segundo = CacheManifest(self.path)
+        primeiro.record(self.arquivo, '2020-01-01', '2020-01-31', 'sgs')
+        primeiro.save()
+        outro = os.path.join(self.diretorio, 'IPCA.csv')
+        shutil.copy(self.arquivo, outro)
+        segundo.record(outro, '2020-01-01', '2020-01-31', 'sgs')
+        segundo.save()
+
+        self.assertEqual(set(CacheManifest(self.path).series), {self.arquivo, outro})
+
+if __name__ == '__main__':
+    unittest.main()
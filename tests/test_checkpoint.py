@@ -0,0 +1,94 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from market_panel import build_market_panel
+from scenarios import run_lump_sum_backtest, run_monthly_contributions_backtest, run_scenario_cdb_mixed
+import checkpoint
+import config
+
+class TestIncrementalBacktest(unittest.TestCase):
+
+    def setUp(self):
+        """Set up ten months of prices with dividends for three tickers and a temporary checkpoint dir."""
+        self.tickers = ['TICKER_A.SA', 'TICKER_B.SA', 'TICKER_C.SA']
+        dates = pd.bdate_range('2020-01-02', '2020-10-30')
+        rng = np.random.default_rng(7)
+        precos = 10 * np.cumprod(1 + rng.normal(0, 0.01, size=(len(dates), 3)), axis=0)
+        dividendos = np.where(rng.random((len(dates), 3)) < 0.02, 0.1, 0.0)
+        columns = pd.MultiIndex.from_product([['Close', 'Dividends'], self.tickers])
+        self.data = pd.DataFrame(np.hstack([precos, dividendos]), index=dates, columns=columns)
+        self.benchmark = pd.Series(1.0003, index=dates)
+        self.ipca = pd.Series(0.004, index=pd.date_range('2020-01-01', '2020-10-01', freq='MS'))
+        self.diretorio = tempfile.mkdtemp()
+        config.TICKERS_EMPRESAS = self.tickers
+        config.VALOR_INVESTIDO_POR_EMPRESA = 1000.0
+        config.APORTE_MENSAL_BASE = 1000.0
+        config.NUMERO_EMPRESAS_POR_APORTE = 1
+        config.FREIO_ATIVO = True
+        config.FREIO_PERIODO_APORTES = 2
+        config.FREIO_QUARENTENA_INICIAL = 2
+        config.FREIO_QUARENTENA_ADICIONAL = 3
+
+    def _run_all(self, data_fim, data=None, checkpoint_dir=None):
+        data = self.data if data is None else data
+        panel = build_market_panel(data, self.benchmark, self.ipca, self.tickers, '2020-01-01', data_fim)
+        return (
+            run_lump_sum_backtest(None, None, None, self.tickers, '2020-01-01', data_fim, panel=panel, checkpoint_dir=checkpoint_dir),
+            run_monthly_contributions_backtest(None, None, None, self.tickers, '2020-01-01', data_fim, panel=panel, checkpoint_dir=checkpoint_dir),
+            run_scenario_cdb_mixed('2020-01-01', data_fim, 1000.0, None, None, None, 0.3, panel=panel, checkpoint_dir=checkpoint_dir),
+        )
+
+    def _assert_same_results(self, obtidos, esperados):
+        for obtido, esperado in zip(obtidos, esperados):
+            pd.testing.assert_frame_equal(obtido, esperado, check_exact=False, rtol=1e-12)
+
+    def test_resumed_runs_match_full_run(self):
+        """Verify resuming day by day across month starts reproduces a full run."""
+        for data_fim in ['2020-05-29', '2020-06-01', '2020-06-02', '2020-08-15', '2020-10-30']:
+            incremental = self._run_all(data_fim, checkpoint_dir=self.diretorio)
+        self._assert_same_results(incremental, self._run_all('2020-10-30'))
+
+    def test_checkpoint_skips_processed_days(self):
+        """Verify a resumed run only hands the new trading days to the engine."""
+        extra = pd.DataFrame(10.0, index=pd.bdate_range('2020-11-02', '2020-11-06'), columns=self.data.columns)
+        paineis = [build_market_panel(self.data, self.benchmark, self.ipca, self.tickers, '2020-01-01', '2020-10-30'),
+                   build_market_panel(pd.concat([self.data, extra]), self.benchmark, self.ipca, self.tickers, '2020-01-01', '2020-11-06')]
+        chamadas = []
+
+        def executar(panel):
+            def motor(inicio, estado):
+                chamadas.append(inicio)
+                return {'total': np.arange(inicio, len(panel.dates), dtype=float), 'estado': {}}
+            return checkpoint.run_engine('teste', self.diretorio, panel, self.tickers, {}, motor)
+
+        executar(paineis[0])
+        self.assertEqual(len(executar(paineis[0])['total']), len(paineis[0].dates))
+        self.assertEqual(chamadas, [0])
+
+        resultado = executar(paineis[1])
+        self.assertEqual(chamadas, [0, len(paineis[0].dates)])
+        np.testing.assert_array_equal(resultado['total'], np.arange(len(paineis[1].dates)))
+
+    def test_config_change_invalidates_checkpoint(self):
+        """Verify changing a scenario parameter forces a recompute from the start."""
+        self._run_all('2020-06-30', checkpoint_dir=self.diretorio)
+        config.NUMERO_EMPRESAS_POR_APORTE = 2
+        config.VALOR_INVESTIDO_POR_EMPRESA = 500.0
+        self._assert_same_results(self._run_all('2020-10-30', checkpoint_dir=self.diretorio), self._run_all('2020-10-30'))
+
+    def test_history_change_invalidates_checkpoint(self):
+        """Verify a revised price inside the processed period forces a recompute from the start."""
+        self._run_all('2020-06-30', checkpoint_dir=self.diretorio)
+        revisado = self.data.copy()
+        revisado.iloc[40, 0] *= 1.5
+        self._assert_same_results(self._run_all('2020-10-30', revisado, checkpoint_dir=self.diretorio),
+                                  self._run_all('2020-10-30', revisado))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,14 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 import pandas as pd
+import numpy as np
 import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+import weakref
 from datetime import datetime, timedelta
 
 # Add the project root to the Python path to allow importing from the main project
@@ -12,9 +19,15 @@ from data_loader import (
     _is_cache_valid,
     download_stock_data,
     get_ipca_data,
-    get_benchmark_data
+    get_benchmark_data,
+    download_bcb_series,
+    build_stock_frame,
+    download_tickers,
+    RateLimiter
 )
 from config import DATA_UPDATE_DAYS, BENCHMARK_NAME, BENCHMARK_SERIES_CODE
+import config
+import panel_store
 
 class TestDataCaching(unittest.TestCase):
 
@@ -22,6 +35,17 @@ class TestDataCaching(unittest.TestCase):
         """Set up a dummy data directory for tests."""
         self.test_data_dir = 'data'
         os.makedirs(self.test_data_dir, exist_ok=True)
+        self.store_original = config.PANEL_STORE_DIR
+        self.incremental_original = config.ATUALIZACAO_INCREMENTAL
+        self.manifesto_original = config.CACHE_MANIFEST
+        config.PANEL_STORE_DIR = None
+        config.ATUALIZACAO_INCREMENTAL = False
+        config.CACHE_MANIFEST = None
+
+    def tearDown(self):
+        config.PANEL_STORE_DIR = self.store_original
+        config.ATUALIZACAO_INCREMENTAL = self.incremental_original
+        config.CACHE_MANIFEST = self.manifesto_original
 
     @patch('data_loader.os.path.getmtime')
     @patch('data_loader.os.path.exists')
@@ -47,17 +71,18 @@ class TestDataCaching(unittest.TestCase):
         self.assertFalse(_is_cache_valid('dummy/path.csv'))
 
     @patch('data_loader.yf.download')
-    @patch('data_loader.pd.read_csv')
+    @patch('data_loader.read_cached_prices')
     @patch('data_loader._is_cache_valid')
-    def test_download_stock_data_uses_cache(self, mock_is_cache_valid, mock_read_csv, mock_yf_download):
+    def test_download_stock_data_uses_cache(self, mock_is_cache_valid, mock_read_cached, mock_yf_download):
         """Verify stock download uses cache if valid."""
         mock_is_cache_valid.return_value = True
-        # Mock the read_csv to return a valid DataFrame
-        mock_read_csv.return_value = pd.DataFrame({'Close': [10, 11]})
+        # Mock the cache reader to return two days of closes
+        datas = pd.date_range('2020-01-02', periods=2).to_numpy()
+        mock_read_cached.return_value = (datas, {'Close': np.array([10.0, 11.0])})
         
         download_stock_data(['PETR4.SA'], '2020-01-01', '2020-01-31')
         
-        mock_read_csv.assert_called_once_with('data/PETR4.SA.csv', header=0, index_col=0, parse_dates=True)
+        mock_read_cached.assert_called_once_with('data/PETR4.SA.csv', ANY)
         mock_yf_download.assert_not_called()
 
     @patch('data_loader.yf.download')
@@ -103,6 +128,17 @@ class TestDataCaching(unittest.TestCase):
 
 class TestBenchmarkData(unittest.TestCase):
 
+    def setUp(self):
+        """Always download the whole series (no incremental update or manifest of the cached CSV)."""
+        self.incremental_original = config.ATUALIZACAO_INCREMENTAL
+        self.manifesto_original = config.CACHE_MANIFEST
+        config.ATUALIZACAO_INCREMENTAL = False
+        config.CACHE_MANIFEST = None
+
+    def tearDown(self):
+        config.ATUALIZACAO_INCREMENTAL = self.incremental_original
+        config.CACHE_MANIFEST = self.manifesto_original
+
     @patch('data_loader.download_bcb_series')
     @patch('data_loader.pd.read_csv')
     @patch('data_loader._is_cache_valid')
@@ -133,6 +169,23 @@ import config
 
 class TestFallbackMechanism(unittest.TestCase):
 
+    def setUp(self):
+        """Disable the wait between download retries, the consolidated panel store, incremental updates and the manifest."""
+        self.espera_original = config.DOWNLOAD_ESPERA_INICIAL
+        self.store_original = config.PANEL_STORE_DIR
+        self.incremental_original = config.ATUALIZACAO_INCREMENTAL
+        self.manifesto_original = config.CACHE_MANIFEST
+        config.DOWNLOAD_ESPERA_INICIAL = 0.0
+        config.PANEL_STORE_DIR = None
+        config.ATUALIZACAO_INCREMENTAL = False
+        config.CACHE_MANIFEST = None
+
+    def tearDown(self):
+        config.DOWNLOAD_ESPERA_INICIAL = self.espera_original
+        config.PANEL_STORE_DIR = self.store_original
+        config.ATUALIZACAO_INCREMENTAL = self.incremental_original
+        config.CACHE_MANIFEST = self.manifesto_original
+
     @patch('data_loader._is_cache_valid', return_value=False)
     @patch('data_loader.yf.download')
     @patch('data_loader.download_mt5_data')
@@ -156,7 +209,7 @@ class TestFallbackMechanism(unittest.TestCase):
         
         _, failed_tickers = download_stock_data(['PETR4.SA'], '2020-01-01', '2020-01-31')
         
-        mock_yf_download.assert_called_once()
+        self.assertEqual(mock_yf_download.call_count, config.DOWNLOAD_TENTATIVAS)
         mock_download_mt5.assert_called_once()
         self.assertEqual(len(failed_tickers), 0)
 
@@ -169,7 +222,7 @@ class TestFallbackMechanism(unittest.TestCase):
         
         _, failed_tickers = download_stock_data(['PETR4.SA'], '2020-01-01', '2020-01-31')
         
-        mock_yf_download.assert_called_once()
+        self.assertEqual(mock_yf_download.call_count, config.DOWNLOAD_TENTATIVAS)
         mock_download_mt5.assert_called_once()
         self.assertEqual(len(failed_tickers), 1)
         self.assertEqual(failed_tickers[0], 'PETR4.SA')
@@ -183,9 +236,398 @@ class TestFallbackMechanism(unittest.TestCase):
         
         _, failed_tickers = download_stock_data(['PETR4.SA'], '2020-01-01', '2020-01-31')
         
-        mock_yf_download.assert_called_once()
+        self.assertEqual(mock_yf_download.call_count, config.DOWNLOAD_TENTATIVAS)
         mock_download_mt5.assert_not_called()
         self.assertEqual(len(failed_tickers), 1)
 
+class TestParallelDownloads(unittest.TestCase):
+
+    def setUp(self):
+        self.espera_original = config.DOWNLOAD_ESPERA_INICIAL
+        config.DOWNLOAD_ESPERA_INICIAL = 0.0
+
+    def tearDown(self):
+        config.DOWNLOAD_ESPERA_INICIAL = self.espera_original
+
+    def test_download_tickers_bounded_pool_with_retries(self):
+        """Test concurrent downloads against a fake provider with latency and transient failures."""
+        lock = threading.Lock()
+        estado = {'ativos': 0, 'maximo': 0, 'chamadas': {}}
+
+        def provedor(ticker, start, end):
+            with lock:
+                estado['ativos'] += 1
+                estado['maximo'] = max(estado['maximo'], estado['ativos'])
+                estado['chamadas'][ticker] = estado['chamadas'].get(ticker, 0) + 1
+                chamada = estado['chamadas'][ticker]
+            try:
+                time.sleep(0.02)
+                if ticker == 'RUIM3.SA':
+                    raise ConnectionError("fora do ar")
+                if ticker.startswith('INST') and chamada == 1:
+                    raise ConnectionError("falha temporária")
+                return pd.DataFrame({'Close': [1.0, 2.0]}, index=pd.date_range(start, periods=2))
+            finally:
+                with lock:
+                    estado['ativos'] -= 1
+
+        tickers = [f'T{i}.SA' for i in range(8)] + ['INST1.SA', 'INST2.SA', 'RUIM3.SA']
+        limitador = RateLimiter(None)
+        resultados = download_tickers(tickers, '2020-01-01', '2020-01-31', provider=provedor, max_workers=3, limitador=limitador)
+
+        self.assertEqual(list(resultados), tickers)
+        self.assertLessEqual(estado['maximo'], 3)
+        self.assertGreater(estado['maximo'], 1)
+        self.assertEqual(estado['chamadas']['INST1.SA'], 2)
+        self.assertEqual(estado['chamadas']['RUIM3.SA'], config.DOWNLOAD_TENTATIVAS)
+        self.assertIsNone(resultados['RUIM3.SA'])
+        self.assertTrue(all(resultados[t] is not None for t in tickers if t != 'RUIM3.SA'))
+
+    def test_rate_limiter_spaces_requests(self):
+        """Test that the global rate limit spaces requests by 1 / rate seconds."""
+        relogio = [0.0]
+        esperas = []
+        limitador = RateLimiter(4, relogio=lambda: relogio[0], dormir=esperas.append)
+        for _ in range(3):
+            limitador.wait()
+        self.assertEqual(esperas, [0.25, 0.5])
+
+        # Depois de uma pausa longa, a próxima requisição sai imediatamente
+        relogio[0] = 10.0
+        limitador.wait()
+        self.assertEqual(len(esperas), 2)
+
+class TestBatchDownloads(unittest.TestCase):
+
+    def setUp(self):
+        """Run inside a temporary directory so the per-ticker caches don't touch data/."""
+        self.espera_original = config.DOWNLOAD_ESPERA_INICIAL
+        self.lote_original = config.DOWNLOAD_LOTE
+        config.DOWNLOAD_ESPERA_INICIAL = 0.0
+        self.diretorio_original = os.getcwd()
+        self.diretorio = tempfile.mkdtemp()
+        os.chdir(self.diretorio)
+
+    def tearDown(self):
+        config.DOWNLOAD_ESPERA_INICIAL = self.espera_original
+        config.DOWNLOAD_LOTE = self.lote_original
+        os.chdir(self.diretorio_original)
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    @patch('data_loader._is_cache_valid', return_value=False)
+    @patch('data_loader.download_mt5_data', return_value=None)
+    def test_batches_split_into_per_ticker_caches(self, mock_download_mt5, mock_is_cache_valid):
+        """Test that stale tickers are fetched in batches and empty ones retried individually, then via MT5."""
+        config.USE_MT5 = True
+        config.DOWNLOAD_LOTE = 4
+        datas = pd.date_range('2020-01-01', periods=3)
+        lotes, individuais = [], []
+
+        def provedor_lote(tickers, start, end):
+            lotes.append(list(tickers))
+            # VAZIO3 vem sem cotações e FALTA3 nem aparece no lote
+            presentes = [t for t in tickers if t != 'FALTA3.SA']
+            colunas = pd.MultiIndex.from_product([presentes, ['Open', 'Close']])
+            dados = pd.DataFrame(1.0, index=datas, columns=colunas)
+            if 'VAZIO3.SA' in presentes:
+                dados['VAZIO3.SA'] = float('nan')
+            return dados
+
+        def provedor(ticker, start, end):
+            individuais.append(ticker)
+            if ticker == 'VAZIO3.SA':
+                return pd.DataFrame()
+            return pd.DataFrame({'Close': [2.0, 2.0, 2.0]}, index=datas)
+
+        tickers = [f'T{i}.SA' for i in range(6)] + ['VAZIO3.SA', 'FALTA3.SA']
+        dados, failed_tickers = download_stock_data(tickers, '2020-01-01', '2020-01-31',
+                                                    provider=provedor, batch_provider=provedor_lote, max_workers=2)
+
+        self.assertEqual(len(lotes), 2)
+        self.assertEqual(sorted(individuais), ['FALTA3.SA', 'VAZIO3.SA'])
+        mock_download_mt5.assert_called_once_with('VAZIO3', '2020-01-01', '2020-01-31', ANY)
+        self.assertEqual(failed_tickers, ['VAZIO3.SA'])
+
+        # Um arquivo de cache por ticker, no mesmo formato do download individual
+        cache = pd.read_csv('data/T0.SA.csv', header=0, index_col=0, parse_dates=True)
+        self.assertEqual(list(cache.columns), ['Close', 'Open'])
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(dados[('Close', 'FALTA3.SA')].iloc[0], 2.0)
+
+    @patch('data_loader.download_mt5_data', return_value=None)
+    def test_fresh_panel_store_skips_csvs_and_network(self, mock_download_mt5):
+        """Test that a second run is served from the consolidated panel store."""
+        datas = pd.date_range('2020-01-01', periods=3)
+
+        def provedor(ticker, start, end):
+            return pd.DataFrame({'Close': [1.0, 2.0, 3.0], 'Volume': [10.0, 20.0, 30.0]}, index=datas)
+
+        tickers = ['B.SA', 'A.SA']
+        with patch('data_loader._is_cache_valid', return_value=False):
+            primeiro, _ = download_stock_data(tickers, '2020-01-01', '2020-01-31', provider=provedor)
+
+        with patch('data_loader.pd.read_csv') as mock_read_csv:
+            segundo, failed_tickers = download_stock_data(tickers, '2020-01-01', '2020-01-31', provider=MagicMock())
+            mock_read_csv.assert_not_called()
+        pd.testing.assert_frame_equal(segundo, primeiro, check_freq=False)
+        self.assertEqual(failed_tickers, [])
+
+        # Um ticker fora do painel volta ao caminho dos CSVs
+        with patch('data_loader._is_cache_valid', return_value=False):
+            _, failed_tickers = download_stock_data(tickers + ['C.SA'], '2020-01-01', '2020-01-31', provider=provedor)
+        self.assertEqual(failed_tickers, [])
+
+    @patch('data_loader.download_mt5_data', return_value=None)
+    def test_panel_store_not_used_outside_its_period(self, mock_download_mt5):
+        """Test that a fresh panel store is bypassed when the requested start moves earlier or the end moves later."""
+        pedidos = []
+
+        def provedor(ticker, start, end):
+            pedidos.append((ticker, str(pd.Timestamp(start).date())))
+            return pd.DataFrame({'Close': 1.0}, index=pd.date_range(start, end, freq='B'))
+
+        tickers = ['A.SA', 'B.SA']
+        download_stock_data(tickers, '2020-01-01', '2020-01-31', provider=provedor)
+        self.assertTrue(panel_store.load_panel_store(config.PANEL_STORE_DIR).covers('2020-01-01', '2020-01-31'))
+
+        pedidos.clear()
+        dados, _ = download_stock_data(tickers, '2019-12-01', '2020-01-31', provider=provedor)
+        self.assertEqual(sorted(pedidos), [('A.SA', '2019-12-01'), ('B.SA', '2019-12-01')])
+        self.assertEqual(dados.index[0], pd.Timestamp('2019-12-02'))
+
+        self.assertFalse(panel_store.load_panel_store(config.PANEL_STORE_DIR).covers('2019-12-01', '2020-02-28'))
+
+    @patch('data_loader.download_mt5_data', return_value=None)
+    def test_stale_panel_store_is_rewritten_without_open_mappings(self, mock_download_mt5):
+        """Test that a store not covering the request is replaced while no memory map of it is alive (as Windows requires)."""
+        def provedor(ticker, start, end):
+            return pd.DataFrame({'Close': 1.0}, index=pd.date_range(start, end, freq='B'))
+
+        carregar, substituir = np.load, os.replace
+        mapeados = []
+
+        def carregar_rastreando(path, *args, **kwargs):
+            matriz = carregar(path, *args, **kwargs)
+            if isinstance(matriz, np.memmap):
+                mapeados.append((os.path.abspath(path), weakref.ref(matriz)))
+            return matriz
+
+        def substituir_como_windows(origem, destino):
+            if any(path == os.path.abspath(destino) and ref() is not None for path, ref in mapeados):
+                raise PermissionError(f"arquivo mapeado em memória: {destino}")
+            substituir(origem, destino)
+
+        tickers = ['A.SA', 'B.SA']
+        download_stock_data(tickers, '2020-01-01', '2020-01-31', provider=provedor)
+        with patch('panel_store.np.load', side_effect=carregar_rastreando), \
+             patch('panel_store.os.replace', side_effect=substituir_como_windows):
+            # Um painel que cobre o pedido é lido; um que não cobre é regravado sem erro
+            download_stock_data(tickers, '2020-01-01', '2020-01-31', provider=provedor)
+            download_stock_data(tickers, '2019-12-01', '2020-01-31', provider=provedor)
+        store = panel_store.load_panel_store(config.PANEL_STORE_DIR)
+        self.assertTrue(store.covers('2019-12-01', '2020-01-31'))
+
+class TestIncrementalUpdates(unittest.TestCase):
+
+    def setUp(self):
+        """Run inside a temporary directory with a stale cache covering the first days of January."""
+        self.incremental_original = config.ATUALIZACAO_INCREMENTAL
+        self.store_original = config.PANEL_STORE_DIR
+        config.ATUALIZACAO_INCREMENTAL = True
+        config.PANEL_STORE_DIR = None
+        self.diretorio_original = os.getcwd()
+        self.diretorio = tempfile.mkdtemp()
+        os.chdir(self.diretorio)
+        os.makedirs('data')
+        self.datas = pd.bdate_range('2020-01-01', '2020-01-14')
+        self.close = pd.Series(np.arange(1.0, len(self.datas) + 1), index=self.datas)
+        pd.DataFrame({'Close': self.close[:6]}, index=pd.DatetimeIndex(self.datas[:6], name='Date')).to_csv('data/A.SA.csv')
+
+    def tearDown(self):
+        config.ATUALIZACAO_INCREMENTAL = self.incremental_original
+        config.PANEL_STORE_DIR = self.store_original
+        os.chdir(self.diretorio_original)
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def _provedor(self, pedidos, ajuste=1.0):
+        def provedor(ticker, start, end):
+            pedidos.append(start)
+            periodo = self.close[start:]
+            # Com `ajuste`, o histórico inteiro muda (como os preços ajustados depois de um dividendo)
+            return pd.DataFrame({'Close': periodo * ajuste}, index=pd.DatetimeIndex(periodo.index, name='Date'))
+        return provedor
+
+    @patch('data_loader._is_cache_valid', return_value=False)
+    def test_stale_cache_fetches_only_trailing_days(self, mock_is_cache_valid):
+        """Test that a stale ticker cache requests only the missing days plus the overlap."""
+        pedidos = []
+        dados, failed_tickers = download_stock_data(['A.SA'], '2020-01-01', '2020-01-15', provider=self._provedor(pedidos))
+
+        sobreposicao = self.datas[6 - config.ATUALIZACAO_SOBREPOSICAO].strftime('%Y-%m-%d')
+        self.assertEqual(pedidos, [sobreposicao])
+        self.assertEqual(failed_tickers, [])
+        cache = pd.read_csv('data/A.SA.csv', header=0, index_col=0, parse_dates=True)
+        np.testing.assert_array_equal(cache['Close'].to_numpy(), self.close.to_numpy())
+        self.assertFalse(os.path.exists('data/A.SA.csv.tmp'))
+
+    @patch('data_loader._is_cache_valid', return_value=False)
+    @patch('data_loader.download_mt5_data', return_value=None)
+    def test_overlap_mismatch_triggers_full_refresh(self, mock_download_mt5, mock_is_cache_valid):
+        """Test that an overlap that disagrees with the cache refetches the whole period."""
+        pedidos = []
+        download_stock_data(['A.SA'], '2020-01-01', '2020-01-15', provider=self._provedor(pedidos, ajuste=0.9))
+
+        self.assertEqual(len(pedidos), 2)
+        self.assertEqual(pedidos[1], '2020-01-01')
+        cache = pd.read_csv('data/A.SA.csv', header=0, index_col=0, parse_dates=True)
+        np.testing.assert_allclose(cache['Close'].to_numpy(), self.close.to_numpy() * 0.9)
+        mock_download_mt5.assert_not_called()
+
+    @patch('data_loader._is_cache_valid', return_value=False)
+    @patch('data_loader.download_bcb_series')
+    def test_bcb_series_appends_missing_readings(self, mock_download_bcb, mock_is_cache_valid):
+        """Test that a stale CDI cache downloads only the trailing readings from SGS."""
+        serie = pd.DataFrame({BENCHMARK_NAME.lower(): np.linspace(0.04, 0.05, len(self.datas))},
+                             index=pd.DatetimeIndex(self.datas, name='Date'))
+        serie.iloc[:6].to_csv(f'data/{BENCHMARK_NAME}.csv')
+        mock_download_bcb.side_effect = lambda codigo, nome, inicio, fim: serie.loc[inicio:]
+
+        resultado = get_benchmark_data('2020-01-01', '2020-01-15')
+
+        inicio = mock_download_bcb.call_args[0][2]
+        self.assertEqual(inicio, self.datas[6 - config.ATUALIZACAO_SOBREPOSICAO].strftime('%Y-%m-%d'))
+        np.testing.assert_allclose(resultado[BENCHMARK_NAME.lower()].to_numpy(), serie.iloc[:, 0].to_numpy())
+
+class TestBcbChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.espera_original = config.DOWNLOAD_ESPERA_INICIAL
+        config.DOWNLOAD_ESPERA_INICIAL = 0.0
+
+    def tearDown(self):
+        config.DOWNLOAD_ESPERA_INICIAL = self.espera_original
+
+    @patch('data_loader.sgs.get')
+    def test_chunks_are_fetched_concurrently_and_deduplicated(self, mock_sgs_get):
+        """Test that SGS chunks run in parallel, failed chunks are retried and boundary overlaps are dropped."""
+        lock = threading.Lock()
+        # As três primeiras consultas só prosseguem quando as três estiverem em andamento
+        barreira = threading.Barrier(3)
+        estado = {'chamadas': 0, 'ativos': 0, 'maximo': 0, 'falhou': False}
+
+        def sgs_get(codigos, start, end):
+            with lock:
+                estado['chamadas'] += 1
+                primeira_rodada = estado['chamadas'] <= 3
+                estado['ativos'] += 1
+                estado['maximo'] = max(estado['maximo'], estado['ativos'])
+            try:
+                if primeira_rodada:
+                    barreira.wait(timeout=5)
+                with lock:
+                    if start == '2018-01-03' and not estado['falhou']:
+                        estado['falhou'] = True
+                        raise ConnectionError("SGS indisponível")
+                # Cada bloco devolve também o dia seguinte ao fim (sobreposição com o próximo bloco)
+                datas = pd.date_range(start, pd.Timestamp(end) + pd.Timedelta(days=1), freq='D')
+                return pd.DataFrame({'cdi': float(start[:4])}, index=datas)
+            finally:
+                with lock:
+                    estado['ativos'] -= 1
+
+        mock_sgs_get.side_effect = sgs_get
+        serie = download_bcb_series(12, 'cdi', '2012-01-01', '2020-12-31', max_workers=3)
+
+        self.assertEqual(mock_sgs_get.call_count, 4)
+        self.assertEqual(estado['maximo'], 3)
+        self.assertTrue(serie.index.is_unique)
+        self.assertTrue(serie.index.is_monotonic_increasing)
+        # Na fronteira, vale o bloco mais antigo
+        self.assertEqual(serie.loc['2015-01-02', 'cdi'], 2012.0)
+
+class TestBulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def _csv(self, nome, df):
+        path = os.path.join(self.diretorio, f'{nome}.csv')
+        df.to_csv(path)
+        return path
+
+    def test_matches_concat_of_full_csvs(self):
+        """Test the preallocated loader against concatenating full CSV reads, for every cache flavour."""
+        datas = pd.DatetimeIndex(pd.bdate_range('2021-01-01', periods=6), name='Date')
+        yfinance = pd.DataFrame({'Close': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0], 'High': 9.0, 'Volume': 100}, index=datas)
+        # MT5: começa mais tarde, tem dividendos e um fechamento vazio (leitura pelo pandas)
+        mt5 = pd.DataFrame({'Open': 1.0, 'Close': [7.0, np.nan, 9.0], 'Dividends': 0.0}, index=datas[2:5])
+        mt5.index.name = 'time'
+        recente = pd.DataFrame({'Close': [10.0, 11.0]}, index=pd.DatetimeIndex(['2021-01-04', '2021-01-09']))
+        fontes = {'YF.SA': self._csv('YF.SA', yfinance), 'MT.SA': self._csv('MT.SA', mt5), 'NOVO.SA': recente}
+
+        dados = build_stock_frame(fontes)
+
+        lidos = {t: pd.read_csv(f, header=0, index_col=0, parse_dates=True) if isinstance(f, str) else f for t, f in fontes.items()}
+        esperado = pd.concat(lidos.values(), keys=lidos.keys(), axis=1)
+        esperado.columns = esperado.columns.swaplevel(0, 1)
+        # Tickers sem dividendos no cache ficam com a coluna vazia, como o painel de mercado já os trata
+        esperado = esperado.reindex(columns=pd.MultiIndex.from_product([['Close', 'Dividends'], sorted(fontes)])).ffill()
+        pd.testing.assert_frame_equal(dados, esperado, check_names=False, check_freq=False)
+        self.assertEqual(list(dados.columns.get_level_values(0).unique()), ['Close', 'Dividends'])
+
+class TestCacheManifestIntegration(unittest.TestCase):
+
+    def setUp(self):
+        """Run inside a temporary directory with the manifest enabled."""
+        self.store_original = config.PANEL_STORE_DIR
+        self.manifesto_original = config.CACHE_MANIFEST
+        config.PANEL_STORE_DIR = None
+        config.CACHE_MANIFEST = 'data/manifest.json'
+        self.diretorio_original = os.getcwd()
+        self.diretorio = tempfile.mkdtemp()
+        os.chdir(self.diretorio)
+        datas = pd.bdate_range('2020-01-01', '2020-01-31')
+        self.chamadas = []
+
+        def provedor(ticker, start, end):
+            self.chamadas.append((ticker, start))
+            periodo = datas[datas >= pd.Timestamp(start)]
+            return pd.DataFrame({'Close': np.arange(1.0, len(periodo) + 1)}, index=pd.DatetimeIndex(periodo, name='Date'))
+        self.provedor = provedor
+
+    def tearDown(self):
+        config.PANEL_STORE_DIR = self.store_original
+        config.CACHE_MANIFEST = self.manifesto_original
+        os.chdir(self.diretorio_original)
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_covered_request_is_served_without_network(self):
+        """Test that an old cache covering the requested period is used as is, and a wider one is refetched."""
+        download_stock_data(['A.SA'], '2020-01-01', '2020-01-31', provider=self.provedor)
+        entrada = json.load(open('data/manifest.json'))['series']['data/A.SA.csv']
+        self.assertEqual((entrada['inicio'], entrada['fim'], entrada['fonte']), ('2020-01-01', '2020-01-31', 'yfinance'))
+        self.assertEqual(entrada['linhas'], 23)
+
+        with patch('data_loader._is_cache_valid', return_value=False):
+            download_stock_data(['A.SA'], '2020-01-06', '2020-01-20', provider=self.provedor)
+            self.assertEqual(len(self.chamadas), 1)
+
+            # Um início anterior ao coberto exige o período inteiro
+            download_stock_data(['A.SA'], '2019-12-01', '2020-01-31', provider=self.provedor)
+            self.assertEqual(self.chamadas[-1], ('A.SA', '2019-12-01'))
+
+    def test_truncated_cache_is_redownloaded(self):
+        """Test that a cache file that no longer matches its checksum is not used."""
+        download_stock_data(['A.SA'], '2020-01-01', '2020-01-31', provider=self.provedor)
+        with open('data/A.SA.csv', 'r+') as f:
+            f.truncate(100)
+
+        dados, _ = download_stock_data(['A.SA'], '2020-01-01', '2020-01-31', provider=self.provedor)
+        self.assertEqual(self.chamadas, [('A.SA', '2020-01-01'), ('A.SA', '2020-01-01')])
+        self.assertEqual(len(dados), 23)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,33 @@
+import unittest
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engine_utils import smallest_n, smallest_n_mask
+
+class TestPartialSelection(unittest.TestCase):
+
+    def setUp(self):
+        """Set up value vectors with many ties and ineligible (infinite) positions."""
+        rng = np.random.default_rng(0)
+        self.valores = rng.integers(0, 4, size=(200, 25)).astype(float)
+        self.valores[rng.random(self.valores.shape) < 0.2] = np.inf
+        self.n = rng.integers(0, 28, size=200)
+
+    def test_smallest_n_matches_stable_sort(self):
+        """Verify partial selection returns the same indices, in the same order, as a stable argsort."""
+        for linha, n in zip(self.valores, self.n):
+            np.testing.assert_array_equal(smallest_n(linha, n), np.argsort(linha, kind='stable')[:n])
+
+    def test_smallest_n_mask_matches_stable_sort_per_row(self):
+        """Verify the row-wise mask picks each row's n smallest, breaking ties by column order."""
+        mascara = smallest_n_mask(self.valores, self.n)
+        for linha, n, obtido in zip(self.valores, self.n, mascara):
+            esperado = np.zeros(len(linha), dtype=bool)
+            esperado[np.argsort(linha, kind='stable')[:n]] = True
+            np.testing.assert_array_equal(obtido, esperado)
+
+if __name__ == '__main__':
+    unittest.main()
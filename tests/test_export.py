@@ -0,0 +1,84 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from export import export_results, register_exporter, EXPORTADORES
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a daily result frame with a text column and gaps, and a temporary results directory."""
+        self.diretorio = tempfile.mkdtemp()
+        dates = pd.date_range('2020-01-01', '2020-06-30', freq='D')
+        self.resultado = pd.DataFrame({
+            'TICKER_A.SA': np.linspace(100.0, 200.0, len(dates)),
+            'Total': np.linspace(1000.0, 2000.0, len(dates)),
+            'Ativo Aportado': np.where(dates.day == 2, 'TICKER_A.SA', None),
+        }, index=dates)
+        self.resultado.loc['2020-03-15', 'TICKER_A.SA'] = np.nan
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+        EXPORTADORES.pop('lento', None)
+        EXPORTADORES.pop('quebrado', None)
+
+    def test_xlsx_and_csv_monthly_by_default(self):
+        """Test that xlsx and csv exports hold the month-end rows, with daily data only on request."""
+        gravados = export_results([(self.resultado, 'Aporte Unico', 'lump.xlsx')], self.diretorio,
+                                  formatos=['xlsx', 'csv'], diario=False)
+        path_xlsx = os.path.join(self.diretorio, 'lump.xlsx')
+        self.assertEqual(gravados, {'Aporte Unico': [path_xlsx, os.path.join(self.diretorio, 'lump.csv')]})
+
+        esperado = self.resultado.resample('ME').last()
+        planilhas = pd.read_excel(path_xlsx, sheet_name=None, index_col=0)
+        self.assertEqual(list(planilhas), ['Aporte Unico (Mensal)'])
+        lido = planilhas['Aporte Unico (Mensal)']
+        np.testing.assert_allclose(lido['Total'].to_numpy(), esperado['Total'].to_numpy())
+        np.testing.assert_array_equal(pd.DatetimeIndex(lido.index), esperado.index)
+
+        export_results([(self.resultado, 'Aporte Unico', 'lump.xlsx')], self.diretorio, formatos=['xlsx', 'csv'], diario=True)
+        planilhas = pd.read_excel(path_xlsx, sheet_name=None, index_col=0)
+        diario = planilhas['Aporte Unico (Diário)']
+        self.assertEqual(len(diario), len(self.resultado))
+        self.assertTrue(np.isnan(diario.loc['2020-03-15', 'TICKER_A.SA']))
+        self.assertEqual(diario.loc['2020-02-02', 'Ativo Aportado'], 'TICKER_A.SA')
+        csv_diario = pd.read_csv(os.path.join(self.diretorio, 'lump_diario.csv'), index_col=0, parse_dates=True)
+        np.testing.assert_allclose(csv_diario['Total'].to_numpy(), self.resultado['Total'].to_numpy())
+
+    def test_scenarios_run_concurrently_and_failures_are_isolated(self):
+        """Test that scenarios are exported in parallel and a failing format does not stop the others."""
+        lock = threading.Lock()
+        estado = {'ativos': 0, 'maximo': 0}
+
+        @register_exporter('lento')
+        def exportar_lento(tabelas, path_base):
+            with lock:
+                estado['ativos'] += 1
+                estado['maximo'] = max(estado['maximo'], estado['ativos'])
+            time.sleep(0.05)
+            with lock:
+                estado['ativos'] -= 1
+            return [path_base]
+
+        @register_exporter('quebrado')
+        def exportar_quebrado(tabelas, path_base):
+            raise OSError("disco cheio")
+
+        cenarios = [(self.resultado, f'Cenario {i}', f'c{i}.xlsx') for i in range(3)]
+        gravados = export_results(cenarios, self.diretorio, formatos=['quebrado', 'lento'], max_workers=3)
+        self.assertEqual(estado['maximo'], 3)
+        self.assertEqual(gravados['Cenario 2'], [os.path.join(self.diretorio, 'c2')])
+
+        with self.assertRaises(ValueError):
+            export_results(cenarios, self.diretorio, formatos=['xls'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from market_panel import build_market_panel
+
+class TestMarketPanel(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a panel where one ticker starts trading later and one has no data."""
+        self.tickers = ['TICKER_A.SA', 'TICKER_B.SA', 'TICKER_C.SA']
+        dates = pd.to_datetime(['2020-01-02', '2020-01-03', '2020-01-06'])
+        columns = pd.MultiIndex.from_product([['Close'], self.tickers])
+        self.data = pd.DataFrame(np.nan, index=dates, columns=columns)
+        self.data[('Close', 'TICKER_A.SA')] = [10.0, 11.0, 12.0]
+        self.data[('Close', 'TICKER_B.SA')] = [np.nan, 20.0, 21.0]
+        self.benchmark = pd.Series(1.001, index=dates)
+        self.panel = build_market_panel(self.data, self.benchmark, None, self.tickers, '2020-01-01', '2020-01-06')
+
+    def test_arrays_are_contiguous_float64(self):
+        """Verify price matrices are C-contiguous float64 and dividends default to NaN."""
+        self.assertEqual(self.panel.close.dtype, np.float64)
+        self.assertTrue(self.panel.close.flags['C_CONTIGUOUS'])
+        self.assertTrue(np.isnan(self.panel.dividends).all())
+
+    def test_first_valid_and_valid_tickers(self):
+        """Verify first valid positions and that never-quoted tickers are filtered out."""
+        np.testing.assert_array_equal(self.panel.first_valid, [0, 1, -1])
+        self.assertEqual(self.panel.valid_tickers(['TICKER_C.SA', 'TICKER_B.SA', 'OTHER.SA']), ['TICKER_B.SA'])
+
+    def test_to_calendar_repeats_last_trading_day(self):
+        """Verify calendar expansion carries the last trading day and fills the start."""
+        close_a, _ = self.panel.arrays(['TICKER_A.SA'])
+        calendario = self.panel.to_calendar(close_a[:, 0])
+        np.testing.assert_array_equal(calendario, [0.0, 10.0, 11.0, 11.0, 11.0, 12.0])
+
+    def test_benchmark_index_is_cumulative_on_calendar(self):
+        """Verify the benchmark accrues only on quoted days and records its first quote."""
+        self.assertEqual(self.panel.inicio_benchmark, 1)
+        self.assertAlmostEqual(self.panel.indice_benchmark[-1], 1.001 ** 3)
+        self.assertAlmostEqual(self.panel.indice_benchmark[0], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
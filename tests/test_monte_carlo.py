@@ -0,0 +1,101 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from engines import monthly_contributions_paths_engine
+from market_panel import build_market_panel
+from monte_carlo import bootstrap_month_starts, run_monte_carlo, summarize_distribution, DIAS_POR_MES
+import config
+
+def reference_path(log_acumulado, cotado, inicios, aportes, n, periodo, quarentena_inicial, quarentena_adicional):
+    """Regra de aportes aplicada a uma trajetória, um ativo de cada vez."""
+    n_tickers = log_acumulado.shape[1]
+    valores = [0.0] * n_tickers
+    fim_quarentena, duracao, ultimo = {}, {}, {}
+    totais = []
+    for m, inicio in enumerate(inicios):
+        for t in [t for t, fim in fim_quarentena.items() if m >= fim]:
+            del fim_quarentena[t]
+        elegiveis = [t for t in range(n_tickers) if cotado[inicio, t] and t not in fim_quarentena]
+        escolhidos = sorted(elegiveis, key=lambda t: valores[t])[:n]
+        for t in escolhidos:
+            valores[t] += aportes[m] / len(escolhidos)
+            if t in ultimo and ultimo[t] >= m - periodo:
+                d = duracao.get(t, quarentena_inicial)
+                fim_quarentena[t] = m + d
+                duracao[t] = d + quarentena_adicional
+            ultimo[t] = m
+        valores = [v * np.exp(log_acumulado[inicio + DIAS_POR_MES, t] - log_acumulado[inicio, t]) for t, v in enumerate(valores)]
+        totais.append(sum(valores))
+    return np.array(totais)
+
+class TestMonteCarlo(unittest.TestCase):
+
+    def setUp(self):
+        config.APORTE_MENSAL_BASE = 1000.0
+        config.NUMERO_EMPRESAS_POR_APORTE = 1
+        config.FREIO_ATIVO = True
+        config.FREIO_PERIODO_APORTES = 2
+        config.FREIO_QUARENTENA_INICIAL = 3
+        config.FREIO_QUARENTENA_ADICIONAL = 6
+        config.IPCA_BENCHMARK_X = 6.0
+        config.MC_PERCENTIS = (5, 50, 95)
+
+    def test_bootstrap_draws_consecutive_months_within_history(self):
+        """Verify each block is a run of consecutive historical months that fits in the history."""
+        inicios = bootstrap_month_starts(300, 50, 10, 4, np.random.default_rng(0))
+
+        self.assertEqual(inicios.shape, (10, 50))
+        self.assertTrue((inicios >= 0).all())
+        self.assertTrue((inicios + DIAS_POR_MES <= 299).all())
+        for bloco in range(3):
+            passos = np.diff(inicios[bloco * 4:(bloco + 1) * 4], axis=0)
+            self.assertTrue((passos == DIAS_POR_MES).all())
+        with self.assertRaises(ValueError):
+            bootstrap_month_starts(50, 1, 10, 4, np.random.default_rng(0))
+
+    def test_paths_engine_matches_reference_loop(self):
+        """Verify the batched rule reproduces a path-by-path loop, brake included."""
+        rng = np.random.default_rng(3)
+        log_acumulado = np.cumsum(rng.normal(0, 0.02, size=(400, 4)), axis=0)
+        cotado = rng.random((400, 4)) > 0.1
+        inicios = bootstrap_month_starts(400, 20, 24, 3, rng)
+        aportes = 1000 * np.cumprod(np.full((24, 20), 1.004), axis=0)
+
+        for n in (1, 2):
+            resultado = monthly_contributions_paths_engine(log_acumulado, cotado, inicios, aportes, DIAS_POR_MES, n,
+                                                           freio_ativo=True, freio_periodo=2,
+                                                           quarentena_inicial=3, quarentena_adicional=6)
+            for p in range(20):
+                esperado = reference_path(log_acumulado, cotado, inicios[:, p], aportes[:, p], n, 2, 3, 6)
+                np.testing.assert_allclose(resultado['total'][:, p], esperado, rtol=1e-12)
+
+    def test_constant_history_gives_identical_paths(self):
+        """Verify paths resampled from a constant-growth history all match the closed form."""
+        dates = pd.bdate_range('2020-01-02', periods=600)
+        tickers = ['TICKER_A.SA', 'TICKER_B.SA']
+        precos = 10 * 1.001 ** np.arange(len(dates))
+        data = pd.DataFrame(np.column_stack([precos, precos]), index=dates,
+                            columns=pd.MultiIndex.from_product([['Close'], tickers]))
+        benchmark = pd.Series(1.0005, index=dates)
+        panel = build_market_panel(data, benchmark, None, tickers, dates[0], dates[-1])
+        config.FREIO_ATIVO = False
+
+        leque, distribuicao = run_monte_carlo(panel, n_caminhos=200, anos=2, bloco_meses=6, semente=1)
+
+        crescimento = 1.001 ** DIAS_POR_MES
+        esperado = 1000 * sum(crescimento ** k for k in range(1, 25))
+        self.assertEqual(len(leque), 24)
+        np.testing.assert_allclose(distribuicao['Valor Final'], esperado, rtol=1e-9)
+        np.testing.assert_allclose(leque['P5'], leque['P95'], rtol=1e-9)
+        self.assertAlmostEqual(distribuicao['Total Investido'].iloc[0], 24000.0)
+        # O CDI rende 1.0005 por pregão, menos que as ações
+        self.assertTrue((distribuicao['Excesso CDI'] > 0).all())
+        self.assertEqual(summarize_distribution(distribuicao).loc['Supera o benchmark', 'Excesso CDI'], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,48 @@
 import unittest
 from unittest.mock import patch, MagicMock
+import numpy as np
 import pandas as pd
-from data_loader import connect_mt5, download_mt5_data
+from data_loader import connect_mt5, download_mt5_data, MT5Session
 import config
 
+RATES_DTYPE = [('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')]
+
+class FakeMT5:
+    """Local stand-in for the MetaTrader5 module: daily bars from 2021-01-01 on."""
+    TIMEFRAME_D1 = 16408
+
+    def __init__(self):
+        self.inicializacoes = 0
+        self.encerramentos = 0
+        self.pedidos = []
+
+    def initialize(self):
+        self.inicializacoes += 1
+        return True
+
+    def shutdown(self):
+        self.encerramentos += 1
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self.pedidos.append((symbol, date_from, date_to))
+        dias = np.arange(np.datetime64('2021-01-01'), np.datetime64('2021-03-01'))
+        dias = dias[(dias >= np.datetime64(date_from.date())) & (dias <= np.datetime64(date_to.date()))]
+        rates = np.zeros(len(dias), dtype=RATES_DTYPE)
+        rates['time'] = dias.astype('datetime64[s]').astype(np.int64)
+        rates['close'] = np.arange(len(dias)) + 10.0
+        rates['tick_volume'] = 100
+        return rates
+
 class TestMt5Integration(unittest.TestCase):
 
+    def setUp(self):
+        self.retries_original = config.MT5_RETRIES
+        self.timeout_original = config.MT5_TIMEOUT
+
+    def tearDown(self):
+        config.MT5_RETRIES = self.retries_original
+        config.MT5_TIMEOUT = self.timeout_original
+
     @patch('data_loader.mt5')
     def test_connect_mt5_success(self, mock_mt5):
         mock_mt5.initialize.return_value = True
@@ -21,27 +58,52 @@ class TestMt5Integration(unittest.TestCase):
     @patch('data_loader.connect_mt5')
     @patch('data_loader.mt5')
     def test_download_mt5_data_success(self, mock_mt5, mock_connect_mt5):
-        import numpy as np
         mock_connect_mt5.return_value = True
         rates = np.array([(1609459200, 100.0, 102.0, 99.0, 101.0, 1000, 0, 0),
                           (1609545600, 101.0, 103.0, 100.0, 102.0, 1200, 0, 0)],
-                         dtype=[('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
-        mock_mt5.copy_rates_from_pos.return_value = rates
+                         dtype=RATES_DTYPE)
+        mock_mt5.copy_rates_range.return_value = rates
         
         df = download_mt5_data('PETR4.SA', '2021-01-01', '2021-01-02')
         
         self.assertIsNotNone(df)
         self.assertEqual(len(df), 2)
+        self.assertEqual(list(df.columns), ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends'])
+        self.assertEqual(df.index[0], pd.Timestamp('2021-01-01'))
 
     @patch('data_loader.connect_mt5')
     @patch('data_loader.mt5')
     def test_download_mt5_data_no_data(self, mock_mt5, mock_connect_mt5):
         mock_connect_mt5.return_value = True
-        mock_mt5.copy_rates_from_pos.return_value = None
+        mock_mt5.copy_rates_range.return_value = None
         
         df = download_mt5_data('PETR4.SA', '2021-01-01', '2021-01-02')
         
         self.assertIsNone(df)
 
+    def test_session_is_reused_across_tickers(self):
+        """Test one initialize/shutdown per session and bar requests bounded to the requested range."""
+        falso = FakeMT5()
+        with MT5Session(falso) as sessao:
+            for ticker in ('PETR4', 'VALE3', 'ITUB3'):
+                df = download_mt5_data(ticker, '2021-01-10', '2021-01-20', sessao)
+                self.assertEqual(len(df), 11)
+                self.assertEqual(df.index[0], pd.Timestamp('2021-01-10'))
+        self.assertEqual(falso.inicializacoes, 1)
+        self.assertEqual(falso.encerramentos, 1)
+        self.assertEqual([p[0] for p in falso.pedidos], ['PETR4', 'VALE3', 'ITUB3'])
+
+    @patch('data_loader.time.sleep')
+    def test_failed_connection_is_not_retried_per_ticker(self, mock_sleep):
+        """Test that a terminal that doesn't answer is only tried once per session."""
+        falso = MagicMock()
+        falso.initialize.return_value = False
+        config.MT5_RETRIES = 2
+        sessao = MT5Session(falso)
+        self.assertIsNone(download_mt5_data('PETR4', '2021-01-01', '2021-01-31', sessao))
+        self.assertIsNone(download_mt5_data('VALE3', '2021-01-01', '2021-01-31', sessao))
+        self.assertEqual(falso.initialize.call_count, 2)
+        falso.copy_rates_range.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import shutil
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import panel_store
+
+class TestPanelStore(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a small (field, ticker) frame like the output of download_stock_data."""
+        self.diretorio = tempfile.mkdtemp()
+        datas = pd.DatetimeIndex(pd.bdate_range('2021-01-01', periods=5), name='Date')
+        colunas = pd.MultiIndex.from_product([['Close', 'Dividends', 'Open', 'Volume'], ['AAA3.SA', 'BBB3.SA']])
+        self.dados = pd.DataFrame(np.arange(40, dtype=float).reshape(5, 8), index=datas, columns=colunas)
+        self.dados.iloc[0, 1] = np.nan
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_round_trip_is_memory_mapped(self):
+        """Test that the stored panel reloads as memory-mapped matrices and the same frame."""
+        panel_store.save_panel_store(self.dados, self.diretorio)
+        store = panel_store.load_panel_store(self.diretorio)
+
+        self.assertIsInstance(store.campos['Close'], np.memmap)
+        self.assertEqual(store.tickers, ['AAA3.SA', 'BBB3.SA'])
+        # Os campos que os cenários não usam (ex.: Open e Volume) ficam de fora
+        esperado = self.dados[['Close', 'Dividends']]
+        pd.testing.assert_frame_equal(store.to_frame(), esperado, check_freq=False)
+        pd.testing.assert_frame_equal(store.to_frame(['BBB3.SA']), esperado.loc[:, (slice(None), ['BBB3.SA'])], check_freq=False)
+
+    def test_coverage_is_decided_from_meta_only(self):
+        """Test that panel_covers checks period and tickers without opening the matrices."""
+        panel_store.save_panel_store(self.dados, self.diretorio, '2021-01-01', '2021-01-31')
+        with patch('panel_store.np.load') as mock_load:
+            self.assertTrue(panel_store.panel_covers(self.diretorio, ['AAA3.SA'], '2021-01-01', '2021-01-15'))
+            self.assertFalse(panel_store.panel_covers(self.diretorio, ['AAA3.SA'], '2020-12-01', '2021-01-15'))
+            self.assertFalse(panel_store.panel_covers(self.diretorio, ['AAA3.SA'], '2021-01-01', '2021-02-15'))
+            self.assertFalse(panel_store.panel_covers(self.diretorio, ['CCC3.SA'], '2021-01-01', '2021-01-15'))
+            mock_load.assert_not_called()
+
+    def test_incomplete_store_is_ignored(self):
+        """Test that a store whose matrices don't match the metadata is not loaded."""
+        self.assertIsNone(panel_store.load_panel_store(self.diretorio))
+        panel_store.save_panel_store(self.dados, self.diretorio)
+        np.save(os.path.join(self.diretorio, 'Close.npy'), np.zeros((2, 2)))
+        self.assertIsNone(panel_store.load_panel_store(self.diretorio))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+import numpy as np
+import pandas as pd
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import config
+import providers
+from data_loader import download_bcb_series, fetch_with_retry, MT5Session, download_mt5_data
+from providers import RecordingProvider, ReplayProvider, ProviderFailure, MT5Provider
+
+class TestProviders(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary fixture directory."""
+        self.diretorio = tempfile.mkdtemp()
+        self.originais = (config.PROVEDOR_MODO, config.PROVEDOR_DIRETORIO, config.PROVEDOR_LATENCIA,
+                          config.PROVEDOR_TAXA_FALHAS, config.DOWNLOAD_ESPERA_INICIAL)
+        providers._REPRODUTORES.clear()
+        config.PROVEDOR_DIRETORIO = self.diretorio
+        config.PROVEDOR_LATENCIA = 0.0
+        config.PROVEDOR_TAXA_FALHAS = 0.0
+        config.DOWNLOAD_ESPERA_INICIAL = 0.0
+
+    def tearDown(self):
+        (config.PROVEDOR_MODO, config.PROVEDOR_DIRETORIO, config.PROVEDOR_LATENCIA,
+         config.PROVEDOR_TAXA_FALHAS, config.DOWNLOAD_ESPERA_INICIAL) = self.originais
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_record_then_replay(self):
+        """Test that recorded responses are replayed by argument, with latency and missing fixtures reported."""
+        real = lambda ticker, start, end: pd.DataFrame({'Close': [1.0, 2.0]}, index=pd.date_range(start, periods=2))
+        gravador = RecordingProvider('yfinance', real, self.diretorio)
+        gravado = gravador('PETR4.SA', pd.Timestamp('2020-01-01'), '2020-12-31')
+
+        esperas = []
+        reprodutor = ReplayProvider('yfinance', self.diretorio, latencia=0.5, jitter=0.2, semente=1, dormir=esperas.append)
+        # datetime e Timestamp iguais levam à mesma gravação
+        pd.testing.assert_frame_equal(reprodutor('PETR4.SA', datetime(2020, 1, 1), '2020-12-31'), gravado)
+        self.assertEqual(reprodutor.consultas, 1)
+        self.assertEqual(len(esperas), 1)
+        self.assertTrue(0.4 <= esperas[0] <= 0.6)
+
+        with self.assertRaises(providers.MissingRecording):
+            reprodutor('VALE3.SA', '2020-01-01', '2020-12-31')
+
+    def test_injected_failures_are_seeded(self):
+        """Test that the failure rate is honoured and reproducible for a given seed."""
+        RecordingProvider('sgs', lambda *a: pd.DataFrame({'cdi': [0.1]}), self.diretorio)('cdi', 12, '2020-01-01', '2020-12-31')
+
+        def falhas(semente):
+            reprodutor = ReplayProvider('sgs', self.diretorio, taxa_falhas=0.3, semente=semente)
+            resultado = []
+            for _ in range(200):
+                try:
+                    reprodutor('cdi', 12, '2020-01-01', '2020-12-31')
+                    resultado.append(False)
+                except ProviderFailure:
+                    resultado.append(True)
+            return resultado
+
+        self.assertEqual(falhas(7), falhas(7))
+        self.assertTrue(40 <= sum(falhas(7)) <= 80)
+
+    def test_draws_differ_per_query_and_continue_across_passes(self):
+        """Test that concurrent series and repeated passes do not replay the same failure sequence."""
+        for nome in ('cdi', 'ipca'):
+            RecordingProvider('sgs', lambda *a: pd.DataFrame({nome: [0.1]}), self.diretorio)(nome, 12, '2020-01-01', '2020-12-31')
+        config.PROVEDOR_MODO = 'reproduzir'
+        config.PROVEDOR_TAXA_FALHAS = 0.5
+
+        def falhas(reprodutor, nome):
+            resultado = []
+            for _ in range(30):
+                try:
+                    reprodutor(nome, 12, '2020-01-01', '2020-12-31')
+                    resultado.append(False)
+                except ProviderFailure:
+                    resultado.append(True)
+            return resultado
+
+        reprodutor = providers.wrap('sgs', None)
+        self.assertIs(providers.wrap('sgs', None), reprodutor)
+        cdi = falhas(reprodutor, 'cdi')
+        self.assertNotEqual(cdi, falhas(reprodutor, 'ipca'))
+        self.assertNotEqual(cdi, falhas(providers.wrap('sgs', None), 'cdi'))
+
+    def test_missing_recording_is_not_retried(self):
+        """Test that fetch_with_retry gives up at once on a query that was never recorded."""
+        reprodutor = ReplayProvider('yfinance', self.diretorio)
+        esperas = []
+        resultado = fetch_with_retry(lambda: reprodutor('VALE3.SA', '2020-01-01', '2020-12-31'), 'VALE3.SA',
+                                     tentativas=3, espera_inicial=1.0, dormir=esperas.append)
+        self.assertIsNone(resultado)
+        self.assertEqual(reprodutor.consultas, 1)
+        self.assertEqual(esperas, [])
+
+    def test_wrap_rejects_unknown_mode(self):
+        """Test that an invalid PROVEDOR_MODO is reported."""
+        with self.assertRaises(ValueError):
+            providers.wrap('sgs', lambda *a: None, modo='simular')
+
+    @patch('data_loader.sgs.get')
+    def test_bcb_download_replays_with_failures(self, mock_sgs_get):
+        """Test that a recorded SGS download replays offline, retrying injected failures."""
+        mock_sgs_get.side_effect = lambda codigos, start, end: pd.DataFrame(
+            {'cdi': 0.05}, index=pd.date_range(start, end, freq='MS'))
+        config.PROVEDOR_MODO = 'gravar'
+        gravada = download_bcb_series(12, 'cdi', '2012-01-01', '2020-12-31', max_workers=2)
+        chamadas = mock_sgs_get.call_count
+
+        config.PROVEDOR_MODO = 'reproduzir'
+        config.PROVEDOR_TAXA_FALHAS = 0.2
+        # Os sorteios dependem só de cada consulta, não da ordem em que as threads chegam
+        reproduzida = download_bcb_series(12, 'cdi', '2012-01-01', '2020-12-31', max_workers=2)
+        self.assertEqual(mock_sgs_get.call_count, chamadas)
+        pd.testing.assert_frame_equal(reproduzida, gravada)
+
+    def test_mt5_replay_without_terminal(self):
+        """Test that MT5 bars recorded through the stand-in replay with no MetaTrader5 module at all."""
+        rates = np.array([(1577923200, 10.0, 11.0, 9.0, 10.5, 100, 1, 0)],
+                         dtype=[('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                                ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+
+        class Terminal:
+            TIMEFRAME_D1 = MT5Provider.TIMEFRAME_D1
+            def initialize(self):
+                return True
+            def shutdown(self):
+                pass
+            def copy_rates_range(self, *argumentos):
+                return rates
+
+        with MT5Session(MT5Provider(Terminal(), modo='gravar')) as sessao:
+            gravado = download_mt5_data('PETR4.SA', '2020-01-01', '2020-01-31', sessao=sessao)
+
+        config.PROVEDOR_MODO = 'reproduzir'
+        with MT5Session(MT5Provider(None)) as sessao:
+            reproduzido = download_mt5_data('PETR4.SA', '2020-01-01', '2020-01-31', sessao=sessao)
+        pd.testing.assert_frame_equal(reproduzido, gravado)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from market_panel import build_market_panel
+from scenarios import run_monthly_contributions_backtest, run_scenario_cdb_mixed
+from results import CompactResult, APORTE_CDB
+import config
+
+class TestCompactResults(unittest.TestCase):
+
+    def setUp(self):
+        """Set up two years of prices for four tickers, with one ticker listed only in the second year."""
+        self.tickers = ['TICKER_A.SA', 'TICKER_B.SA', 'TICKER_C.SA', 'TICKER_D.SA']
+        dates = pd.bdate_range('2020-01-02', '2021-12-31')
+        rng = np.random.default_rng(3)
+        precos = 10 * np.cumprod(1 + rng.normal(0, 0.01, size=(len(dates), 4)), axis=0)
+        precos[dates < '2021-01-01', 3] = np.nan
+        columns = pd.MultiIndex.from_product([['Close'], self.tickers])
+        self.data = pd.DataFrame(precos, index=dates, columns=columns)
+        self.benchmark = pd.Series(1.0003, index=dates)
+        self.ipca = pd.Series(0.004, index=pd.date_range('2020-01-01', '2021-12-01', freq='MS'))
+        self.panel = build_market_panel(self.data, self.benchmark, self.ipca, self.tickers, '2020-01-01', '2021-12-31')
+        config.TICKERS_EMPRESAS = self.tickers
+        config.APORTE_MENSAL_BASE = 1000.0
+        config.NUMERO_EMPRESAS_POR_APORTE = 2
+        config.FREIO_ATIVO = True
+        config.FREIO_PERIODO_APORTES = 2
+        config.FREIO_QUARENTENA_INICIAL = 2
+        config.FREIO_QUARENTENA_ADICIONAL = 3
+
+    def _run_monthly(self, compacto):
+        return run_monthly_contributions_backtest(self.data, self.benchmark, self.ipca, self.tickers,
+                                                  '2020-01-01', '2021-12-31', panel=self.panel, compacto=compacto)
+
+    def test_compact_matches_daily_frame_on_trading_days(self):
+        """Test that the compact result keeps the trading-day values and that its ledger rebuilds the contributions."""
+        diario = self._run_monthly(False)
+        compacto = self._run_monthly(True)
+        self.assertIsInstance(compacto, CompactResult)
+        self.assertEqual(compacto.valores.dtype, np.float32)
+        self.assertEqual(len(compacto.dates), len(self.panel.dates))
+
+        quadro = compacto.to_frame()
+        pregoes = diario.loc[quadro.index]
+        for coluna in self.tickers + ['Total', config.BENCHMARK_NAME, 'Total Investido', 'IPCA_Benchmark']:
+            np.testing.assert_allclose(quadro[coluna], pregoes[coluna], rtol=1e-6)
+
+        # Uma linha do livro por ativo aportado (ou SEM_APORTE); a soma dos aportes é o total investido
+        dias_de_aporte = quadro['Ativo Aportado'].dropna()
+        self.assertTrue((diario.loc[dias_de_aporte.index, 'Ativo Aportado'] == dias_de_aporte).all())
+        comprados = compacto.aportes[compacto.aportes['ticker'] >= 0]
+        self.assertEqual(len(comprados), sum(len(s.split(',')) for s in dias_de_aporte))
+        np.testing.assert_allclose(comprados['acoes'] * comprados['preco'], comprados['valor'])
+        self.assertAlmostEqual(compacto.aportes['valor'].sum(), diario['Total Investido'].iloc[-1], places=6)
+
+        # Os eventos do freio são os mesmos que o motor registra
+        self.assertGreater(len(compacto.eventos_freio), 0)
+        ativados = compacto.eventos_freio[compacto.eventos_freio['ativado']]
+        self.assertTrue((ativados['fim_quarentena'] > ativados['data']).all())
+
+        # Apenas pregões, float32 e sem colunas de texto: bem menos memória
+        self.assertGreater(diario.memory_usage(deep=True).sum(), 2.5 * compacto.nbytes)
+
+    def test_cdb_ledger_records_destination(self):
+        """Test that the mixed scenario ledger records CDB contributions as index units."""
+        compacto = run_scenario_cdb_mixed('2020-01-01', '2021-12-31', 1000.0, self.data, self.benchmark, self.ipca,
+                                          0.3, panel=self.panel, compacto=True)
+        cdb = compacto.aportes[compacto.aportes['ticker'] == APORTE_CDB]
+        self.assertGreater(len(cdb), 0)
+        np.testing.assert_allclose(cdb['acoes'] * cdb['preco'], cdb['valor'])
+        contagem = compacto.contribution_counts()
+        self.assertEqual(contagem.sum(), 24)
+        self.assertIn('CDB', contagem.index)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,10 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from scenarios import run_scenario_cdb_mixed, calculate_ipca_benchmark
+from scenarios import (
+    run_scenario_cdb_mixed, calculate_ipca_benchmark, run_lump_sum_backtest, run_monthly_contributions_backtest,
+    calculate_time_weighted_curve, calculate_max_drawdown
+)
 import config
 
 class TestCDBScenario(unittest.TestCase):
@@ -62,6 +65,93 @@ class TestCDBScenario(unittest.TestCase):
 
         self.assertEqual(results_low_cdb.loc[second_contribution_date, 'Ativo Aportado'], 'TICKER_A.SA')
 
+    def test_cdb_accrues_on_benchmark_calendar(self):
+        """Verify the CDB sleeve is each contribution compounded by the benchmark since its date."""
+        results = run_scenario_cdb_mixed(
+            self.start_date, self.end_date, self.monthly_contribution,
+            self.portfolio_data, self.benchmark_data, self.ipca_data, self.cdb_percentage
+        )
+
+        first_contribution_date = results[results['Aporte'] > 0].index[0]
+        aporte = results.loc[first_contribution_date, 'Aporte']
+        dias = (pd.Timestamp('2020-01-15') - first_contribution_date).days
+        self.assertAlmostEqual(results.loc['2020-01-15', 'CDB'], aporte * 1.0001 ** dias)
+
+class TestLumpSumScenario(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a two-ticker panel with one dividend and a weekend gap."""
+        self.tickers = ['TICKER_A.SA', 'TICKER_B.SA']
+        dates = pd.to_datetime(['2020-01-02', '2020-01-03', '2020-01-06'])
+        columns = pd.MultiIndex.from_product([['Close', 'Dividends'], self.tickers])
+        self.data = pd.DataFrame(index=dates, columns=columns, dtype=float)
+        self.data[('Close', 'TICKER_A.SA')] = [10.0, 10.0, 12.0]
+        self.data[('Close', 'TICKER_B.SA')] = [20.0, 25.0, 20.0]
+        self.data[('Dividends', 'TICKER_A.SA')] = [0.0, 1.0, 0.0]
+        self.data[('Dividends', 'TICKER_B.SA')] = 0.0
+        config.VALOR_INVESTIDO_POR_EMPRESA = 1000.0
+
+    def test_dividends_are_reinvested(self):
+        """Verify the share count grows by the dividend yield on the payment date."""
+        results = run_lump_sum_backtest(self.data, None, None, self.tickers, '2020-01-01', '2020-01-06')
+
+        # 100 shares of A, +10% on 2020-01-03 -> 110 shares
+        self.assertAlmostEqual(results.loc['2020-01-03', 'TICKER_A.SA'], 1100.0)
+        self.assertAlmostEqual(results.loc['2020-01-06', 'TICKER_A.SA'], 1320.0)
+        self.assertAlmostEqual(results.loc['2020-01-06', 'TICKER_B.SA'], 1000.0)
+        self.assertAlmostEqual(results.loc['2020-01-06', 'Total'], 2320.0)
+
+    def test_non_trading_days_are_filled(self):
+        """Verify weekends repeat the last close and days before the first close are zero."""
+        results = run_lump_sum_backtest(self.data, None, None, self.tickers, '2020-01-01', '2020-01-06')
+
+        self.assertEqual(results.loc['2020-01-01', 'Total'], 0.0)
+        self.assertAlmostEqual(results.loc['2020-01-05', 'TICKER_B.SA'], 1250.0)
+
+class TestMonthlyContributionsScenario(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a flat-price panel on business days from January to May."""
+        self.start_date = '2020-01-01'
+        self.end_date = '2020-05-31'
+        self.tickers = ['TICKER_A.SA', 'TICKER_B.SA', 'TICKER_C.SA']
+        dates = pd.bdate_range('2020-01-02', self.end_date)
+        columns = pd.MultiIndex.from_product([['Close'], self.tickers])
+        self.data = pd.DataFrame(10.0, index=dates, columns=columns)
+        config.APORTE_MENSAL_BASE = 1000.0
+        config.FREIO_ATIVO = False
+        config.FREIO_PERIODO_APORTES = 2
+        config.FREIO_QUARENTENA_INICIAL = 6
+        config.FREIO_QUARENTENA_ADICIONAL = 12
+
+    def _run(self, tickers):
+        return run_monthly_contributions_backtest(self.data, None, None, tickers, self.start_date, self.end_date)
+
+    def test_contribution_is_split_among_smallest_holdings(self):
+        """Verify the contribution is divided equally among the n smallest positions."""
+        config.NUMERO_EMPRESAS_POR_APORTE = 2
+        results = self._run(self.tickers)
+
+        self.assertEqual(results.loc['2020-01-02', 'Ativo Aportado'], 'TICKER_A.SA,TICKER_B.SA')
+        self.assertAlmostEqual(results.loc['2020-01-02', 'TICKER_A.SA'], 500.0)
+        self.assertEqual(results.loc['2020-02-03', 'Ativo Aportado'], 'TICKER_C.SA,TICKER_A.SA')
+        self.assertAlmostEqual(results.loc['2020-05-31', 'Total'], 5000.0)
+        self.assertAlmostEqual(results.loc['2020-05-31', 'Total Investido'], 5000.0)
+
+    def test_freio_quarantines_repeated_contributions(self):
+        """Verify a second contribution within the brake period puts the asset in quarantine."""
+        config.NUMERO_EMPRESAS_POR_APORTE = 1
+        config.FREIO_ATIVO = True
+        results = self._run(self.tickers[:1])
+
+        # Jan and Feb are invested; the Feb contribution triggers a 6-month quarantine.
+        self.assertAlmostEqual(results.loc['2020-05-31', 'TICKER_A.SA'], 2000.0)
+        self.assertAlmostEqual(results.loc['2020-05-31', 'Total Investido'], 5000.0)
+
+        config.FREIO_ATIVO = False
+        results_sem_freio = self._run(self.tickers[:1])
+        self.assertAlmostEqual(results_sem_freio.loc['2020-05-31', 'TICKER_A.SA'], 5000.0)
+
 class TestIPCABenchmark(unittest.TestCase):
 
     def setUp(self):
@@ -94,5 +184,18 @@ class TestIPCABenchmark(unittest.TestCase):
                 # Check that the value on the last day is different (it has the IPCA adjustment)
                 self.assertNotEqual(round(first_day_value, 5), round(last_day_value, 5))
 
+class TestPerformanceMetrics(unittest.TestCase):
+
+    def test_time_weighted_curve_ignores_contributions(self):
+        """Verify contributions do not count as return in the time-weighted curve."""
+        valores = [1000.0, 1100.0, 2100.0, 1890.0]
+        aportes = [1000.0, np.nan, 1000.0, np.nan]
+        curva = calculate_time_weighted_curve(valores, aportes)
+        np.testing.assert_allclose(curva, [1.0, 1.1, 1.1, 0.99])
+
+    def test_max_drawdown(self):
+        """Verify the drawdown is measured from the running peak."""
+        self.assertAlmostEqual(calculate_max_drawdown([1.0, 1.2, 0.9, 1.3, 1.0]), 0.25)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,36 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Dependências que só os downloads e os gráficos usam
+DEPENDENCIAS_TARDIAS = ('yfinance', 'bcb', 'MetaTrader5', 'matplotlib')
+
+IMPORTACAO = f"""
+import json, sys
+import main
+print(json.dumps([m for m in {DEPENDENCIAS_TARDIAS!r} if m in sys.modules]))
+"""
+
+class TestStartup(unittest.TestCase):
+
+    def test_heavy_dependencies_are_not_imported(self):
+        """Test that importing main skips the download and plotting dependencies."""
+        # Um processo novo, para que nenhum módulo já esteja carregado
+        saida = subprocess.run([sys.executable, '-c', IMPORTACAO], cwd=RAIZ, capture_output=True, text=True, check=True)
+        carregados = json.loads(saida.stdout.strip().splitlines()[-1])
+        self.assertEqual(carregados, [])
+
+    def test_mt5_is_optional(self):
+        """Test that a session without the MetaTrader5 package fails to connect cleanly instead of raising."""
+        codigo = ("import sys; sys.modules['MetaTrader5'] = None\n"
+                  "import data_loader\n"
+                  "print(data_loader.MT5Session().connect(), data_loader.download_mt5_data('PETR4', '2020-01-01', '2020-01-31'))")
+        saida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+        self.assertEqual(saida.stdout.strip().splitlines()[-1], 'False None')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import engines
+import strategies
+import config
+
+class TestStrategyRunner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up two years of prices with dividends for five tickers, one listed only in the second year."""
+        self.dates = pd.bdate_range('2020-01-02', '2021-12-31')
+        rng = np.random.default_rng(11)
+        self.close = 10 * np.cumprod(1 + rng.normal(0, 0.01, size=(len(self.dates), 5)), axis=0)
+        self.close[self.dates < '2021-01-01', 4] = np.nan
+        self.dividends = np.where(rng.random(self.close.shape) < 0.02, 0.1, np.nan)
+        self.aportes = 1000 * 1.004 ** (np.arange(len(self.dates)) / 21)
+        self.indice_cdi = 1.0003 ** np.arange(1, len(self.dates) + 1)
+
+    def test_single_pass_matches_batch_engines(self):
+        """Test that strategies advanced together agree with the independent batch engines used by the sweep."""
+        mensal = dict(n_por_aporte=2, freio_ativo=True, freio_periodo=2, quarentena_inicial=2, quarentena_adicional=3)
+        juntas = strategies.run_strategies(
+            self.dates, self.close, self.dividends, self.aportes,
+            [strategies.MonthlyContributionsStrategy(5, **mensal), strategies.CdbMixedStrategy(5, 0.3),
+             strategies.MonthlyContributionsStrategy(5, n_por_aporte=1)],
+            indice_cdi=self.indice_cdi)
+
+        lote = engines.monthly_contributions_batch_engine(self.dates, self.close, self.dividends, self.aportes,
+                                                          [2, 1], [True, False], [2, 0], [2, 0], [3, 0])
+        cdb = engines.cdb_mixed_batch_engine(self.dates, self.close, self.dividends, self.aportes, self.indice_cdi, [0.3])
+        referencias = [(lote, 0), (cdb, 0), (lote, 1)]
+        for junta, (referencia, coluna) in zip(juntas, referencias):
+            for chave in ('total', 'total_investido', 'aporte'):
+                np.testing.assert_allclose(junta[chave], referencia[chave][:, coluna], rtol=1e-10)
+        self.assertTrue(juntas[0]['eventos_freio'])
+
+    def test_registered_strategy_hooks(self):
+        """Test that a new registered strategy only needs its hooks and reads its parameters from the config."""
+        @strategies.register_strategy('Igual Ponderado')
+        class EqualWeightStrategy(strategies.Strategy):
+            PARAMETROS = ('APORTE_MENSAL_BASE',)
+
+            def __init__(self, n_tickers, fracao, estado=None):
+                super().__init__(n_tickers, estado)
+                self.fracao = fracao
+                self.dividendos_recebidos = 0
+
+            @classmethod
+            def from_parameters(cls, n_tickers, parametros, estado=None):
+                return cls(n_tickers, parametros['APORTE_MENSAL_BASE'] / 1000.0, estado=estado)
+
+            def on_month_start(self, mercado, i, aporte):
+                cotados = np.flatnonzero(mercado.cotado[i])
+                self.num_shares[cotados] += self.fracao * aporte / cotados.size / mercado.close[i, cotados]
+                self.total_investido += self.fracao * aporte
+                self._aporte_dia[i] = self.fracao * aporte
+
+            def on_dividend(self, mercado, i):
+                self.dividendos_recebidos += 1
+                super().on_dividend(mercado, i)
+
+        try:
+            config.APORTE_MENSAL_BASE = 1000.0
+            estrategia = strategies.create_strategy('Igual Ponderado', 5, {'APORTE_MENSAL_BASE': 500.0})
+            self.assertEqual(estrategia.fracao, 0.5)
+            resultado, = strategies.run_strategies(self.dates, self.close, self.dividends, self.aportes, [estrategia])
+        finally:
+            del strategies.ESTRATEGIAS['Igual Ponderado']
+
+        dias_de_aporte = np.flatnonzero(~np.isnan(resultado['aporte']))
+        self.assertEqual(len(dias_de_aporte), 24)
+        self.assertAlmostEqual(resultado['total_investido'][-1], 0.5 * self.aportes[dias_de_aporte].sum())
+        self.assertEqual(estrategia.dividendos_recebidos, int(((self.dividends > 0) & ~np.isnan(self.close)).any(axis=1).sum()))
+        self.assertEqual(resultado['estado']['ultimo_dia'], self.dates[-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from market_panel import build_market_panel
+from sweep import build_tasks, run_sweep, run_task, run_batched_sweep
+import config
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a small panel with two tickers over six months."""
+        self.tickers = ['TICKER_A.SA', 'TICKER_B.SA']
+        dates = pd.bdate_range('2020-01-02', '2020-06-30')
+        columns = pd.MultiIndex.from_product([['Close'], self.tickers])
+        rng = np.random.default_rng(0)
+        precos = 10 * np.cumprod(1 + rng.normal(0, 0.01, size=(len(dates), 2)), axis=0)
+        self.data = pd.DataFrame(precos, index=dates, columns=columns)
+        self.benchmark = pd.Series(1.0002, index=dates)
+        self.panel = build_market_panel(self.data, self.benchmark, None, self.tickers, '2020-01-01', '2020-06-30')
+        self.grid = {'NUMERO_EMPRESAS_POR_APORTE': [1, 2], 'CDB_PERCENTAGE': [0.0, 0.5]}
+        config.APORTE_MENSAL_BASE = 1000.0
+
+    def test_build_tasks_covers_grid(self):
+        """Verify each scenario gets one task per combination of its own parameters."""
+        tarefas = build_tasks(self.grid)
+        self.assertEqual(len(tarefas), 4)
+        self.assertEqual([p['NUMERO_EMPRESAS_POR_APORTE'] for c, p in tarefas if c == 'Aportes Mensais'], [1, 2])
+        self.assertEqual([p['CDB_PERCENTAGE'] for c, p in tarefas if c == 'CDB Misto'], [0.0, 0.5])
+
+    def test_parallel_sweep_matches_in_process_runs(self):
+        """Verify workers reading the shared panel produce the same summary as in-process runs."""
+        resumo = run_sweep(self.panel, self.grid, max_workers=2)
+
+        self.assertEqual(len(resumo), 4)
+        for (cenario, parametros), (_, linha) in zip(build_tasks(self.grid), resumo.iterrows()):
+            esperado = run_task(self.panel, cenario, parametros)
+            self.assertAlmostEqual(linha['Valor Final'], esperado['Valor Final'])
+            self.assertAlmostEqual(linha['Max Drawdown'], esperado['Max Drawdown'])
+        self.assertAlmostEqual(resumo['Total Investido'].iloc[0], 6000.0)
+
+    def test_batched_sweep_matches_single_runs(self):
+        """Verify the batched engines reproduce one-at-a-time runs, brake included."""
+        grid = {
+            'NUMERO_EMPRESAS_POR_APORTE': [1, 2],
+            'FREIO_ATIVO': [True, False],
+            'FREIO_PERIODO_APORTES': [1, 3],
+            'CDB_PERCENTAGE': [0.0, 0.3, 0.6],
+        }
+        resumo = run_batched_sweep(self.panel, grid)
+
+        tarefas = build_tasks(grid)
+        self.assertEqual(len(resumo), len(tarefas))
+        for (cenario, parametros), (_, linha) in zip(tarefas, resumo.iterrows()):
+            esperado = run_task(self.panel, cenario, parametros)
+            self.assertAlmostEqual(linha['Valor Final'], esperado['Valor Final'])
+            self.assertAlmostEqual(linha['CAGR'], esperado['CAGR'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from market_panel import build_market_panel
+from scenarios import run_lump_sum_backtest, run_monthly_contributions_backtest
+from vintage import vintage_starts, run_vintage_analysis, summarize_by_start_year
+import config
+
+class TestVintageAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        """Set up two years of prices with dividends, CDI and IPCA for three tickers."""
+        self.tickers = ['TICKER_A.SA', 'TICKER_B.SA', 'TICKER_C.SA']
+        dates = pd.bdate_range('2020-01-02', '2021-12-31')
+        rng = np.random.default_rng(1)
+        precos = 10 * np.cumprod(1 + rng.normal(0, 0.01, size=(len(dates), 3)), axis=0)
+        precos[:60, 2] = np.nan  # TICKER_C só é cotado a partir de março
+        dividendos = np.where(rng.random((len(dates), 3)) < 0.02, 0.1, 0.0)
+        columns = pd.MultiIndex.from_product([['Close', 'Dividends'], self.tickers])
+        self.data = pd.DataFrame(np.hstack([precos, dividendos]), index=dates, columns=columns)
+        self.benchmark = pd.Series(1.0003, index=dates)
+        self.ipca = pd.Series(0.004, index=pd.date_range('2020-01-01', '2021-12-01', freq='MS'))
+        self.periodo = ('2020-01-01', '2021-12-31')
+        config.TICKERS_EMPRESAS = self.tickers
+        config.VALOR_INVESTIDO_POR_EMPRESA = 1000.0
+        config.APORTE_MENSAL_BASE = 1000.0
+        config.NUMERO_EMPRESAS_POR_APORTE = 1
+        config.FREIO_ATIVO = True
+        config.FREIO_PERIODO_APORTES = 2
+        config.FREIO_QUARENTENA_INICIAL = 3
+        config.FREIO_QUARENTENA_ADICIONAL = 6
+
+    def _panel(self, data_inicio, data_fim):
+        return build_market_panel(self.data, self.benchmark, self.ipca, self.tickers, data_inicio, data_fim)
+
+    def test_vintage_starts_respect_minimum_horizon(self):
+        """Verify one vintage per month, dropping those closer to the end than the horizon."""
+        inicios, pregoes = vintage_starts(self._panel(*self.periodo), horizonte_minimo_meses=6)
+        self.assertEqual(inicios[0], pd.Timestamp('2020-01-01'))
+        self.assertEqual(inicios[-1], pd.Timestamp('2021-06-01'))
+        self.assertEqual(len(inicios), 18)
+        self.assertEqual(pregoes[0], 0)
+
+    def test_vintages_match_scenarios_started_later(self):
+        """Verify each vintage reproduces the scenarios run with that start date."""
+        tabela = run_vintage_analysis(self._panel(*self.periodo), horizonte_minimo_meses=6)
+
+        for inicio in ['2020-01-01', '2020-02-01', '2020-07-01', '2021-03-01']:
+            panel = self._panel(inicio, self.periodo[1])
+            aporte_unico = run_lump_sum_backtest(None, None, None, self.tickers, inicio, self.periodo[1], panel=panel)
+            mensal = run_monthly_contributions_backtest(None, None, None, self.tickers, inicio, self.periodo[1], panel=panel)
+            linhas = tabela[tabela['Inicio'] == pd.Timestamp(inicio)].set_index('Cenario')
+
+            unico = linhas.loc['Aporte Unico']
+            self.assertAlmostEqual(unico['Valor Final'], aporte_unico['Total'].iloc[-1])
+            self.assertAlmostEqual(unico['Total Investido'], 3000.0)
+            self.assertAlmostEqual(unico['ROI CDI'] + 1, aporte_unico['CDI'].iloc[-1] / 3000.0)
+
+            aportes = linhas.loc['Aportes Mensais']
+            investido = mensal['Total Investido'].iloc[-1]
+            self.assertAlmostEqual(aportes['ROI'], mensal['Total'].iloc[-1] / investido - 1)
+            self.assertAlmostEqual(aportes['ROI CDI'], mensal['CDI'].iloc[-1] / investido - 1)
+
+    def test_summary_by_start_year(self):
+        """Verify the distribution table has one row per scenario and start year."""
+        tabela = run_vintage_analysis(self._panel(*self.periodo), horizonte_minimo_meses=6)
+        resumo = summarize_by_start_year(tabela)
+
+        self.assertEqual(len(resumo), 4)
+        self.assertEqual(resumo['Safras'].tolist(), [12, 6, 12, 6])
+        self.assertTrue(((resumo['ROI Minimo'] <= resumo['ROI Mediano']) & (resumo['ROI Mediano'] <= resumo['ROI Maximo'])).all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""
+Análise por safra (data de início) dos cenários de aporte único e aportes mensais.
+
+Cada safra é um investidor que começa no primeiro dia de um mês do período e
+vai até `config.DATA_FIM`. Nenhum cenário é reexecutado por safra:
+
+- Aporte Único: o valor final de cada safra sai em forma fechada das matrizes
+  acumuladas de preço e de reinvestimento de dividendos (uma divisão por safra);
+- Aportes Mensais: todas as safras são simuladas juntas, em uma única passada
+  do motor em lote, cada uma começando a aportar no seu próprio pregão;
+- CDI e IPCA + X: a rentabilidade de cada safra é a razão entre os índices
+  acumulados no fim e na véspera do início.
+
+O resultado é uma tabela com uma linha por safra e cenário (ROI, CAGR e
+excesso de CAGR sobre o CDI e o IPCA + X) e o resumo da distribuição por ano
+de início.
+
+Uso:
+    python vintage.py
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import benchmarks
+import config
+import engines
+from scenarios import calculate_cagr, calculate_time_weighted_curve
+
+COLUNAS_SAFRA = ('Inicio', 'Cenario', 'Anos', 'Valor Final', 'Total Investido', 'ROI', 'ROI CDI',
+                 'CAGR', 'CAGR CDI', 'CAGR IPCA+X', 'Excesso CDI', 'Excesso IPCA+X')
+
+
+def vintage_starts(panel, horizonte_minimo_meses=None):
+    """Safras do painel: primeiro pregão de cada mês com ao menos `horizonte_minimo_meses` até o fim.
+
+    Retorna a data de início de cada safra no calendário (o primeiro dia do
+    mês, ou o início do período) e a posição do seu primeiro pregão.
+    """
+    horizonte_minimo_meses = config.VINTAGE_HORIZONTE_MINIMO_MESES if horizonte_minimo_meses is None else horizonte_minimo_meses
+    pregoes = np.flatnonzero(engines.month_start_mask(panel.dates))
+    inicios = panel.dates[pregoes].to_period('M').to_timestamp()
+    inicios = inicios.where(inicios >= panel.calendar[0], panel.calendar[0])
+    limite = panel.calendar[-1] - pd.DateOffset(months=horizonte_minimo_meses)
+    manter = np.asarray(inicios <= limite)
+    return inicios[manter], pregoes[manter]
+
+
+def _growth_until_end(indice, posicoes):
+    """Crescimento de um índice acumulado no calendário entre a véspera de cada posição e o último dia."""
+    anterior = np.where(posicoes > 0, indice[np.maximum(posicoes - 1, 0)], 1.0)
+    return indice[-1] / anterior
+
+
+def lump_sum_vintages(panel, tickers, pregoes, valor_por_empresa=None):
+    """Valor final e total investido do Aporte Único para cada safra, sem reexecutar o motor.
+
+    O valor de um ticker comprado no pregão s é V / preço[s] * G[t] / G[s-1] *
+    preço[t], onde G é o fator acumulado de reinvestimento de dividendos; como
+    o cenário, o valor final é o do último pregão com cotação.
+    """
+    valor_por_empresa = config.VALOR_INVESTIDO_POR_EMPRESA if valor_por_empresa is None else valor_por_empresa
+    close, dividends = panel.arrays(tickers)
+    acumulado = np.cumprod(engines.dividend_growth_factor(close, dividends), axis=0)
+    acumulado_anterior = np.vstack([np.ones((1, close.shape[1])), acumulado[:-1]])
+
+    # Valor por ação reinvestida no último pregão cotado de cada ticker
+    valor_acumulado = pd.DataFrame(acumulado * close).ffill().to_numpy()[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valores = valor_por_empresa / (close[pregoes] * acumulado_anterior[pregoes]) * valor_acumulado
+    valor_final = np.nan_to_num(valores).sum(axis=1)
+
+    # Como no cenário, entram no investimento os tickers com ao menos uma cotação a partir da safra
+    cotado = ~np.isnan(close)
+    ultimo_cotado = np.where(cotado.any(axis=0), len(close) - 1 - np.argmax(cotado[::-1], axis=0), -1)
+    investido = valor_por_empresa * (ultimo_cotado[None, :] >= pregoes[:, None]).sum(axis=1)
+    return valor_final, investido
+
+
+def monthly_vintages(panel, tickers, pregoes, escala_aporte):
+    """Simula os Aportes Mensais de todas as safras em uma única passada do motor em lote."""
+    close, dividends = panel.arrays(tickers)
+    aportes = config.APORTE_MENSAL_BASE * panel.ipca_acumulado[panel.posicao_pregao]
+    n_safras = len(pregoes)
+    return engines.monthly_contributions_batch_engine(
+        panel.dates, close, dividends, aportes,
+        np.full(n_safras, config.NUMERO_EMPRESAS_POR_APORTE),
+        freio_ativo=np.full(n_safras, config.FREIO_ATIVO),
+        freio_periodo=np.full(n_safras, config.FREIO_PERIODO_APORTES),
+        quarentena_inicial=np.full(n_safras, config.FREIO_QUARENTENA_INICIAL),
+        quarentena_adicional=np.full(n_safras, config.FREIO_QUARENTENA_ADICIONAL),
+        inicio=pregoes,
+        escala_aporte=escala_aporte,
+    )
+
+
+def run_vintage_analysis(panel, horizonte_minimo_meses=None):
+    """Tabela com uma linha por safra e cenário (Aporte Único e Aportes Mensais)."""
+    inicios, pregoes = vintage_starts(panel, horizonte_minimo_meses)
+    tickers = panel.valid_tickers(panel.tickers)
+    print(f"Analisando {len(inicios)} safras de {len(tickers)} empresas...")
+    if len(inicios) == 0:
+        return pd.DataFrame(columns=COLUNAS_SAFRA)
+
+    posicoes = np.asarray(panel.calendar.get_indexer(inicios))
+    anos = np.asarray((panel.calendar[-1] - inicios).days) / 365.25
+
+    if panel.indice_benchmark is not None:
+        crescimento_cdi = _growth_until_end(panel.indice_benchmark, posicoes)
+    else:
+        crescimento_cdi = np.full(len(inicios), np.nan)
+    if panel.indice_ipca_x is not None:
+        crescimento_ipca = _growth_until_end(panel.indice_ipca_x, posicoes)
+    else:
+        crescimento_ipca = np.full(len(inicios), np.nan)
+    cagr_cdi = np.array([calculate_cagr(1.0, g, a) for g, a in zip(crescimento_cdi, anos)])
+    cagr_ipca = np.array([calculate_cagr(1.0, g, a) for g, a in zip(crescimento_ipca, anos)])
+
+    linhas = []
+
+    valor_final, investido = lump_sum_vintages(panel, tickers, pregoes)
+    for k, inicio in enumerate(inicios):
+        linhas.append({
+            'Inicio': inicio, 'Cenario': 'Aporte Unico', 'Anos': anos[k],
+            'Valor Final': valor_final[k], 'Total Investido': investido[k],
+            'ROI': valor_final[k] / investido[k] - 1 if investido[k] > 0 else np.nan,
+            'ROI CDI': crescimento_cdi[k] - 1,
+            'CAGR': calculate_cagr(investido[k], valor_final[k], anos[k]),
+        })
+
+    # O primeiro aporte de cada safra vale APORTE_MENSAL_BASE; os seguintes são corrigidos pelo IPCA a partir dele
+    escala = 1.0 / np.where(posicoes > 0, panel.ipca_acumulado[np.maximum(posicoes - 1, 0)], 1.0)
+    resultado = monthly_vintages(panel, tickers, pregoes, escala)
+    # Saldo final do CDI com os mesmos aportes de cada safra (um produto escalar por safra)
+    indice_cdi = panel.indice_benchmark if panel.indice_benchmark is not None else np.ones(len(panel.calendar))
+    final_cdi = benchmarks.final_value(indice_cdi, panel.posicao_pregao, resultado['aporte'])
+    for k, inicio in enumerate(inicios):
+        total, investido_k = resultado['total'][:, k], resultado['total_investido'][-1, k]
+        curva = calculate_time_weighted_curve(total, resultado['aporte'][:, k])
+        linhas.append({
+            'Inicio': inicio, 'Cenario': 'Aportes Mensais', 'Anos': anos[k],
+            'Valor Final': total[-1], 'Total Investido': investido_k,
+            'ROI': total[-1] / investido_k - 1 if investido_k > 0 else np.nan,
+            'ROI CDI': final_cdi[k] / investido_k - 1 if investido_k > 0 else np.nan,
+            'CAGR': calculate_cagr(1.0, curva[-1], anos[k]),
+        })
+
+    tabela = pd.DataFrame(linhas, columns=COLUNAS_SAFRA)
+    tabela['CAGR CDI'] = np.tile(cagr_cdi, 2)
+    tabela['CAGR IPCA+X'] = np.tile(cagr_ipca, 2)
+    tabela['Excesso CDI'] = tabela['CAGR'] - tabela['CAGR CDI']
+    tabela['Excesso IPCA+X'] = tabela['CAGR'] - tabela['CAGR IPCA+X']
+    return tabela
+
+
+def summarize_by_start_year(tabela):
+    """Distribuição dos resultados por cenário e ano de início das safras."""
+    agrupado = tabela.assign(Ano=tabela['Inicio'].dt.year).groupby(['Cenario', 'Ano'], sort=False)
+    return pd.DataFrame({
+        'Safras': agrupado.size(),
+        'ROI Mediano': agrupado['ROI'].median(),
+        'ROI Minimo': agrupado['ROI'].min(),
+        'ROI Maximo': agrupado['ROI'].max(),
+        'CAGR Mediano': agrupado['CAGR'].median(),
+        'Excesso CDI Mediano': agrupado['Excesso CDI'].median(),
+        'Excesso IPCA+X Mediano': agrupado['Excesso IPCA+X'].median(),
+        'Supera CDI': agrupado['Excesso CDI'].apply(lambda x: (x > 0).mean()),
+    }).reset_index()
+
+
+def main():
+    """Carrega os dados uma vez, analisa todas as safras e salva a tabela."""
+    import main as backtest
+
+    panel = backtest.load_market_panel(config.TICKERS_EMPRESAS, config.DATA_INICIO, config.DATA_FIM)
+    if panel is None:
+        return
+
+    tabela = run_vintage_analysis(panel)
+    resumo = summarize_by_start_year(tabela)
+
+    os.makedirs('results', exist_ok=True)
+    path = os.path.join('results', config.ARQUIVO_RESULTADOS_SAFRAS)
+    tabela.to_csv(path, index=False)
+    print("\n--- Distribuição por Ano de Início ---")
+    print(resumo.to_string(index=False))
+    print(f"\nResultados por safra salvos em '{path}'")
+
+
+if __name__ == "__main__":
+    main()